@@ -10,7 +10,10 @@ from sqlalchemy import text
 from dotenv import load_dotenv
 
 from utils.logger import get_logger
-from db.database import Base, engine, SessionLocal
+from config import SHARD_COUNT, SHARD_IDS
+from db.database import Base, engine, async_engine, SessionLocal, checkpoint_wal
+from db.migrations import upgrade_schema
+from db.write_behind import PLAYER_STATES
 from db.models import ServerState, PlayerProfile  # Import models for DB initialization
 
 # --- Setup ---
@@ -28,7 +31,11 @@ intents.message_content = True
 intents.members = True
 intents.guilds = True
 
-class QuitAddictionBot(commands.Bot):
+# Avec plusieurs shards, chaque processus ouvre uniquement les shards de SHARD_IDS
+# et son Scheduler ne simule que les serveurs de ces shards (cf. utils/sharding.py).
+BotBase = commands.AutoShardedBot if SHARD_COUNT > 1 else commands.Bot
+
+class QuitAddictionBot(BotBase):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._synced = False
@@ -97,11 +104,15 @@ def init_db():
     """Initialize database schema and verify connection"""
     try:
         logger.info("--- Initializing Database Schema ---")
+        # Tables existantes d'une version précédente (ex. profil joueur d'un seul tenant)
+        upgrade_schema(engine)
         Base.metadata.create_all(bind=engine)
         # Verify database connection
         with SessionLocal() as session:
             session.execute(text("SELECT 1"))
             session.commit()
+        # Profils modifiés avant un arrêt brutal, pas encore écrits en base (écriture différée)
+        PLAYER_STATES.recover()
         logger.info("✅ Database Schema Initialized/Checked Successfully")
     except Exception as e:
         logger.critical(f"❌ Database initialization failed: {e}", exc_info=True)
@@ -110,6 +121,12 @@ def init_db():
 async def cleanup():
     """Cleanup function to properly close resources"""
     try:
+        # Dernier flush des profils en écriture différée ; en cas d'échec, le journal les garde pour le redémarrage
+        PLAYER_STATES.flush()
+        PLAYER_STATES.close()
+        await async_engine.dispose()
+        # Vide le journal WAL dans la base avant de fermer les dernières connexions
+        checkpoint_wal("TRUNCATE")
         engine.dispose()
         logger.info("✅ Database connections closed")
     except Exception as e:
@@ -117,7 +134,10 @@ async def cleanup():
 
 if __name__ == '__main__':
     init_db()  # Initialize database
-    bot = QuitAddictionBot(command_prefix="!", intents=intents)
+    shard_kwargs = {"shard_count": SHARD_COUNT, "shard_ids": SHARD_IDS} if SHARD_COUNT > 1 else {}
+    bot = QuitAddictionBot(command_prefix="!", intents=intents, **shard_kwargs)
+    if shard_kwargs:
+        logger.info(f"Sharding: shards {SHARD_IDS} sur {SHARD_COUNT}")
     
     async def main():
         if not TOKEN:
@@ -10,13 +10,16 @@ import math
 from typing import List, Tuple, Dict, Literal, Union, Optional, cast
 import os
 import traceback
-from sqlalchemy.orm import Session
 
 # --- Centralized Imports ---
-from db.database import SessionLocal
+from db.database import AsyncSessionLocal
 from db.models import ServerState, PlayerProfile
+from db.queries import get_player, get_server_state
 from utils.logger import get_logger
 from utils.embed_builder import create_styled_embed
+from utils.scheduler_utils import materialize_linear_stats
+from utils.sim_profile import PROFILES as SIM_PROFILES
+from utils import sim_clock
 from cogs.main_embed import DashboardView
 from utils.time_manager import (
     get_utc_now, to_localized, prepare_for_db,
@@ -43,10 +46,10 @@ class AdminDebugCommands(commands.GroupCog, name="debug"):
     @app_commands.command(name="unlock_all", description="[DEBUG] Débloque tous les achievements et le smoke shop")
     @app_commands.default_permissions(administrator=True)
     async def unlock_all(self, interaction: discord.Interaction):
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
             # Get player profile
-            player = db.query(PlayerProfile).filter_by(guild_id=str(interaction.guild_id)).first()
+            player = await get_player(db, interaction.guild_id)
             if not player:
                 await interaction.response.send_message("❌ Profil joueur non trouvé", ephemeral=True)
                 return
@@ -60,21 +63,21 @@ class AdminDebugCommands(commands.GroupCog, name="debug"):
             # Give money for testing
             player.money = 1000
 
-            db.commit()
+            await db.commit()
             await interaction.response.send_message("✅ Smoke shop débloqué et argent ajouté !", ephemeral=True)
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Erreur lors du déblocage: {e}")
             await interaction.response.send_message("❌ Une erreur est survenue", ephemeral=True)
         finally:
-            db.close()
+            await db.close()
 
     @app_commands.command(name="fast_time", description="[DEBUG] Accélère le temps de jeu (x10)")
     @app_commands.default_permissions(administrator=True)
     async def fast_time(self, interaction: discord.Interaction):
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
-            server = db.query(ServerState).filter_by(guild_id=str(interaction.guild_id)).first()
+            server = await get_server_state(db, interaction.guild_id)
             if not server:
                 await interaction.response.send_message("❌ Configuration serveur non trouvée", ephemeral=True)
                 return
@@ -83,21 +86,24 @@ class AdminDebugCommands(commands.GroupCog, name="debug"):
             server.is_test_mode = True
             server.game_tick_interval_minutes = 1  # Update every minute instead of every 30 minutes
             
-            db.commit()
+            await db.commit()
+            scheduler = self.bot.get_cog("Scheduler")
+            if scheduler:
+                scheduler.reschedule_guild(str(interaction.guild_id))
             await interaction.response.send_message("✅ Mode accéléré activé ! (1 minute réelle = 2 heures en jeu)", ephemeral=True)
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Erreur lors de l'activation du mode accéléré: {e}")
             await interaction.response.send_message("❌ Une erreur est survenue", ephemeral=True)
         finally:
-            db.close()
+            await db.close()
 
     @app_commands.command(name="normal_time", description="[DEBUG] Remet la vitesse du temps normale")
     @app_commands.default_permissions(administrator=True)
     async def normal_time(self, interaction: discord.Interaction):
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
-            server = db.query(ServerState).filter_by(guild_id=str(interaction.guild_id)).first()
+            server = await get_server_state(db, interaction.guild_id)
             if not server:
                 await interaction.response.send_message("❌ Configuration serveur non trouvée", ephemeral=True)
                 return
@@ -106,21 +112,24 @@ class AdminDebugCommands(commands.GroupCog, name="debug"):
             server.is_test_mode = False
             server.game_tick_interval_minutes = 30  # Back to normal update interval
             
-            db.commit()
+            await db.commit()
+            scheduler = self.bot.get_cog("Scheduler")
+            if scheduler:
+                scheduler.reschedule_guild(str(interaction.guild_id))
             await interaction.response.send_message("✅ Mode normal réactivé", ephemeral=True)
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Erreur lors de la désactivation du mode accéléré: {e}")
             await interaction.response.send_message("❌ Une erreur est survenue", ephemeral=True)
         finally:
-            db.close()
+            await db.close()
 
     @app_commands.command(name="reset_cooldowns", description="[DEBUG] Réinitialise tous les cooldowns d'actions")
     @app_commands.default_permissions(administrator=True)
     async def reset_cooldowns(self, interaction: discord.Interaction):
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
-            player = db.query(PlayerProfile).filter_by(guild_id=str(interaction.guild_id)).first()
+            player = await get_player(db, interaction.guild_id)
             if not player:
                 await interaction.response.send_message("❌ Profil joueur non trouvé", ephemeral=True)
                 return
@@ -133,21 +142,21 @@ class AdminDebugCommands(commands.GroupCog, name="debug"):
             player.last_pee = None
             player.last_shower = None
             
-            db.commit()
+            await db.commit()
             await interaction.response.send_message("✅ Cooldowns réinitialisés !", ephemeral=True)
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Erreur lors de la réinitialisation des cooldowns: {e}")
             await interaction.response.send_message("❌ Une erreur est survenue", ephemeral=True)
         finally:
-            db.close()
+            await db.close()
 
     @app_commands.command(name="refill_stats", description="[DEBUG] Remplit toutes les statistiques à 100%")
     @app_commands.default_permissions(administrator=True)
     async def refill_stats(self, interaction: discord.Interaction):
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
-            player = db.query(PlayerProfile).filter_by(guild_id=str(interaction.guild_id)).first()
+            player = await get_player(db, interaction.guild_id)
             if not player:
                 await interaction.response.send_message("❌ Profil joueur non trouvé", ephemeral=True)
                 return
@@ -165,14 +174,14 @@ class AdminDebugCommands(commands.GroupCog, name="debug"):
             player.hygiene = 100.0
             player.job_performance = 100.0
             
-            db.commit()
+            await db.commit()
             await interaction.response.send_message("✅ Stats remplies à 100% !", ephemeral=True)
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Erreur lors du remplissage des stats: {e}")
             await interaction.response.send_message("❌ Une erreur est survenue", ephemeral=True)
         finally:
-            db.close()
+            await db.close()
 
 
 class RoleSelect(ui.Select):
@@ -193,28 +202,27 @@ class RoleSelect(ui.Select):
             await interaction.followup.send("Erreur: Rôle introuvable.", ephemeral=True)
             return
 
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
-            state = db.query(ServerState).filter_by(guild_id=self.guild_id).first()
+            state = await get_server_state(db, self.guild_id)
             if not state:
                 await interaction.followup.send("Erreur: Configuration du serveur introuvable.", ephemeral=True)
                 return
 
             setattr(state, self.setting_key, selected_id)
-            db.commit()
+            await db.commit()
             
             await interaction.followup.send(f"✅ Rôle mis à jour !", ephemeral=True)
             
-            db.refresh(state)
             new_embed = self.cog.generate_notifications_config_embed(state)
             # REFACTOR: Pass interaction.guild to generate the new view with the updated select menu
             new_view = self.cog.generate_notifications_config_view(self.guild_id, interaction.guild)
             await interaction.edit_original_response(embed=new_embed, view=new_view, content=None)
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Erreur de mise à jour du rôle: {e}", exc_info=True)
         finally:
-            db.close()
+            await db.close()
 
 class SetAllNotificationsRoleSelect(ui.Select):
     """
@@ -241,9 +249,9 @@ class SetAllNotificationsRoleSelect(ui.Select):
             await interaction.followup.send("Erreur : Rôle introuvable.", ephemeral=True)
             return
 
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
-            state = db.query(ServerState).filter_by(guild_id=self.guild_id).first()
+            state = await get_server_state(db, self.guild_id)
             if not state:
                 await interaction.followup.send("Erreur : Configuration du serveur introuvable.", ephemeral=True)
                 return
@@ -255,8 +263,7 @@ class SetAllNotificationsRoleSelect(ui.Select):
             for field in notification_role_fields:
                 setattr(state, field, selected_id)
 
-            db.commit()
-            db.refresh(state)
+            await db.commit()
 
             await interaction.followup.send(f"✅ Tous les rôles de notification ont été définis sur <@&{selected_id}> !", ephemeral=True)
             
@@ -264,10 +271,10 @@ class SetAllNotificationsRoleSelect(ui.Select):
             new_view = self.cog.generate_notifications_config_view(self.guild_id, interaction.guild)
             await interaction.edit_original_response(embed=new_embed, view=new_view)
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Erreur lors de la définition du rôle de notif unique: {e}", exc_info=True)
         finally:
-            db.close()
+            await db.close()
 
 
 class PaginatedViewManager(ui.View):
@@ -296,18 +303,18 @@ class PaginatedViewManager(ui.View):
                 selected_id = inner_self.id_mapping.get(inner_self.values[0])
                 if not selected_id:
                     await interaction.followup.send("Erreur: Item introuvable.", ephemeral=True); return
-                db = SessionLocal()
+                db = AsyncSessionLocal()
                 try:
-                    state = db.query(ServerState).filter_by(guild_id=inner_self.guild_id).first()
+                    state = await get_server_state(db, inner_self.guild_id)
                     db_field_map = {'admin_role': 'admin_role_id', 'game_channel': 'game_channel_id'}
                     setattr(state, db_field_map[inner_self.select_type], selected_id)
-                    db.commit(); db.refresh(state)
+                    await db.commit()
                     await interaction.followup.send("✅ Paramètre mis à jour !", ephemeral=True)
                     new_embed = inner_self.cog.generate_role_and_channel_config_embed(state)
                     new_view = inner_self.cog.generate_general_config_view(inner_self.guild_id, interaction.guild)
                     await interaction.edit_original_response(embed=new_embed, view=new_view)
                 finally:
-                    db.close()
+                    await db.close()
         
         placeholder = f"Sélectionnez... (Page {self.current_page + 1}/{self.total_pages})"
         self.add_item(ItemSelect(self.guild_id, self.select_type, self.id_mapping, self.cog, page_options, placeholder))
@@ -352,9 +359,9 @@ class StopGameConfirmationModal(ui.Modal, title="Confirm Game Stop"):
 
         await interaction.response.defer(ephemeral=True, thinking=True)
         
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
-            state = db.query(ServerState).filter_by(guild_id=self.guild_id).first()
+            state = await get_server_state(db, self.guild_id)
             if not state or not state.game_started:
                 await interaction.followup.send("There is no game currently running to stop.", ephemeral=True)
                 return
@@ -366,8 +373,7 @@ class StopGameConfirmationModal(ui.Modal, title="Confirm Game Stop"):
             game_channel_id_to_use = state.game_channel_id
             state.game_message_id = None
             
-            db.commit()
-            db.refresh(state)
+            await db.commit()
 
             # Update the admin panel from the original interaction that opened the modal
             await interaction.edit_original_response(
@@ -386,6 +392,9 @@ class StopGameConfirmationModal(ui.Modal, title="Confirm Game Stop"):
                         color=discord.Color.dark_grey()
                     )
                     await game_message.edit(embed=game_over_embed, view=None)
+                    scheduler = self.cog.bot.get_cog("Scheduler")
+                    if scheduler:
+                        scheduler.dashboard_edited(game_channel_id_to_use, game_message_id_to_clear)
                 except (NotFound, Forbidden):
                     logger.warning(f"Impossible de trouver ou modifier le message de jeu {game_message_id_to_clear} dans le salon {game_channel_id_to_use}")
                 except Exception as e:
@@ -394,11 +403,11 @@ class StopGameConfirmationModal(ui.Modal, title="Confirm Game Stop"):
             await interaction.followup.send("✅ The game has been successfully stopped.", ephemeral=True)
 
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Error stopping the game: {e}", exc_info=True)
             await interaction.followup.send(f"A database error occurred: {e}", ephemeral=True)
         finally:
-            db.close()
+            await db.close()
 
 
 class AdminCog(commands.Cog):
@@ -409,12 +418,18 @@ class AdminCog(commands.Cog):
         "test": {"minutes_per_day": 12, "label": "Test (1 semaine en 84 mins)"},
         "real_time": {"minutes_per_day": 1440, "label": "Temps Réel (1:1)"},
     }
-    def _update_game_parameters(self, state: ServerState):
+    async def _update_game_parameters(self, db, state: ServerState):
         difficulty = state.game_mode or "medium"; duration_key = state.duration_key or "real_time"
         multiplier = self.DIFFICULTY_MULTIPLIERS.get(difficulty, 1.0)
         duration_setting = self.DURATION_SETTINGS.get(duration_key, self.DURATION_SETTINGS["real_time"])
+        # Les besoins sont matérialisés aux anciens taux avant d'en changer
+        player = await get_player(db, state.guild_id, cold=()) if state.game_started else None
+        if player:
+            materialize_linear_stats(state, player, sim_clock.utcnow())
         for rate, value in self.BASE_DAILY_RATES.items(): setattr(state, f"degradation_rate_{rate}", value * multiplier)
         state.game_minutes_per_day = duration_setting["minutes_per_day"]
+        # Le profil de simulation compilé du serveur est recompilé une fois la nouvelle configuration validée
+        SIM_PROFILES.invalidate_on_commit(db, state.guild_id)
 
     @app_commands.command(name="config", description="Configure les paramètres du bot et du jeu pour le serveur.")
     @app_commands.default_permissions(administrator=True)
@@ -427,15 +442,17 @@ class AdminCog(commands.Cog):
             return
             
         # Réponse immédiate
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
-            state = db.query(ServerState).filter_by(guild_id=str(interaction.guild.id)).first()
+            state = await get_server_state(db, interaction.guild.id)
             if not state:
                 state = ServerState(guild_id=str(interaction.guild.id))
-                self._update_game_parameters(state)
+                await self._update_game_parameters(db, state)
                 db.add(state)
-                db.commit()
-                db.refresh(state)
+                await db.commit()
+                await db.refresh(state)
+            # Connexion rendue avant les appels à Discord
+            await db.close()
             
             embed = self.generate_config_menu_embed(state)
             view = self.generate_config_menu_view(str(interaction.guild.id), interaction.guild, state)
@@ -458,7 +475,7 @@ class AdminCog(commands.Cog):
                     ephemeral=True
                 )
         finally:
-            db.close()
+            await db.close()
 
     def create_options_and_mapping(self, items: List[Union[discord.Role, discord.TextChannel]], item_type: str, guild: discord.Guild | None) -> Tuple[List[discord.SelectOption], Dict[str, str]]:
         options: List[discord.SelectOption] = []
@@ -518,11 +535,9 @@ class AdminCog(commands.Cog):
         def __init__(self, label: str, guild_id: str, style: discord.ButtonStyle, row: int, cog: 'AdminCog', disabled: bool = False):
             super().__init__(label=label, style=style, row=row, disabled=disabled, emoji="🕹️"); self.guild_id = guild_id; self.cog = cog
         async def callback(self, interaction: discord.Interaction):
-            db = SessionLocal()
-            try:
-                state = db.query(ServerState).filter_by(guild_id=self.guild_id).first()
-                await interaction.response.edit_message(embed=self.cog.generate_mode_duration_embed(state), view=self.cog.generate_mode_duration_view(self.guild_id, state))
-            finally: db.close()
+            async with AsyncSessionLocal() as db:
+                state = await get_server_state(db, self.guild_id)
+            await interaction.response.edit_message(embed=self.cog.generate_mode_duration_embed(state), view=self.cog.generate_mode_duration_view(self.guild_id, state))
 
     def generate_mode_duration_embed(self, state: ServerState) -> discord.Embed:
         embed = discord.Embed(title="🎮 Difficulté & Durée", color=discord.Color.teal())
@@ -542,34 +557,30 @@ class AdminCog(commands.Cog):
             options = [discord.SelectOption(label=key.capitalize(), value=key, default=(key == current_difficulty)) for key in cog.DIFFICULTY_MULTIPLIERS.keys()]
             super().__init__(placeholder="Choisissez une difficulté...", options=options, row=0); self.guild_id, self.cog = guild_id, cog
         async def callback(self, interaction: discord.Interaction):
-            await interaction.response.defer(); db = SessionLocal()
-            try:
-                state = db.query(ServerState).filter_by(guild_id=self.guild_id).first(); state.game_mode = self.values[0]
-                self.cog._update_game_parameters(state); db.commit(); db.refresh(state)
-                await interaction.edit_original_response(embed=self.cog.generate_mode_duration_embed(state), view=self.cog.generate_mode_duration_view(self.guild_id, state))
-            finally: db.close()
+            await interaction.response.defer()
+            async with AsyncSessionLocal() as db:
+                state = await get_server_state(db, self.guild_id); state.game_mode = self.values[0]
+                await self.cog._update_game_parameters(db, state); await db.commit()
+            await interaction.edit_original_response(embed=self.cog.generate_mode_duration_embed(state), view=self.cog.generate_mode_duration_view(self.guild_id, state))
 
     class GameDurationSelect(ui.Select):
         def __init__(self, guild_id: str, cog: 'AdminCog', current_duration: str):
             options = [discord.SelectOption(label=data["label"], value=key, default=(key == current_duration)) for key, data in cog.DURATION_SETTINGS.items()]
             super().__init__(placeholder="Choisissez une durée...", options=options, row=1); self.guild_id, self.cog = guild_id, cog
         async def callback(self, interaction: discord.Interaction):
-            await interaction.response.defer(); db = SessionLocal()
-            try:
-                state = db.query(ServerState).filter_by(guild_id=self.guild_id).first(); state.duration_key = self.values[0]
-                self.cog._update_game_parameters(state); db.commit(); db.refresh(state)
-                await interaction.edit_original_response(embed=self.cog.generate_mode_duration_embed(state), view=self.cog.generate_mode_duration_view(self.guild_id, state))
-            finally: db.close()
+            await interaction.response.defer()
+            async with AsyncSessionLocal() as db:
+                state = await get_server_state(db, self.guild_id); state.duration_key = self.values[0]
+                await self.cog._update_game_parameters(db, state); await db.commit()
+            await interaction.edit_original_response(embed=self.cog.generate_mode_duration_embed(state), view=self.cog.generate_mode_duration_view(self.guild_id, state))
 
     class GeneralConfigButton(ui.Button):
         def __init__(self, label: str, guild_id: str, style: discord.ButtonStyle, row: int, cog: 'AdminCog', disabled: bool = False):
             super().__init__(label=label, style=style, row=row, disabled=disabled, emoji="⚙️"); self.guild_id, self.cog = guild_id, cog
         async def callback(self, interaction: discord.Interaction):
-            db = SessionLocal()
-            try:
-                state = db.query(ServerState).filter_by(guild_id=self.guild_id).one()
-                await interaction.response.edit_message(embed=self.cog.generate_role_and_channel_config_embed(state), view=self.cog.generate_general_config_view(self.guild_id, interaction.guild))
-            finally: db.close()
+            async with AsyncSessionLocal() as db:
+                state = await get_server_state(db, self.guild_id)
+            await interaction.response.edit_message(embed=self.cog.generate_role_and_channel_config_embed(state), view=self.cog.generate_general_config_view(self.guild_id, interaction.guild))
 
     def generate_role_and_channel_config_embed(self, state: ServerState) -> discord.Embed:
         embed = discord.Embed(title="⚙️ Rôles & Salons", color=discord.Color.purple())
@@ -619,15 +630,14 @@ class AdminCog(commands.Cog):
         def __init__(self, label: str, guild_id: str, style: discord.ButtonStyle, row: int, cog: 'AdminCog', target_menu: str = "main"):
             super().__init__(label=label, style=style, row=row, emoji="⬅️"); self.guild_id, self.cog, self.target_menu = guild_id, cog, target_menu
         async def callback(self, interaction: discord.Interaction):
-            await interaction.response.defer(); db = SessionLocal()
-            try:
-                state = db.query(ServerState).filter_by(guild_id=self.guild_id).first()
-                if self.target_menu == "notifications_config":
-                    embed, view = self.cog.generate_notifications_config_embed(state), self.cog.generate_notifications_config_view(self.guild_id, interaction.guild)
-                else:
-                    embed, view = self.cog.generate_config_menu_embed(state), self.cog.generate_config_menu_view(self.guild_id, interaction.guild, state)
-                await interaction.edit_original_response(embed=embed, view=view, content=None)
-            finally: db.close()
+            await interaction.response.defer()
+            async with AsyncSessionLocal() as db:
+                state = await get_server_state(db, self.guild_id)
+            if self.target_menu == "notifications_config":
+                embed, view = self.cog.generate_notifications_config_embed(state), self.cog.generate_notifications_config_view(self.guild_id, interaction.guild)
+            else:
+                embed, view = self.cog.generate_config_menu_embed(state), self.cog.generate_config_menu_view(self.guild_id, interaction.guild, state)
+            await interaction.edit_original_response(embed=embed, view=view, content=None)
 
     class ConfigButton(ui.Button):
         def __init__(self, label: str, emoji: str, guild_id: str, style: discord.ButtonStyle, row: int, cog: 'AdminCog'):
@@ -656,9 +666,9 @@ class AdminCog(commands.Cog):
                 return
             
             await interaction.response.defer()
-            db = SessionLocal()
+            db = AsyncSessionLocal()
             try:
-                state = db.query(ServerState).filter_by(guild_id=self.guild_id).first()
+                state = await get_server_state(db, self.guild_id)
                 if not state:
                     await interaction.followup.send("État du serveur introuvable.", ephemeral=True)
                     return
@@ -673,14 +683,14 @@ class AdminCog(commands.Cog):
                         logger.info(f"Starting new game in guild {self.guild_id}")
                         main_embed_cog = self.cog.bot.get_cog("MainEmbed")
                         cooker_brain = self.cog.bot.get_cog("CookerBrain")
-                        player = db.query(PlayerProfile).filter_by(guild_id=self.guild_id).first()
+                        player = await get_player(db, self.guild_id)
                         utc_now = get_utc_now()
                         
                         # Initialize game time and state
                         start_hour = state.game_day_start_hour or 9
                         state.game_start_time = utc_now
                         logger.info(f"Initializing game state at {start_hour}:00 localized time.")
-                        db.commit()
+                        await db.commit()
 
                         # Initialize new player if needed
                         if not player:
@@ -829,29 +839,37 @@ class AdminCog(commands.Cog):
                         state.game_start_time = prepare_for_db(utc_now)  # Store as naive UTC
                         state.is_test_mode = (state.duration_key == 'test')
                         
-                        db.commit()
-                        db.refresh(player)
-                        db.refresh(state)
+                        await db.commit()
+                        # Profil relu avec ses parties froides (le tableau de bord les affiche), puis connexion
+                        # rendue avant les appels à Discord : les objets restent lisibles une fois détachés
+                        player = await get_player(db, self.guild_id, refresh=True)
+                        await db.close()
                         
                         game_channel = await self.cog.bot.fetch_channel(state.game_channel_id)
-                        game_message = await game_channel.send(
-                            embed=await main_embed_cog.generate_dashboard_embed(player, state, interaction.guild),
-                            view=DashboardView(player)
-                        )
+                        dashboard_embed = await main_embed_cog.generate_dashboard_embed(player, state, interaction.guild)
+                        dashboard_view = DashboardView(player)
+                        game_message = await game_channel.send(embed=dashboard_embed, view=dashboard_view)
+                        db.add(state)
                         state.game_message_id = game_message.id
-                        db.commit()
+                        await db.commit()
+
+                        scheduler = self.cog.bot.get_cog("Scheduler")
+                        if scheduler:
+                            # Rendu envoyé retenu : le premier tick ne réédite pas un tableau de bord identique
+                            scheduler.dashboard_edited(game_channel.id, game_message.id, dashboard_embed, dashboard_view)
+                            scheduler.reschedule_guild(self.guild_id)
                         
                         followup_message = (f"✅ {message} Le jeu démarre dans {game_channel.mention} !", True)
 
                 elif "Notifications" in (self.label or ""):
-                    db.refresh(state) # Assurer que l'état est à jour avant de changer de vue
+                    await db.close()
                     embed = self.cog.generate_notifications_config_embed(state)
                     view = self.cog.generate_notifications_config_view(self.guild_id, interaction.guild)
                     await interaction.edit_original_response(embed=embed, view=view)
                     return # Pas de refresh général à la fin
 
                 # --- MISE À JOUR FINALE ET UNIVERSELLE DE L'INTERFACE ---
-                db.refresh(state)
+                await db.close()
                 embed = self.cog.generate_config_menu_embed(state)
                 view = self.cog.generate_config_menu_view(self.guild_id, interaction.guild, state)
                 await interaction.edit_original_response(embed=embed, view=view)
@@ -863,9 +881,9 @@ class AdminCog(commands.Cog):
                 logger.error(f"Erreur dans ConfigButton callback: {e}", exc_info=True)
                 if not interaction.is_expired():
                     await interaction.followup.send("Une erreur critique est survenue.", ephemeral=True)
-                db.rollback()
+                await db.rollback()
             finally:
-                db.close()
+                await db.close()
 
 async def setup(bot):
     await bot.add_cog(AdminCog(bot))
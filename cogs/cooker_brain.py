@@ -5,6 +5,7 @@ import datetime
 from db.models import PlayerProfile, ServerState
 from utils.helpers import clamp
 from utils.time_manager import is_night, is_work_time
+from utils import sim_clock
 from functools import wraps
 
 def get_attr_int(player: PlayerProfile, attr: str) -> int:
@@ -143,14 +144,13 @@ class CookerBrain(commands.Cog):
         # Si la volonté est > 85%, le joueur peut s'auto-motiver
         can_self_motivate = player.willpower > 85
             
-        # Vérifier qui initie l'action
-        if not can_self_motivate and player.last_action_by == str(player.user_id):
-            return "🏃‍♂️ Vous avez besoin de motivation ! Demandez à quelqu'un de vous accompagner.", {"confused": True}, 0
+        # Pas de vérification de l'initiateur : le profil est celui du serveur (pas de user_id)
+        # et last_action_by n'est jamais renseigné, l'action compte donc comme encouragée par les autres.
 
         # Appliquer les effets positifs
         player.energy = max(10, player.energy - 20)  # Fatigue mais pas trop
         player.health = min(100, player.health + 15)
-        player.sanity = min(100, player.sanity + 10)
+        player.emotional_stability = min(100, player.emotional_stability + 10)  # Santé mentale (PlayerProfile n'a pas de sanity)
         player.stress = max(0, player.stress - 15)
         player.boredom = max(0, player.boredom - 25)
         player.willpower = min(100, player.willpower + 5)
@@ -171,7 +171,7 @@ class CookerBrain(commands.Cog):
     @check_not_working
     def perform_check_phone(self, player: PlayerProfile) -> Tuple[str, Dict, int]:
         """Check phone to reduce boredom and potentially increase happiness"""
-        if is_night(datetime.datetime.now()):
+        if is_night(sim_clock.now()):
             # Checking phone at night increases stress
             player.stress = min(100, player.stress + 10)
             player.energy = max(0, player.energy - 5)
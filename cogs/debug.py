@@ -5,6 +5,10 @@ from db.database import SessionLocal
 from db.models import ServerState, PlayerProfile
 from utils.logger import get_logger
 from utils.time_manager import prepare_for_db
+from utils.scheduler_utils import materialize_linear_stats
+from utils import sim_clock
+from utils.rule_profiler import PROFILER as RULE_PROFILER
+from db.write_behind import PLAYER_STATES
 import datetime
 import pytz
 
@@ -59,6 +63,9 @@ class DebugCommandsCog(commands.GroupCog, name="dev"):
             server.game_tick_interval_minutes = 1  # Update every minute instead of every 30 minutes
             
             db.commit()
+            scheduler = self.bot.get_cog("Scheduler")
+            if scheduler:
+                scheduler.reschedule_guild(str(interaction.guild_id))
             await interaction.response.send_message("✅ Mode accéléré activé ! (1 minute réelle = 2 heures en jeu)", ephemeral=True)
         except Exception as e:
             db.rollback()
@@ -83,6 +90,9 @@ class DebugCommandsCog(commands.GroupCog, name="dev"):
             server.duration_key = 'real_time'
             
             db.commit()
+            scheduler = self.bot.get_cog("Scheduler")
+            if scheduler:
+                scheduler.reschedule_guild(str(interaction.guild_id))
             await interaction.response.send_message("✅ Mode normal réactivé (temps réel 1:1)", ephemeral=True)
         except Exception as e:
             db.rollback()
@@ -116,6 +126,11 @@ class DebugCommandsCog(commands.GroupCog, name="dev"):
             now = datetime.datetime.now(pytz.UTC)
             target_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
             
+            # Les besoins sont matérialisés à l'ancienne vitesse avant d'en changer
+            player = db.query(PlayerProfile).filter_by(guild_id=str(interaction.guild_id)).first()
+            if player:
+                materialize_linear_stats(server, player, sim_clock.utcnow())
+
             # Configurer la vitesse du temps
             if speed == 1:
                 server.duration_key = 'real_time'
@@ -128,6 +143,9 @@ class DebugCommandsCog(commands.GroupCog, name="dev"):
             server.game_tick_interval_minutes = max(1, 30 // speed)  # Ajuster la fréquence des mises à jour
             
             db.commit()
+            scheduler = self.bot.get_cog("Scheduler")
+            if scheduler:
+                scheduler.reschedule_guild(str(interaction.guild_id))
             await interaction.response.send_message(
                 f"✅ Heure du jeu réglée sur {hour:02d}:{minute:02d}\n"
                 f"Vitesse: x{speed} (1 minute réelle = {speed} minutes en jeu)",
@@ -242,5 +260,62 @@ class DebugCommandsCog(commands.GroupCog, name="dev"):
         finally:
             db.close()
 
+    @app_commands.command(name="dev_rule_profile", description="[DEBUG] Profil des réactions en chaîne (temps par section, branches)")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.describe(action="Afficher le profil, activer, désactiver ou remettre à zéro le profilage")
+    @app_commands.choices(action=[
+        app_commands.Choice(name='Afficher', value='show'),
+        app_commands.Choice(name='Activer', value='start'),
+        app_commands.Choice(name='Désactiver', value='stop'),
+        app_commands.Choice(name='Remettre à zéro', value='reset'),
+    ])
+    async def rule_profile(self, interaction: discord.Interaction, action: str = 'show'):
+        if action == 'start':
+            RULE_PROFILER.reset()
+            RULE_PROFILER.enabled = True
+            await interaction.response.send_message("✅ Profilage des règles activé (compteurs remis à zéro).", ephemeral=True)
+            return
+        if action == 'stop':
+            RULE_PROFILER.enabled = False
+        elif action == 'reset':
+            RULE_PROFILER.reset()
+
+        snapshot = RULE_PROFILER.snapshot()
+        state = "actif" if snapshot["enabled"] else "inactif"
+        if not snapshot["evaluations"]:
+            await interaction.response.send_message(f"📊 Profilage {state} : aucune évaluation enregistrée.", ephemeral=True)
+            return
+        lines = [f"{'Section':<18}{'ms':>10}{'part':>8}{'µs/éval.':>10}"]
+        for name, values in snapshot["sections"].items():
+            lines.append(f"{name:<18}{values['ms']:>10.1f}{values['share']:>8.0%}{values['us_per_evaluation']:>10.2f}")
+        lines.append("")
+        lines.append(f"{'Branche':<26}{'déclenchements':>16}{'taux':>8}")
+        for name, values in list(snapshot["branches"].items())[:20]:
+            lines.append(f"{name:<26}{values['hits']:>16}{values['rate']:>8.1%}")
+        table = "\n".join(lines)
+        await interaction.response.send_message(
+            f"📊 Profilage {state} : {snapshot['evaluations']} évaluation(s), {snapshot['calls']} appel(s) "
+            f"sur {snapshot['window_seconds']:.0f} s\n```\n{table}\n```",
+            ephemeral=True
+        )
+
+    @app_commands.command(name="dev_write_behind", description="[DEBUG] Écriture différée des profils (métriques, flush immédiat)")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.describe(action="Afficher les métriques ou écrire tout de suite les profils en attente")
+    @app_commands.choices(action=[
+        app_commands.Choice(name='Afficher', value='show'),
+        app_commands.Choice(name='Écrire maintenant', value='flush'),
+    ])
+    async def write_behind(self, interaction: discord.Interaction, action: str = 'show'):
+        header = ""
+        if action == 'flush':
+            scheduler = self.bot.get_cog("Scheduler")
+            rows = await scheduler.checkpoint_player_states() if scheduler else PLAYER_STATES.flush()
+            header = f"✅ {rows} profil(s) écrit(s) en base.\n"
+        snapshot = PLAYER_STATES.snapshot()
+        state = "active" if snapshot["enabled"] else "inactive"
+        table = "\n".join(f"{key:<24}{value:>14}" for key, value in snapshot.items() if key != "enabled")
+        await interaction.response.send_message(f"{header}💾 Écriture différée {state}\n```\n{table}\n```", ephemeral=True)
+
 async def setup(bot):
     await bot.add_cog(DebugCommandsCog(bot))
@@ -1,9 +1,11 @@
 import discord
 from discord.ext import commands
 from discord import ui
-from db.models import PlayerProfile
-from db.database import SessionLocal
-from sqlalchemy import text
+from sqlalchemy import update
+from sqlalchemy.orm.attributes import set_committed_value
+from db.models import PlayerProfile, PlayerInventory
+from db.database import AsyncSessionLocal
+from db.queries import get_player
 
 def check_inventory(player: PlayerProfile) -> dict:
     """Helper function to safely get inventory values"""
@@ -96,123 +98,69 @@ class CraftSelect(ui.Select):
             await interaction.followup.send("Vous n'avez pas les items nécessaires pour crafter.", ephemeral=True)
             return
 
-        db = SessionLocal()
+        # Session asynchrone : les requêtes ne bloquent pas la boucle asyncio
+        db = AsyncSessionLocal()
         try:
-            player = db.query(PlayerProfile).filter_by(guild_id=str(interaction.guild_id)).first()
+            player = await get_player(db, interaction.guild_id, cold=("inventory",))
             if not player:
                 await interaction.followup.send("Erreur: Profil introuvable.", ephemeral=True)
                 return
 
             inventory = check_inventory(player)
-            craft_success = False
+            # Variation de chaque colonne de l'inventaire (quantités consommées en négatif)
+            changes = {}
             message = ""
 
             if self.values[0] == "craft_joint_weed":
                 if inventory['weed_grams'] >= 1 and inventory['rolling_papers'] >= 1 and inventory['toncs'] >= 1:
                     bonus = 1.1 if inventory['has_grinder'] else 1.0
-                    db.execute(
-                        text("""
-                        UPDATE player_profile 
-                        SET joints = joints + :bonus_joints,
-                            weed_grams = weed_grams - 1,
-                            rolling_papers = rolling_papers - 1,
-                            toncs = toncs - 1,
-                            joints_crafted = joints_crafted + 1
-                        WHERE guild_id = :guild_id
-                        """),
-                        {
-                            'bonus_joints': int(1 * bonus),
-                            'guild_id': str(interaction.guild_id)
-                        }
-                    )
-                    craft_success = True
+                    changes = {'joints': int(1 * bonus), 'weed_grams': -1, 'rolling_papers': -1, 'toncs': -1, 'joints_crafted': 1}
                     message = f"Joint crafté avec succès! {'(Bonus grinder appliqué)' if inventory['has_grinder'] else ''}"
 
             elif self.values[0] == "craft_joint_hash":
                 if inventory['hash_grams'] >= 1 and inventory['rolling_papers'] >= 1 and inventory['toncs'] >= 1:
-                    db.execute(
-                        text("""
-                        UPDATE player_profile 
-                        SET joints = joints + 1,
-                            hash_grams = hash_grams - 1,
-                            rolling_papers = rolling_papers - 1,
-                            toncs = toncs - 1,
-                            joints_crafted = joints_crafted + 1
-                        WHERE guild_id = :guild_id
-                        """),
-                        {'guild_id': str(interaction.guild_id)}
-                    )
-                    craft_success = True
+                    changes = {'joints': 1, 'hash_grams': -1, 'rolling_papers': -1, 'toncs': -1, 'joints_crafted': 1}
                     message = "Joint de hash crafté avec succès!"
 
             elif self.values[0] == "prepare_bong":
                 if inventory['weed_grams'] >= 1 or inventory['hash_grams'] >= 1:
-                    if inventory['weed_grams'] >= 1:
-                        db.execute(
-                            text("""
-                            UPDATE player_profile 
-                            SET weed_grams = weed_grams - 1,
-                                bong_uses = bong_uses + 1
-                            WHERE guild_id = :guild_id
-                            """),
-                            {'guild_id': str(interaction.guild_id)}
-                        )
-                    else:
-                        db.execute(
-                            text("""
-                            UPDATE player_profile 
-                            SET hash_grams = hash_grams - 1,
-                                bong_uses = bong_uses + 1
-                            WHERE guild_id = :guild_id
-                            """),
-                            {'guild_id': str(interaction.guild_id)}
-                        )
-                    craft_success = True
+                    grams = 'weed_grams' if inventory['weed_grams'] >= 1 else 'hash_grams'
+                    changes = {grams: -1, 'bong_uses': 1}
                     message = "Bong préparé avec succès!"
 
             elif self.values[0] == "prepare_chillum":
                 if inventory['weed_grams'] >= 1 or inventory['hash_grams'] >= 1:
-                    if inventory['weed_grams'] >= 1:
-                        db.execute(
-                            text("""
-                            UPDATE player_profile 
-                            SET weed_grams = weed_grams - 1,
-                                chillum_uses = chillum_uses + 1
-                            WHERE guild_id = :guild_id
-                            """),
-                            {'guild_id': str(interaction.guild_id)}
-                        )
-                    else:
-                        db.execute(
-                            text("""
-                            UPDATE player_profile 
-                            SET hash_grams = hash_grams - 1,
-                                chillum_uses = chillum_uses + 1
-                            WHERE guild_id = :guild_id
-                            """),
-                            {'guild_id': str(interaction.guild_id)}
-                        )
-                    craft_success = True
+                    grams = 'weed_grams' if inventory['weed_grams'] >= 1 else 'hash_grams'
+                    changes = {grams: -1, 'chillum_uses': 1}
                     message = "Chillum préparé avec succès!"
 
             elif self.values[0] == "prepare_vaporizer":
                 if inventory['weed_grams'] >= 1:
-                    db.execute(
-                        text("""
-                        UPDATE player_profile 
-                        SET weed_grams = weed_grams - 1,
-                            vaporizer_uses = vaporizer_uses + 1
-                        WHERE guild_id = :guild_id
-                        """),
-                        {'guild_id': str(interaction.guild_id)}
-                    )
-                    craft_success = True
+                    changes = {'weed_grams': -1, 'vaporizer_uses': 1}
                     message = "Vaporisateur préparé avec succès!"
 
+            craft_success = False
+            if changes:
+                # Incréments atomiques en SQL (l'inventaire est une partie froide, hors écriture différée) :
+                # deux crafts simultanés ne perdent aucune mise à jour, et le WHERE revérifie les quantités consommées.
+                statement = (
+                    update(PlayerInventory)
+                    .where(PlayerInventory.player_id == player.id,
+                           *(getattr(PlayerInventory, key) >= -delta for key, delta in changes.items() if delta < 0))
+                    .values({key: getattr(PlayerInventory, key) + delta for key, delta in changes.items()})
+                    .returning(*(getattr(PlayerInventory, key) for key in changes))
+                    .execution_options(synchronize_session=False)
+                )
+                # Les nouvelles quantités reviennent avec l'UPDATE : pas de relecture de l'inventaire après le commit
+                updated = (await db.execute(statement)).first()
+                craft_success = updated is not None
+
             if craft_success:
-                db.commit()
-                # Rafraichir le joueur
-                player = db.query(PlayerProfile).filter_by(guild_id=str(interaction.guild_id)).first()
+                await db.commit()
+                for key, value in zip(changes, updated):
+                    set_committed_value(player.inventory, key, value)
+                # Rendre la connexion avant les appels à Discord
+                await db.close()
                 await interaction.followup.send(message, ephemeral=True)
                 # Re-afficher l'inventaire mis à jour
                 try:
@@ -232,13 +180,14 @@ class CraftSelect(ui.Select):
                         view=InventoryView(player)
                     )
             else:
+                await db.close()
                 await interaction.followup.send("Erreur: Items insuffisants pour le craft.", ephemeral=True)
 
         except Exception as e:
             await interaction.followup.send(f"Une erreur est survenue: {str(e)}", ephemeral=True)
-            db.rollback()
+            await db.rollback()
         finally:
-            db.close()
+            await db.close()
 
 class InventoryView(ui.View):
     def __init__(self, player: PlayerProfile):
@@ -1,10 +1,15 @@
 # --- cogs/phone.py ---
+import datetime
+import json
 import discord
 from discord.ext import commands
 from discord import ui
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from db.models import PlayerProfile, ServerState
-from utils.helpers import get_player_notif_settings
+from db.write_behind import PLAYER_STATES
+from utils.helpers import clamp, get_player_notif_settings
+from utils.scheduler_utils import materialize_linear_stats
+from utils import sim_clock
 from utils.error_handler import GameError
 from utils.logger import get_logger
 from .smoke_shop import SmokeShopView
@@ -164,14 +169,14 @@ class Phone(commands.Cog):
         except Exception:
             pass  # Silently handle any image loading errors
 
-    def check_phone_usage(self, player: PlayerProfile, db: Session) -> tuple[bool, str]:
+    async def check_phone_usage(self, player: PlayerProfile, db: AsyncSession) -> tuple[bool, str]:
         now = datetime.datetime.utcnow()
         
         # Reset le compteur si c'est un nouveau jour
         if not player.last_phone_reset_at or (now - player.last_phone_reset_at).days >= 1:
             player.phone_uses_today = 0
             player.last_phone_reset_at = now
-            db.commit()
+            await PLAYER_STATES.commit_async(db)
         
         # Incrémenter le compteur
         player.phone_uses_today += 1
@@ -188,7 +193,7 @@ class Phone(commands.Cog):
             
             warning = f"⚠️ Utilisation excessive du téléphone! (-{penalty_multiplier*100:.0f}% santé/sanité/énergie)"
             
-        db.commit()
+        await PLAYER_STATES.commit_async(db)
         return player.phone_uses_today > 5, warning
 
     def generate_phone_main_embed(self, player: PlayerProfile, main_embed_cog: commands.Cog) -> discord.Embed:
@@ -230,7 +235,7 @@ class Phone(commands.Cog):
         self._add_main_image(embed, player, main_embed_cog)
         return embed
 
-    async def handle_interaction(self, interaction: discord.Interaction, db: Session, player: PlayerProfile, state: ServerState, main_embed_cog: commands.Cog):
+    async def handle_interaction(self, interaction: discord.Interaction, db: AsyncSession, player: PlayerProfile, state: ServerState, main_embed_cog: commands.Cog):
         if not interaction.response.is_done():
             await interaction.response.defer()
 
@@ -238,10 +243,13 @@ class Phone(commands.Cog):
             return
             
         custom_id = interaction.data.get("custom_id", "")
+
+        # Besoins (ennui...) amenés à l'heure courante avant de les lire ou de les modifier
+        materialize_linear_stats(state, player, sim_clock.utcnow())
         
         # Si c'est l'ouverture initiale du téléphone
         if custom_id == "phone_open":
-            excessive, warning = self.check_phone_usage(player, db)
+            excessive, warning = await self.check_phone_usage(player, db)
             if warning:
                 await interaction.followup.send(warning, ephemeral=True)
         
@@ -275,7 +283,7 @@ class Phone(commands.Cog):
             settings = get_player_notif_settings(player)
             settings[key_to_toggle] = not settings.get(key_to_toggle, True)
             player.notifications_config = json.dumps(settings)
-            db.commit(); db.refresh(player)
+            await PLAYER_STATES.commit_async(db); await db.refresh(player)
             embed = self.generate_settings_embed(player, main_embed_cog)
             view = SettingsView(player, settings)
             await interaction.edit_original_response(embed=embed, view=view)
@@ -291,7 +299,7 @@ class Phone(commands.Cog):
             if item and player.wallet >= item["cost"]:
                 player.wallet -= item["cost"]
                 item["action"](player)
-                db.commit(); db.refresh(player)
+                await PLAYER_STATES.commit_async(db); await db.refresh(player)
                 await interaction.followup.send(f'✅ {item["msg"]}', ephemeral=True)
                 await interaction.edit_original_response(embed=self.generate_phone_main_embed(player, main_embed_cog), view=PhoneMainView(player))
             else:
@@ -313,7 +321,7 @@ class Phone(commands.Cog):
             now = datetime.datetime.utcnow()
             player.action_cooldown_end_time = now + datetime.timedelta(seconds=effects["duration"])
 
-            db.commit()
+            await PLAYER_STATES.commit_async(db)
             await interaction.followup.send(f"📱 {effects['message']}", ephemeral=True)
 
             # Return to phone main view after browsing
@@ -2,44 +2,178 @@
 
 import discord
 from discord.ext import commands, tasks
-from db.database import SessionLocal
-from db.models import ServerState, PlayerProfile
+from db.database import SessionLocal, engine, checkpoint_wal
+from db.write_behind import PLAYER_STATES
+from db.models import ServerState, PlayerProfile, loaded_cold_parts
+import asyncio
 import datetime
+import time
 import traceback
-from utils.calculations import chain_reactions, update_job_performance
-from utils.helpers import clamp, get_player_notif_settings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from config import (
+    TICK_CONCURRENCY, TICK_GUILD_TIMEOUT_SECONDS, DUE_QUEUE_SYNC_MINUTES,
+    TICK_BUDGET_SECONDS, TICK_SLOW_GUILD_SECONDS, TICK_BACKOFF_MAX_MINUTES,
+    CATCHUP_MAX_STEPS, CATCHUP_SPREAD_MINUTES, WRITEBACK_TOLERANCE, RULE_GROUP_PERIODS,
+    OUTBOX_CHANNEL_RATE_PER_SECOND, OUTBOX_CHANNEL_BURST, RULE_PROFILER_LOG_MINUTES,
+    SQLITE_WAL_CHECKPOINT_MINUTES, WRITE_BEHIND_ENABLED, WRITE_BEHIND_FLUSH_SECONDS,
+)
+from utils.calculations import advance_state, update_job_performance, is_linear_drift, LINEAR_STATS
+from utils.batch_calculations import advance_states_batch, SIMULATED_STATS
+from utils.helpers import clamp
+from utils.logger import get_logger
+from utils import sim_clock
+from utils.rule_profiler import PROFILER as RULE_PROFILER
+from utils.sim_profile import PROFILES as SIM_PROFILES, SimulationProfile
+from utils.sharding import owns_guild, owned_guild_filter
+from utils.outbox import NotificationOutbox, PRIORITY_CRITICAL, PRIORITY_INFO
+from utils.discord_cache import MessageHandleCache, render_fingerprint
+from utils.scheduler_utils import (
+    load_active_games, QueryCounter, run_bounded, DueQueue, tick_interval_minutes,
+    snapshot_row, GuildTickResult, LoopLagMonitor, GuildBackoff, TickWatchdog,
+    stat_evolution_inputs, apply_stat_changes, format_recent_logs, materialize_linear_stats,
+)
+from sqlalchemy.orm.attributes import set_committed_value, flag_modified
 from cogs.main_embed import DashboardView # Keep for UI refresh
 from utils.time_manager import get_current_game_time, is_work_time, is_night
 from cogs.cooker_brain import CookerBrain
 
+logger = get_logger(__name__)
+
 class Scheduler(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.tick.start()
         self.daily_check_done_for_day = -1
+        self.last_tick_query_count = 0
+        # Colonnes de stats réécrites au dernier tick (écritures différentielles)
+        self.last_tick_columns_written = 0
+        self._columns_written = 0
+        # Serveurs dont l'état en base est ancré à last_update (ticks de simple dérive linéaire non écrits),
+        # avec l'heure de leur dernière évaluation. Mémoire du thread DB ; perdue au redémarrage, l'état
+        # ancré est alors rejoué normalement (rattrapage).
+        self._lazy_guilds = {}
+        self.due_queue = DueQueue()
+        self._last_queue_sync = None
+        self.handles = MessageHandleCache(bot)
+        # Les notifications du tick passent par l'outbox : le tick ne fait plus d'envoi direct
+        self.outbox = NotificationOutbox(self.handles.get_channel, OUTBOX_CHANNEL_RATE_PER_SECOND, OUTBOX_CHANNEL_BURST, TICK_CONCURRENCY)
+        # Toute la phase DB du tick passe par ce thread unique : SQLite (commit, fsync)
+        # ne bloque plus la boucle asyncio, et les sessions ne sont jamais partagées entre threads.
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scheduler-db")
+        self.loop_lag = LoopLagMonitor()
+        self.backoff = GuildBackoff(TICK_BACKOFF_MAX_MINUTES * 60)
+        self.watchdog = TickWatchdog(TICK_BUDGET_SECONDS, TICK_SLOW_GUILD_SECONDS)
+        self._last_profile_log = time.monotonic()
+        self._last_wal_checkpoint = time.monotonic()
+        if WRITE_BEHIND_ENABLED:
+            self.flush_player_states.start()
         print("Scheduler tick task has been started.")
 
+    async def cog_load(self):
+        self.loop_lag.start()
+        self.outbox.start()
+
     def cog_unload(self):
         self.tick.cancel()
+        self.flush_player_states.cancel()
+        self.loop_lag.stop()
+        self.outbox.stop()
+        self._db_executor.shutdown(wait=False)
+
+    async def _run_db(self, func, *args):
+        """Exécute une fonction bloquante (SQLAlchemy) dans le thread DB du Scheduler."""
+        return await asyncio.get_running_loop().run_in_executor(self._db_executor, func, *args)
 
-    async def _send_notification(self, channel: discord.TextChannel, player: PlayerProfile, title: str, message: str, role_id: int | None, notif_key: str):
-        settings = get_player_notif_settings(player)
-        if not settings.get(notif_key, True): return
-        if title in player.notification_history: return
-        embed = discord.Embed(title=title, description=message, color=discord.Color.orange())
-        content = f"<@&{role_id}>" if role_id else None
+    def reschedule_guild(self, guild_id: str):
+        """
+        Rend un serveur dû immédiatement (démarrage de partie, changement de vitesse du temps).
+        Appelé après le commit de la nouvelle configuration : son profil de simulation est recompilé
+        et son intervalle recalculé au prochain tick.
+        Ignoré si le serveur appartient à un shard géré par un autre processus.
+        """
+        if not owns_guild(guild_id):
+            return
+        SIM_PROFILES.invalidate(str(guild_id))
+        self.due_queue.schedule(str(guild_id), time.monotonic())
+        if self.tick.is_running():
+            self.tick.change_interval(seconds=1)
+
+    def _load_active_guild_ids(self) -> set:
+        """Thread DB : guild_id des parties actives des shards de ce processus (requête sur guild_id uniquement)."""
+        db = SessionLocal()
         try:
-            await channel.send(content=content, embed=embed)
-            player.notification_history += f"\n{title}"
-        except (discord.Forbidden, discord.HTTPException) as e:
-            print(f"Could not send notification to channel {channel.id}: {e}")
+            query = db.query(ServerState.guild_id).filter(ServerState.game_started == True)
+            shard_filter = owned_guild_filter(ServerState.guild_id)
+            if shard_filter is not None:
+                query = query.filter(shard_filter)
+            return {guild_id for (guild_id,) in query}
+        finally:
+            db.close()
+
+    def _sync_due_queue(self, active_ids: set, now: float):
+        """
+        Aligne la file des ticks sur la liste des parties actives.
+        À la première synchronisation (démarrage), les serveurs sont étalés sur CATCHUP_SPREAD_MINUTES
+        pour que leurs rattrapages ne tombent pas tous dans la même minute.
+        Les serveurs dont la partie est terminée quittent la file, et leur suivi d'échecs (backoff) est oublié.
+        """
+        new_ids = sorted(guild_id for guild_id in active_ids if guild_id not in self.due_queue)
+        spread = CATCHUP_SPREAD_MINUTES * 60 if self._last_queue_sync is None else 0
+        for index, guild_id in enumerate(new_ids):
+            self.due_queue.schedule(guild_id, now + spread * index / len(new_ids))
+        for guild_id in self.due_queue:
+            if guild_id not in active_ids:
+                self.due_queue.remove(guild_id)
+                self.backoff.forget(guild_id)
+        SIM_PROFILES.retain(active_ids)
+        self._last_queue_sync = now
+
+    def dashboard_edited(self, channel_id: int, message_id: int, embed: Optional[discord.Embed] = None,
+                         view: Optional[discord.ui.View] = None) -> None:
+        """
+        À appeler après toute modification du message de jeu hors du tick (interactions, administration).
+        Avec le rendu envoyé (`embed`, `view`), son empreinte devient la référence des ticks suivants ;
+        sans, elle est oubliée et le prochain tick réédite le message.
+        """
+        if embed is None:
+            self.handles.forget_fingerprint(channel_id, message_id)
+        else:
+            self.handles.remember_fingerprint(channel_id, message_id, render_fingerprint(embed, view))
+
+    @commands.Cog.listener()
+    async def on_interaction(self, interaction: discord.Interaction):
+        # Les boutons du tableau de bord modifient le message de jeu lui-même (edit_message) :
+        # le dernier rendu envoyé par le tick n'y est plus forcément affiché
+        if interaction.message is not None and interaction.channel_id is not None:
+            self.handles.forget_fingerprint(interaction.channel_id, interaction.message.id)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        self.handles.forget_message(payload.channel_id, payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        for message_id in payload.message_ids:
+            self.handles.forget_message(payload.channel_id, message_id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self.handles.forget_channel(channel.id)
+
+    def _schedule_next_wake(self):
+        """Règle le prochain réveil de la boucle sur la prochaine échéance (au plus 60 secondes)."""
+        next_due = self.due_queue.next_due()
+        delay = 60 if next_due is None else next_due - time.monotonic()
+        self.tick.change_interval(seconds=min(60, max(1, delay)))
 
-    async def _perform_autonomous_action(self, player: PlayerProfile, server_state: ServerState, action_func, action_key: str, *args, **kwargs):
+    def _perform_autonomous_action(self, player: PlayerProfile, outgoing: list, action_func, action_key: str, *args, **kwargs):
         """
-        Helper to perform an autonomous action, update player state, and notify.
+        Helper to perform an autonomous action, update player state, and queue the notification.
         This ensures that autonomous actions correctly trigger images and cooldowns.
+        The message itself is sent later, during the Discord phase of the tick.
         """
-        now = datetime.datetime.utcnow()
+        now = sim_clock.utcnow()
 
         # Do not perform an action if already on cooldown
         if player.action_cooldown_end_time and now < player.action_cooldown_end_time:
@@ -59,14 +193,342 @@ class Scheduler(commands.Cog):
         player.last_action_time = now
         player.action_cooldown_end_time = now + datetime.timedelta(seconds=duration)
 
-        # Send a notification to the channel
-        try:
-            channel = await self.bot.fetch_channel(int(server_state.game_channel_id))
-            await channel.send(f"🧠 Par automatisme, le cuisinier a décidé d'agir. ({message})", delete_after=15)
-        except (discord.NotFound, discord.Forbidden, ValueError):
-            pass  # Silently fail if channel is not found or no perms
+        outgoing.append({"priority": PRIORITY_INFO, "content": f"🧠 Par automatisme, le cuisinier a décidé d'agir. ({message})", "delete_after": 15})
         return True
 
+    def _simulate_events(self, server_state: ServerState, player: PlayerProfile, cooker_brain_cog: CookerBrain,
+                         profile: SimulationProfile) -> list:
+        """
+        Phase DB du tick pour un serveur, hors évolution des stats : actions autonomes et bilans quotidiens.
+        Ne fait aucun appel Discord ; retourne la liste des notifications à déposer dans l'outbox
+        (priorité et kwargs de `NotificationOutbox.enqueue`). `profile` : profil compilé du serveur
+        (heure de début de journée du bilan quotidien).
+        """
+        outgoing = []
+        now = sim_clock.utcnow()
+        game_time = get_current_game_time(server_state) # This is now a localized datetime object
+        # Calculate game day from start time
+        game_day = (now - server_state.game_start_time).days if server_state.game_start_time else 0
+
+        # --- AUTONOMOUS ACTIONS (High Willpower) ---
+        # The character will attempt to perform one essential action per tick if needed.
+        if player.willpower >= 70:
+            # Pass game_time to the action functions
+            # Auto go to work if it's time and not already working
+            if is_work_time(game_time) and not player.is_working:
+                self._perform_autonomous_action(player, outgoing, cooker_brain_cog.perform_go_to_work, "action_go_to_work", game_time)
+            # Auto go home if it's not work time but is currently working
+            elif not is_work_time(game_time) and player.is_working:
+                self._perform_autonomous_action(player, outgoing, cooker_brain_cog.perform_go_home, "action_go_home", game_time)
+            # Auto-eat when very hungry and has food
+            elif player.hunger > 80 and player.food_servings > 0:
+                self._perform_autonomous_action(player, outgoing, cooker_brain_cog.perform_eat_food, "eat_sandwich")
+            # Auto-sleep when very tired at night
+            elif is_night(game_time) and player.fatigue > 80:
+                self._perform_autonomous_action(player, outgoing, cooker_brain_cog.perform_sleep, "action_sleep", game_time)
+
+        if game_time.hour == profile.game_day_start_hour and self.daily_check_done_for_day != game_day:
+            self.daily_check_done_for_day = game_day
+            if player.last_worked_at is None or (sim_clock.utcnow().date() - player.last_worked_at.date()).days > 1:
+                player.missed_work_days += 1
+            else:
+                player.missed_work_days = 0
+
+            if player.missed_work_days >= 2:
+                player.job_performance = 0
+
+        if game_time.hour == 17 and game_time.minute >= 30:
+            if player.last_worked_at and player.last_worked_at.date() == sim_clock.utcnow().date():
+                if not player.has_completed_first_work_day:
+                    player.has_completed_first_work_day = True
+                    player.joints += 1
+                    player.has_unlocked_smokeshop = True
+                    player.first_day_reward_given = True
+
+                    friend_message = (
+                        "---\n"
+                        "**Alex** - 17:45\n"
+                        "Hey mec ! Comme promis, je t'ai laissé un petit cadeau dans ta boîte aux lettres... 🌿\n"
+                        "Histoire que tu te détendes après ta première journée ! Et si t'en veux d'autres,\n"
+                        "j'ai un pote qui tient une petite boutique pas loin. Je t'ai mis l'adresse sur ton tel.\n"
+                        "---"
+                    )
+                    player.messages = friend_message + "\n" + (player.messages or "")
+
+                    embed = discord.Embed(
+                        title="📱 Nouveau message",
+                        description="Votre téléphone vibre... Un message d'un ami !",
+                        color=discord.Color.green()
+                    )
+                    outgoing.append({"priority": PRIORITY_CRITICAL, "embed": embed, "delete_after": 10})
+
+                # Mise à jour des stats de travail de fin de journée
+                update_job_performance(player, game_time)
+
+                # Calcul du temps de travail effectif
+                work_time = (2.5 + 4.5) * 60  # 7h de travail théorique
+                lost_time = player.total_minutes_late + player.total_break_time
+                effective_work_time = work_time - lost_time
+                player.total_work_time += effective_work_time
+
+                # Envoi d'un rapport de fin de journée
+                embed = discord.Embed(
+                    title="📊 Rapport de fin de journée",
+                    description="Voici le bilan de votre journée de travail :",
+                    color=discord.Color.blue()
+                )
+
+                # Stats de la journée
+                perf_emoji = "🟢" if player.job_performance >= 80 else "🟡" if player.job_performance >= 50 else "🔴"
+                embed.add_field(
+                    name="Performance",
+                    value=f"{perf_emoji} {int(player.job_performance)}%",
+                    inline=True
+                )
+
+                embed.add_field(
+                    name="Temps perdu",
+                    value=f"⏰ Retards: {player.total_minutes_late}min\n☕ Pauses: {player.total_break_time}min",
+                    inline=True
+                )
+
+                embed.add_field(
+                    name="Temps de travail effectif",
+                    value=f"⚡ {int(effective_work_time)}min / {int(work_time)}min",
+                    inline=True
+                )
+
+                outgoing.append({"priority": PRIORITY_CRITICAL, "embed": embed, "delete_after": 30})
+
+            # Send notification about new message if possible
+            embed = discord.Embed(
+                title="📱 Nouveau message",
+                description="Votre téléphone vibre... Un message d'un ami !",
+                color=discord.Color.green()
+            )
+            outgoing.append({"priority": PRIORITY_INFO, "embed": embed, "delete_after": 10})
+
+        return outgoing
+
+    def _apply_stats(self, server_state: ServerState, player: PlayerProfile, before: dict, updated_state: dict,
+                     new_logs: list, steps: int, now: datetime.datetime) -> int:
+        """Reporte les stats calculées (écriture différentielle) ; retourne le nombre de colonnes écrites."""
+        elapsed_minutes = (now - player.last_update).total_seconds() / 60
+        # Un tick normal compte déjà plusieurs pas : seul un tick manqué est un rattrapage
+        if elapsed_minutes >= 2 * SIM_PROFILES.get(server_state).tick_interval_minutes:
+            logger.info(f"Serveur {server_state.guild_id}: rattrapage de {elapsed_minutes:.0f} min en {steps} pas.")
+        return apply_stat_changes(player, before, updated_state, new_logs, now, WRITEBACK_TOLERANCE)
+
+    def _settle_stats(self, server_state: ServerState, player: PlayerProfile, before: dict, updated_state: dict,
+                      new_logs: list, steps: int, now: datetime.datetime, inputs: tuple,
+                      materialized: bool, events_changed: bool) -> int:
+        """
+        Écriture paresseuse des stats d'un tick. Si le tick n'a produit que la dérive linéaire des besoins
+        (aucun événement, aucune réaction en chaîne, aucun seuil franchi), rien n'est écrit : la base garde
+        l'état ancré à last_update, évalué en forme close à la lecture (materialize_linear_stats).
+        Sinon l'état est matérialisé et écrit. Retourne le nombre de colonnes écrites.
+        """
+        degradation_per_minute, elapsed_minutes, _ = inputs
+        if (not events_changed and player.recent_logs == format_recent_logs(new_logs)
+                and is_linear_drift(before, updated_state, degradation_per_minute, elapsed_minutes, WRITEBACK_TOLERANCE)):
+            # Valeurs courantes en mémoire seulement (pour l'affichage du tableau de bord)
+            for stat in (*LINEAR_STATS, 'stomachache'):
+                set_committed_value(player, stat, updated_state[stat])
+            set_committed_value(player, 'last_update', now)
+            self._lazy_guilds[server_state.guild_id] = now
+            return 0
+        if materialized:
+            # Les besoins matérialisés en mémoire doivent partir en base avec le reste
+            for stat in (*LINEAR_STATS, 'stomachache'):
+                flag_modified(player, stat)
+        return self._apply_stats(server_state, player, before, updated_state, new_logs, steps, now)
+
+    def _simulate_guild(self, server_state: ServerState, player: PlayerProfile, cooker_brain_cog: CookerBrain,
+                        profile: SimulationProfile) -> list:
+        """
+        Phase DB complète du tick pour un seul serveur (chemin scalaire) : événements,
+        dégradation des stats et réactions en chaîne. Retourne les notifications à envoyer.
+        L'état est toujours écrit : un état ancré (écriture paresseuse) est rejoué depuis last_update.
+        """
+        outgoing = self._simulate_events(server_state, player, cooker_brain_cog, profile)
+        now = sim_clock.utcnow()
+        degradation_per_minute, elapsed_minutes, step_minutes = stat_evolution_inputs(server_state, player, now, profile)
+        before = {stat: getattr(player, stat) for stat in SIMULATED_STATS}
+        updated_state, new_logs, steps = advance_state(
+            dict(before), degradation_per_minute, elapsed_minutes, step_minutes, now, player.last_smoked_at,
+            CATCHUP_MAX_STEPS, RULE_GROUP_PERIODS,
+        )
+        self._columns_written += self._apply_stats(server_state, player, before, updated_state, new_logs, steps, now)
+        return outgoing
+
+    def _simulate_batch(self, db, active_games: list, cooker_brain_cog: CookerBrain):
+        """
+        Simule tous les serveurs dus en une passe : événements serveur par serveur, puis
+        évolution des stats de tous les joueurs à la fois (moteur vectorisé NumPy).
+        Un serveur dont les événements échouent est rechargé depuis la base et exclu du tick.
+        Ne valide pas la transaction ; retourne les serveurs simulés et les serveurs en échec.
+        """
+        simulated, failures, lazy_flags, profiles = [], {}, {}, {}
+        for server_state, player in active_games:
+            profile = profiles[server_state.guild_id] = SIM_PROFILES.get(server_state)
+            interval_minutes = profile.tick_interval_minutes
+            started = time.perf_counter()
+            try:
+                # État ancré : les besoins sont d'abord amenés (en mémoire) à la dernière évaluation
+                evaluated_at = self._lazy_guilds.pop(server_state.guild_id, None)
+                materialized = evaluated_at is not None and materialize_linear_stats(
+                    server_state, player, evaluated_at, persist=False, profile=profile,
+                )
+                outgoing = self._simulate_events(server_state, player, cooker_brain_cog, profile)
+                lazy_flags[server_state.guild_id] = (materialized, db.is_modified(player))
+                simulated.append((server_state, player, interval_minutes, outgoing, time.perf_counter() - started))
+            except Exception as e:
+                logger.error(f"Erreur lors de la simulation du serveur {server_state.guild_id}: {e}", exc_info=True)
+                db.refresh(server_state)
+                db.refresh(player)
+                for part in loaded_cold_parts(player):
+                    db.refresh(part)
+                failures[server_state.guild_id] = (interval_minutes, time.perf_counter() - started)
+
+        if simulated:
+            started = time.perf_counter()
+            now = sim_clock.utcnow()
+            inputs = [stat_evolution_inputs(server_state, player, now, profiles[server_state.guild_id])
+                      for server_state, player, *_ in simulated]
+            befores = [{stat: getattr(player, stat) for stat in SIMULATED_STATS} for _, player, *_ in simulated]
+            cols, logs, steps = advance_states_batch(
+                befores,
+                [degradation_per_minute for degradation_per_minute, _, _ in inputs],
+                [elapsed_minutes for _, elapsed_minutes, _ in inputs],
+                [step_minutes for _, _, step_minutes in inputs],
+                now,
+                [player.last_smoked_at for _, player, *_ in simulated],
+                CATCHUP_MAX_STEPS,
+                RULE_GROUP_PERIODS,
+            )
+            columns = {stat: values.tolist() for stat, values in cols.items()}
+            for index, (server_state, player, *_) in enumerate(simulated):
+                updated_state = {stat: values[index] for stat, values in columns.items()}
+                materialized, events_changed = lazy_flags[server_state.guild_id]
+                self._columns_written += self._settle_stats(
+                    server_state, player, befores[index], updated_state, logs[index], int(steps[index]), now,
+                    inputs[index], materialized, events_changed,
+                )
+            # Le temps du calcul groupé est réparti entre les serveurs pour le watchdog
+            share = (time.perf_counter() - started) / len(simulated)
+            simulated = [(server_state, player, interval_minutes, outgoing, duration + share)
+                         for server_state, player, interval_minutes, outgoing, duration in simulated]
+        return simulated, failures
+
+    def _db_phase(self, due_guilds: list, cooker_brain_cog: CookerBrain):
+        """
+        Thread DB : charge et simule les serveurs dus, avec une session propre au thread.
+        Les serveurs sont simulés en lot et validés en une seule transaction. Si cette validation
+        échoue, le lot est annulé et rejoué serveur par serveur, chacun dans sa propre transaction :
+        une erreur n'annule alors que ce serveur.
+        Retourne les copies détachées (GuildTickResult) des serveurs traités, les serveurs en échec
+        ({guild_id: (intervalle en minutes, durée)}) et le nombre de requêtes SQL exécutées.
+        """
+        # expire_on_commit=False : les commits par serveur ne doivent pas forcer
+        # un rechargement (une requête par objet) des serveurs suivants.
+        db = SessionLocal(expire_on_commit=False)
+        query_counter = QueryCounter(engine)
+        try:
+            with query_counter:
+                active_games = load_active_games(db, due_guilds)
+                try:
+                    self._columns_written = 0
+                    simulated, failures = self._simulate_batch(db, active_games, cooker_brain_cog)
+                    # Profils joueurs : écriture différée (journal, puis flush groupé)
+                    PLAYER_STATES.commit(db)
+                except Exception as e:
+                    db.rollback()
+                    logger.warning(f"Échec de la simulation groupée ({e}), reprise serveur par serveur.", exc_info=True)
+                    self._columns_written = 0
+                    simulated, failures = self._simulate_each(db, active_games, cooker_brain_cog)
+                self.last_tick_columns_written = self._columns_written
+                results = [
+                    GuildTickResult(
+                        guild_id=server_state.guild_id,
+                        server_state=snapshot_row(server_state),
+                        player=snapshot_row(player),
+                        interval_minutes=interval_minutes,
+                        outgoing=outgoing,
+                        duration=duration,
+                    )
+                    for server_state, player, interval_minutes, outgoing, duration in simulated
+                ]
+        finally:
+            db.close()
+        return results, failures, query_counter.count
+
+    def _simulate_each(self, db, active_games: list, cooker_brain_cog: CookerBrain):
+        """Chemin de repli : chaque serveur est simulé (chemin scalaire) et validé dans sa propre transaction."""
+        simulated, failures = [], {}
+        for server_state, player in active_games:
+            guild_id = server_state.guild_id
+            started = time.perf_counter()
+            profile = None
+            try:
+                profile = SIM_PROFILES.get(server_state)
+                outgoing = self._simulate_guild(server_state, player, cooker_brain_cog, profile)
+                PLAYER_STATES.commit(db)
+                simulated.append((server_state, player, profile.tick_interval_minutes, outgoing, time.perf_counter() - started))
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Erreur lors de la simulation du serveur {guild_id}: {e}", exc_info=True)
+                interval_minutes = profile.tick_interval_minutes if profile else tick_interval_minutes(server_state)
+                failures[guild_id] = (interval_minutes, time.perf_counter() - started)
+        return simulated, failures
+
+    async def _refresh_guild(self, result: GuildTickResult, main_embed_cog):
+        """
+        Phase Discord du tick pour un serveur : dépose les notifications dans l'outbox
+        puis met à jour le message du tableau de bord.
+        Salon et message passent par le cache de handles : en régime établi,
+        la mise à jour du tableau de bord ne coûte qu'un appel REST (l'édition).
+        """
+        server_state, player = result.server_state, result.player
+        if not server_state.game_channel_id:
+            return
+
+        for notice in result.outgoing:
+            self.outbox.enqueue(server_state.game_channel_id, **notice)
+
+        # --- UI REFRESH ---
+        try:
+            guild = self.bot.get_guild(int(server_state.guild_id))
+            if guild and server_state.game_message_id:
+                game_message = await self.handles.get_message(server_state.game_channel_id, server_state.game_message_id)
+                if game_message is None:
+                    return  # Message de jeu supprimé
+                new_embed = await main_embed_cog.generate_dashboard_embed(player, server_state, guild)
+                new_view = DashboardView(player)
+                # Pas d'édition si le rendu est identique au dernier envoyé (économise le rate-limit)
+                fingerprint = render_fingerprint(new_embed, new_view)
+                if self.handles.is_unchanged(server_state.game_channel_id, server_state.game_message_id, fingerprint):
+                    return
+                await game_message.edit(embed=new_embed, view=new_view)
+                self.handles.remember_fingerprint(server_state.game_channel_id, server_state.game_message_id, fingerprint)
+        except discord.NotFound:
+            self.handles.forget_message(server_state.game_channel_id, server_state.game_message_id)
+        except discord.Forbidden:
+            pass
+
+    async def checkpoint_player_states(self) -> int:
+        """
+        Écrit les profils joueurs en attente (écriture différée) dans le thread DB, donc jamais pendant
+        la phase DB d'un tick. Retourne le nombre de profils écrits.
+        """
+        return await self._run_db(PLAYER_STATES.flush)
+
+    @tasks.loop(seconds=WRITE_BEHIND_FLUSH_SECONDS)
+    async def flush_player_states(self):
+        try:
+            await self.checkpoint_player_states()
+        except Exception as e:
+            logger.error(f"Écriture différée : flush en échec: {e}", exc_info=True)
+
     @tasks.loop(minutes=1)
     async def tick(self):
         main_embed_cog = self.bot.get_cog("MainEmbed")
@@ -74,178 +536,90 @@ class Scheduler(commands.Cog):
         if not main_embed_cog or not cooker_brain_cog:
             return
 
-        db = SessionLocal()
+        # --- PHASE 1 : DB & SIMULATION (thread DB, sans appel Discord) ---
+        # Seuls les serveurs dont l'échéance est passée sont chargés et simulés.
+        # La file des échéances n'est manipulée que depuis la boucle asyncio.
+        now = time.monotonic()
+        tick_started = time.perf_counter()
+        refreshes, intervals = {}, {}
+        due_guilds = []
         try:
-            active_games = db.query(ServerState).filter(ServerState.game_started == True).all()
-            for server_state in active_games:
-                player = db.query(PlayerProfile).filter_by(guild_id=server_state.guild_id).first()
-                if not player: continue
-
-                now = datetime.datetime.utcnow()
-                game_time = get_current_game_time(server_state) # This is now a localized datetime object
-                # Calculate game day from start time
-                game_day = (now - server_state.game_start_time).days if server_state.game_start_time else 0
-
-                # --- AUTONOMOUS ACTIONS (High Willpower) ---
-                # The character will attempt to perform one essential action per tick if needed.
-                if player.willpower >= 70:
-                    # Pass game_time to the action functions
-                    # Auto go to work if it's time and not already working
-                    if is_work_time(game_time) and not player.is_working:
-                        await self._perform_autonomous_action(player, server_state, cooker_brain_cog.perform_go_to_work, "action_go_to_work", game_time)
-                    # Auto go home if it's not work time but is currently working
-                    elif not is_work_time(game_time) and player.is_working:
-                        await self._perform_autonomous_action(player, server_state, cooker_brain_cog.perform_go_home, "action_go_home", game_time)
-                    # Auto-eat when very hungry and has food
-                    elif player.hunger > 80 and player.food_servings > 0:
-                        await self._perform_autonomous_action(player, server_state, cooker_brain_cog.perform_eat_food, "eat_sandwich")
-                    # Auto-sleep when very tired at night
-                    elif is_night(game_time) and player.fatigue > 80:
-                        await self._perform_autonomous_action(player, server_state, cooker_brain_cog.perform_sleep, "action_sleep", game_time)
-
-                if game_time.hour == server_state.game_day_start_hour and self.daily_check_done_for_day != game_day:
-                    self.daily_check_done_for_day = game_day
-                    if player.last_worked_at is None or (datetime.datetime.utcnow().date() - player.last_worked_at.date()).days > 1:
-                        player.missed_work_days += 1
-                    else:
-                        player.missed_work_days = 0
-
-                    if player.missed_work_days >= 2:
-                        player.job_performance = 0
-
-                if game_time.hour == 17 and game_time.minute >= 30:
-                    if player.last_worked_at and player.last_worked_at.date() == datetime.datetime.utcnow().date():
-                        if not player.has_completed_first_work_day:
-                            player.has_completed_first_work_day = True
-                            player.joints += 1
-                            player.has_unlocked_smokeshop = True
-                            player.first_day_reward_given = True
-                            
-                            friend_message = (
-                                "---\n"
-                                "**Alex** - 17:45\n"
-                                "Hey mec ! Comme promis, je t'ai laissé un petit cadeau dans ta boîte aux lettres... 🌿\n"
-                                "Histoire que tu te détendes après ta première journée ! Et si t'en veux d'autres,\n"
-                                "j'ai un pote qui tient une petite boutique pas loin. Je t'ai mis l'adresse sur ton tel.\n"
-                                "---"
-                            )
-                            player.messages = friend_message + "\n" + (player.messages or "")
-                            
-                            try:
-                                channel = await self.bot.fetch_channel(int(server_state.game_channel_id))
-                                embed = discord.Embed(
-                                    title="📱 Nouveau message",
-                                    description="Votre téléphone vibre... Un message d'un ami !",
-                                    color=discord.Color.green()
-                                )
-                                await channel.send(embed=embed, delete_after=10)
-                            except (discord.NotFound, discord.Forbidden, ValueError):
-                                pass
-
-                        # Mise à jour des stats de travail de fin de journée
-                        update_job_performance(player, game_time)
-                        
-                        # Calcul du temps de travail effectif
-                        work_time = (2.5 + 4.5) * 60  # 7h de travail théorique
-                        lost_time = player.total_minutes_late + player.total_break_time
-                        effective_work_time = work_time - lost_time
-                        player.total_work_time += effective_work_time
-                        
-                        # Envoi d'un rapport de fin de journée
-                        try:
-                            channel = await self.bot.fetch_channel(int(server_state.game_channel_id))
-                            embed = discord.Embed(
-                                title="📊 Rapport de fin de journée",
-                                description="Voici le bilan de votre journée de travail :",
-                                color=discord.Color.blue()
-                            )
-                            
-                            # Stats de la journée
-                            perf_emoji = "🟢" if player.job_performance >= 80 else "🟡" if player.job_performance >= 50 else "🔴"
-                            embed.add_field(
-                                name="Performance",
-                                value=f"{perf_emoji} {int(player.job_performance)}%",
-                                inline=True
-                            )
-                            
-                            embed.add_field(
-                                name="Temps perdu",
-                                value=f"⏰ Retards: {player.total_minutes_late}min\n☕ Pauses: {player.total_break_time}min",
-                                inline=True
-                            )
-                            
-                            embed.add_field(
-                                name="Temps de travail effectif",
-                                value=f"⚡ {int(effective_work_time)}min / {int(work_time)}min",
-                                inline=True
-                            )
-                            
-                            await channel.send(embed=embed, delete_after=30)
-                        except (discord.NotFound, discord.Forbidden, ValueError):
-                            pass
-                    
-                    try:
-                        # Send notification about new message if possible
-                        channel = await self.bot.fetch_channel(int(server_state.game_channel_id))
-                        embed = discord.Embed(
-                            title="📱 Nouveau message",
-                            description="Votre téléphone vibre... Un message d'un ami !",
-                            color=discord.Color.green()
-                        )
-                        await channel.send(content=None, embed=embed, delete_after=10)
-                    except (discord.NotFound, discord.Forbidden):
-                        pass
-
-                # --- STAT DEGRADATION & CHAIN REACTIONS ---
-                time_delta_minutes = (datetime.datetime.utcnow() - player.last_update).total_seconds() / 60
-                minutes_per_game_day = server_state.game_minutes_per_day
-                if not minutes_per_game_day or minutes_per_game_day <= 0:
-                    minutes_per_game_day = 1440
-
-                degradation_map = {
-                    'hunger': server_state.degradation_rate_hunger,
-                    'thirst': server_state.degradation_rate_thirst,
-                    'stress': server_state.degradation_rate_stress,
-                    'bladder': server_state.degradation_rate_bladder,
-                    'boredom': server_state.degradation_rate_boredom,
-                    'hygiene': server_state.degradation_rate_hygiene
-                }
-
-                for stat, daily_rate in degradation_map.items():
-                    current_val = getattr(player, stat)
-                    degradation_per_minute = daily_rate / minutes_per_game_day
-                    change = degradation_per_minute * time_delta_minutes
-                    new_val = clamp(current_val + change, 0, 100)
-                    setattr(player, stat, new_val)
-                
-                time_since_last_smoke = datetime.datetime.utcnow() - (player.last_smoked_at or datetime.datetime.utcnow())
-                state_dict = {k: v for k, v in player.__dict__.items() if not k.startswith('_')}
-                updated_state, new_logs = chain_reactions(state_dict, time_since_last_smoke)
-                
-                for key, value in updated_state.items():
-                    if hasattr(player, key):
-                        setattr(player, key, value)
-                player.recent_logs = "\n".join(f"- {log}" for log in new_logs)
-                
-                player.last_update = datetime.datetime.utcnow()
-                db.commit()
-
-                # --- UI REFRESH ---
-                try:
-                    guild = self.bot.get_guild(int(server_state.guild_id))
-                    if guild and server_state.game_channel_id and server_state.game_message_id:
-                        channel = await self.bot.fetch_channel(int(server_state.game_channel_id))
-                        game_message = await channel.fetch_message(int(server_state.game_message_id))
-                        new_embed = main_embed_cog.generate_dashboard_embed(player, server_state, guild)
-                        await game_message.edit(embed=new_embed, view=DashboardView(player))
-                except (discord.NotFound, discord.Forbidden):
-                    pass 
+            if self._last_queue_sync is None or now - self._last_queue_sync >= DUE_QUEUE_SYNC_MINUTES * 60:
+                self._sync_due_queue(await self._run_db(self._load_active_guild_ids), now)
+            due_guilds = self.due_queue.pop_due(now)
+            if due_guilds:
+                results, failures, query_count = await self._run_db(self._db_phase, due_guilds, cooker_brain_cog)
+                for result in results:
+                    intervals[result.guild_id] = result.interval_minutes * 60
+                    self.watchdog.record_guild(result.guild_id, "db", result.duration)
+                    self.due_queue.schedule(result.guild_id, now + intervals[result.guild_id])
+                    refreshes[result.guild_id] = self._refresh_guild(result, main_embed_cog)
+                for guild_id, (interval_minutes, duration) in failures.items():
+                    self.watchdog.record_guild(guild_id, "db", duration)
+                    self.due_queue.schedule(guild_id, now + self.backoff.record_failure(guild_id, interval_minutes * 60))
+                self.last_tick_query_count = query_count
+                logger.info(
+                    f"Tick: {len(refreshes)} serveur(s) traité(s), {len(failures)} en échec, {query_count} requête(s) SQL exécutée(s), "
+                    f"{self.last_tick_columns_written} colonne(s) de stats écrite(s), {len(self._lazy_guilds)} serveur(s) à état ancré."
+                )
         except Exception as e:
             print(f"Erreur critique dans la boucle Scheduler.tick: {e}")
             traceback.print_exc()
-            db.rollback()
+            # Les serveurs dépilés ne doivent pas disparaître de la file : nouvel essai au prochain réveil
+            for guild_id in due_guilds:
+                if guild_id not in self.due_queue:
+                    self.due_queue.schedule(guild_id, now + 60)
         finally:
-            db.close()
+            self._schedule_next_wake()
+
+        # --- PHASE 2 : DISCORD (en parallèle, bornée) ---
+        # La durée du tick suit le serveur le plus lent, pas la somme de tous les serveurs.
+        suppressed_before = self.handles.suppressed_edits
+        durations = {}
+        errors = await run_bounded(refreshes, TICK_CONCURRENCY, TICK_GUILD_TIMEOUT_SECONDS, durations)
+        for guild_id, error in errors.items():
+            self.watchdog.record_guild(guild_id, "discord", durations.get(guild_id, 0.0))
+            if error is None:
+                self.backoff.record_success(guild_id)
+            else:
+                self.due_queue.schedule(guild_id, now + self.backoff.record_failure(guild_id, intervals[guild_id]))
+        if refreshes:
+            suppressed = self.handles.suppressed_edits - suppressed_before
+            logger.info(f"Tick: {suppressed}/{len(refreshes)} édition(s) de tableau de bord évitée(s) (total: {self.handles.suppressed_edits}).")
+            if PLAYER_STATES.enabled:
+                logger.info(PLAYER_STATES.summary_line())
+            logger.info(
+                f"Outbox: {self.outbox.pending_count()} notification(s) en attente, {self.outbox.sent_messages} message(s) envoyé(s), "
+                f"{self.outbox.coalesced_notices} regroupée(s), {self.outbox.dropped_notices} abandonnée(s)."
+            )
+            self._schedule_next_wake()
+        max_lag, avg_lag = self.loop_lag.snapshot_and_reset()
+        if refreshes or max_lag >= 0.1:
+            logger.info(f"Boucle asyncio: retard max {max_lag * 1000:.0f} ms, moyen {avg_lag * 1000:.1f} ms depuis le tick précédent.")
+        if due_guilds:
+            self.watchdog.record_tick(time.perf_counter() - tick_started)
+        if RULE_PROFILER.enabled and now - self._last_profile_log >= RULE_PROFILER_LOG_MINUTES * 60:
+            self._last_profile_log = now
+            for line in RULE_PROFILER.summary_lines():
+                logger.info(line)
+        if SQLITE_WAL_CHECKPOINT_MINUTES > 0 and now - self._last_wal_checkpoint >= SQLITE_WAL_CHECKPOINT_MINUTES * 60:
+            self._last_wal_checkpoint = now
+            await self._checkpoint_wal()
+
+    async def _checkpoint_wal(self):
+        """
+        Checkpoint PASSIVE du journal WAL dans le thread DB, entre deux ticks : le journal ne grossit pas
+        sans fin quand des lectures longues empêchent les checkpoints automatiques de SQLite.
+        Les profils en écriture différée sont d'abord écrits, pour que le checkpoint les inclue.
+        """
+        try:
+            await self.checkpoint_player_states()
+            busy, log_pages, checkpointed = await self._run_db(checkpoint_wal)
+        except Exception as e:
+            logger.error(f"Checkpoint WAL en échec: {e}")
+            return
+        if log_pages >= 0:
+            logger.info(f"Checkpoint WAL: {checkpointed}/{log_pages} page(s) reportée(s){' (lecteurs actifs)' if busy else ''}.")
 
 async def setup(bot):
-    await bot.add_cog(Scheduler(bot))
\ No newline at end of file
+    await bot.add_cog(Scheduler(bot))
@@ -2,7 +2,9 @@ import discord
 from discord import ui
 from discord.ext import commands
 from db.models import PlayerProfile
-from db.database import SessionLocal
+from db.database import AsyncSessionLocal
+from db.queries import get_player
+from db.write_behind import PLAYER_STATES
 from sqlalchemy import text
 
 class SmokeShopView(ui.View):
@@ -127,9 +129,10 @@ class BuySelect(ui.Select):
             await interaction.followup.send("La boutique est verrouillée jusqu'à ce que vous terminiez votre premier jour de travail.", ephemeral=True)
             return
 
-        db = SessionLocal()
+        # Session asynchrone : les requêtes ne bloquent pas la boucle asyncio
+        db = AsyncSessionLocal()
         try:
-            player = db.query(PlayerProfile).filter_by(guild_id=str(interaction.guild_id)).first()
+            player = await get_player(db, interaction.guild_id, cold=("inventory",))
             if not player:
                 await interaction.followup.send("Erreur: Profil introuvable", ephemeral=True)
                 return
@@ -170,7 +173,7 @@ class BuySelect(ui.Select):
                 unit = "g" if item in ["weed", "hash", "cbd", "tobacco"] else "unités"
                 message = f"Vous avez acheté {qty}{unit} de {item} pour {price}$!"
 
-            db.commit()
+            await PLAYER_STATES.commit_async(db)
             await interaction.followup.send(message, ephemeral=True)
             
             # Simply close the shop view
@@ -181,9 +184,9 @@ class BuySelect(ui.Select):
 
         except Exception as e:
             await interaction.followup.send(f"Une erreur est survenue: {str(e)}", ephemeral=True)
-            db.rollback()
+            await db.rollback()
         finally:
-            db.close()
+            await db.close()
 
 class SmokeShop(commands.Cog):
     def __init__(self, bot):
@@ -196,16 +199,13 @@ class SmokeShop(commands.Cog):
             
         custom_id = interaction.data.get("custom_id", "")
         if custom_id == "phone_shop":
-            db = SessionLocal()
-            try:
-                player = db.query(PlayerProfile).filter_by(guild_id=str(interaction.guild_id)).first()
-                if not player:
-                    return
-                    
-                embed = discord.Embed(title="🛍️ Smoke-Shop", description=f"Votre Portefeuille: **{player.wallet}$**", color=discord.Color.purple())
-                await interaction.response.edit_message(embed=embed, view=SmokeShopView(player, self.bot))
-            finally:
-                db.close()
+            async with AsyncSessionLocal() as db:
+                player = await get_player(db, interaction.guild_id, cold=("inventory", "meta"))
+            if not player:
+                return
+
+            embed = discord.Embed(title="🛍️ Smoke-Shop", description=f"Votre Portefeuille: **{player.wallet}$**", color=discord.Color.purple())
+            await interaction.response.edit_message(embed=embed, view=SmokeShopView(player, self.bot))
 
 async def setup(bot):
     await bot.add_cog(SmokeShop(bot))
@@ -5,18 +5,42 @@ import discord
 from discord.ext import commands
 from discord.ext.commands import Cog
 from db.models import PlayerProfile, ServerState
-from db.database import SessionLocal
+from db.database import AsyncSessionLocal
+from db.queries import get_game
+from db.write_behind import PLAYER_STATES
 from utils.game_manager import game_manager
 from utils.view_manager import view_manager
 from utils.error_handler import handle_interaction_error, check_valid_state, GameError
 from utils.logger import get_logger
+from utils.scheduler_utils import materialize_linear_stats
+from utils import sim_clock
 
 logger = get_logger(__name__)
 
+# Boutons qui modifient l'état du joueur : custom_id → colonne passée à True
+ACTIVITY_BUTTONS = {"sleep": "is_sleeping", "work": "is_working"}
+
 class ViewHandler(commands.Cog):
+    """
+    Chaque interaction ouvre sa propre session courte (AsyncSessionLocal), rendue au pool avant
+    tout appel à Discord : pas de carte d'identité partagée qui grossit et sert des lignes périmées
+    après un tick, et un échec n'annule que l'interaction concernée.
+    """
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self._db_session = SessionLocal()
+
+    def _dashboard_edited(self, message: discord.Message) -> None:
+        """Le message de jeu vient d'être modifié ici : le Scheduler ne doit plus se fier au dernier rendu du tick."""
+        scheduler = self.bot.get_cog("Scheduler")
+        if scheduler:
+            scheduler.dashboard_edited(message.channel.id, message.id)
+
+    async def _commit_activity(self, player: PlayerProfile, custom_id: str) -> None:
+        """Enregistre l'activité déclenchée par un bouton (sleep, work) : écriture différée, sans session."""
+        column = ACTIVITY_BUTTONS.get(custom_id)
+        if column is None:
+            return
+        await PLAYER_STATES.write_async(player, {column: True})
         
     def create_view(self, view_type: str, player: PlayerProfile, state: ServerState) -> discord.ui.View:
         """Create the appropriate view based on type"""
@@ -86,12 +110,8 @@ class ViewHandler(commands.Cog):
                 view_type = "stats"
             elif custom_id == "inventory":
                 view_type = "inventory"
-            elif custom_id == "sleep":
-                player.is_sleeping = True
-                self._db_session.commit()
-            elif custom_id == "work":
-                player.is_working = True
-                self._db_session.commit()
+            elif custom_id in ACTIVITY_BUTTONS:
+                await self._commit_activity(player, custom_id)
             elif custom_id == "phone":
                 view_type = "phone"
                 
@@ -144,16 +164,11 @@ class ViewHandler(commands.Cog):
             return
 
         try:
-            # Get the player and server state from the database
+            # Get the player and server state from the database (une requête, session rendue aussitôt :
+            # les objets restent lisibles après sa fermeture, cf. expire_on_commit=False)
             guild_id = str(interaction.guild.id)
-            
-            state = self._db_session.query(ServerState).filter(
-                ServerState.guild_id == guild_id
-            ).first()
-            
-            player = self._db_session.query(PlayerProfile).filter(
-                PlayerProfile.guild_id == guild_id
-            ).first()
+            async with AsyncSessionLocal() as db:
+                state, player = await get_game(db, guild_id)
             
             if not state or not player:
                 if not interaction.response.is_done():
@@ -163,6 +178,9 @@ class ViewHandler(commands.Cog):
                     )
                 return
 
+            # Besoins évalués à l'heure courante pour l'affichage (en mémoire : la base garde l'état ancré)
+            materialize_linear_stats(state, player, sim_clock.utcnow(), persist=False)
+
             # Handle navigation based on custom_id
             view_type = "main_menu"  # Default view type
             if custom_id.startswith("nav_"):
@@ -192,12 +210,7 @@ class ViewHandler(commands.Cog):
             # Process the button action
             try:
                 # Process action effects
-                if custom_id == "sleep":
-                    player.is_sleeping = True
-                    self._db_session.commit()
-                elif custom_id == "work":
-                    player.is_working = True
-                    self._db_session.commit()
+                await self._commit_activity(player, custom_id)
 
                 # Create view
                 view = self._create_view(view_type, player, state)
@@ -244,10 +257,12 @@ class ViewHandler(commands.Cog):
                                 # Update footer to remove path
                                 embed.set_footer(text=server_name)
                                 await interaction.message.edit(attachments=[file], embed=embed, view=view)
+                                self._dashboard_edited(interaction.message)
                                 return
                             
                     # If no image or error, just update embed and view
                     await interaction.message.edit(embed=embed, view=view)
+                    self._dashboard_edited(interaction.message)
                     
                 elif isinstance(interaction.channel, (discord.TextChannel, discord.Thread)):
                     # Check if there's an image path in the footer
@@ -290,7 +305,6 @@ class ViewHandler(commands.Cog):
                     )
             except:
                 pass
-            self._db_session.rollback()
             
     def _create_view(self, view_type: str, player: PlayerProfile, state: ServerState) -> discord.ui.View:
         """Create the appropriate view based on type"""
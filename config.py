@@ -5,4 +5,92 @@ from dotenv import load_dotenv
 load_dotenv() # Charge les variables depuis un fichier .env
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
-GUILD_ID = int(os.getenv("GUILD_ID", 0)) # L'ID de votre serveur de test, optionnel
\ No newline at end of file
+GUILD_ID = int(os.getenv("GUILD_ID", 0)) # L'ID de votre serveur de test, optionnel
+
+# --- Scheduler ---
+# Nombre maximal de serveurs mis à jour en parallèle sur Discord pendant un tick
+TICK_CONCURRENCY = int(os.getenv("TICK_CONCURRENCY", 10))
+# Délai maximal (secondes) accordé à la mise à jour Discord d'un serveur
+TICK_GUILD_TIMEOUT_SECONDS = float(os.getenv("TICK_GUILD_TIMEOUT_SECONDS", 20))
+# Fréquence (minutes) de resynchronisation de la file des ticks avec la liste des parties actives
+DUE_QUEUE_SYNC_MINUTES = int(os.getenv("DUE_QUEUE_SYNC_MINUTES", 5))
+# Budget (secondes) d'un tick complet ; au-delà, le watchdog signale un dépassement
+TICK_BUDGET_SECONDS = float(os.getenv("TICK_BUDGET_SECONDS", 60))
+# Durée (secondes) au-delà de laquelle le traitement d'un serveur est signalé comme lent
+TICK_SLOW_GUILD_SECONDS = float(os.getenv("TICK_SLOW_GUILD_SECONDS", 5))
+# Délai maximal (minutes) entre deux tentatives pour un serveur en échec répété
+TICK_BACKOFF_MAX_MINUTES = float(os.getenv("TICK_BACKOFF_MAX_MINUTES", 60))
+# Écart minimal pour qu'une stat recalculée soit réécrite en base (bruit flottant uniquement)
+WRITEBACK_TOLERANCE = float(os.getenv("WRITEBACK_TOLERANCE", 1e-9))
+# Pas de simulation (minutes réelles) : dégradation et réactions en chaîne avancent par pas de cette durée,
+# quel que soit l'intervalle de tick du serveur (qui ne règle que l'écriture en base et le tableau de bord).
+# Les constantes de chain_reactions sont calibrées pour un pas d'une minute.
+SIM_STEP_MINUTES = float(os.getenv("SIM_STEP_MINUTES", 1))
+# Nombre maximal de pas rejoués pour rattraper une interruption (au-delà, les pas sont allongés)
+CATCHUP_MAX_STEPS = int(os.getenv("CATCHUP_MAX_STEPS", 288))
+# Durée (minutes) sur laquelle les rattrapages des serveurs sont étalés au démarrage
+CATCHUP_SPREAD_MINUTES = float(os.getenv("CATCHUP_SPREAD_MINUTES", 5))
+
+# --- Stockage SQLite ---
+# Pragmas appliqués à chaque nouvelle connexion (db/database.py), dans cet ordre.
+# WAL : les lectures ne sont plus bloquées par un commit ; synchronous=NORMAL : en WAL, plus de fsync
+# à chaque commit (seulement aux checkpoints), une coupure de courant ne peut perdre que les derniers commits.
+# SQLITE_JOURNAL_MODE=DELETE et SQLITE_SYNCHRONOUS=FULL rétablissent le comportement par défaut de SQLite.
+SQLITE_PRAGMAS = {
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", 65536)),  # Négatif = taille en Kio
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE_MB", 256)) * 1024 * 1024,
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    "journal_size_limit": int(os.getenv("SQLITE_JOURNAL_SIZE_LIMIT_MB", 64)) * 1024 * 1024,
+}
+# Connexions des pools du moteur synchrone (cogs, thread DB du Scheduler) : permanentes, puis temporaires en pointe.
+# Chaque interaction emprunte une connexion le temps de sa session ; au-delà, attente de DB_POOL_TIMEOUT_SECONDS.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", 5))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", 10))
+# Connexions du moteur asynchrone (interactions). En WAL, les lectures sont concurrentes et les écritures
+# attendent leur tour (busy_timeout) ; avec un autre journal, une seule connexion évite les "database is locked".
+DB_ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", 4 if SQLITE_PRAGMAS["journal_mode"].upper() == "WAL" else 1))
+# Fréquence (minutes) des checkpoints du journal WAL lancés par le Scheduler (0 = checkpoints automatiques seulement)
+SQLITE_WAL_CHECKPOINT_MINUTES = float(os.getenv("SQLITE_WAL_CHECKPOINT_MINUTES", 5))
+
+# --- Écriture différée des profils joueurs ---
+# Les modifications de PlayerProfile (tick, boutons) sont journalisées puis écrites en base par lots,
+# toutes les WRITE_BEHIND_FLUSH_SECONDS secondes, à l'arrêt et avant chaque checkpoint WAL (db/write_behind.py).
+# 0 = écriture directe à chaque commit, comme avant.
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "1").lower() in ("1", "true", "yes")
+WRITE_BEHIND_FLUSH_SECONDS = float(os.getenv("WRITE_BEHIND_FLUSH_SECONDS", 5))
+# fsync du journal après chaque écriture : survit aussi à une coupure de courant (sinon : à un plantage du processus)
+WRITE_BEHIND_JOURNAL_FSYNC = os.getenv("WRITE_BEHIND_JOURNAL_FSYNC", "0").lower() in ("1", "true", "yes")
+
+# --- Simulation multi-cadence ---
+# Période (en pas de SIM_STEP_MINUTES) des groupes de règles lentes de chain_reactions. 1 = à chaque pas (référence, par défaut).
+# Approximation en option : un groupe de période N (ex: 4) tourne un pas sur N avec des coefficients multipliés par N ;
+# mesurer l'écart à la référence avec scripts/multirate_accuracy.py avant de l'activer.
+RULE_GROUP_PERIODS = {
+    "mental_baseline": int(os.getenv("RULE_PERIOD_MENTAL_BASELINE", 1)),
+    "withdrawal_progression": int(os.getenv("RULE_PERIOD_WITHDRAWAL_PROGRESSION", 1)),
+    "immune_response": int(os.getenv("RULE_PERIOD_IMMUNE_RESPONSE", 1)),
+    "regeneration": int(os.getenv("RULE_PERIOD_REGENERATION", 1)),
+}
+
+# --- Profilage des règles ---
+# Active dès le démarrage le profilage de chain_reactions (temps par section, déclenchements par branche).
+# Peut aussi être activé à chaud avec /dev dev_rule_profile.
+RULE_PROFILER_ENABLED = os.getenv("RULE_PROFILER_ENABLED", "0").lower() in ("1", "true", "yes")
+# Fréquence (minutes) du résumé du profil dans les logs du Scheduler, quand le profilage est actif
+RULE_PROFILER_LOG_MINUTES = float(os.getenv("RULE_PROFILER_LOG_MINUTES", 15))
+
+# --- Sharding ---
+# Nombre total de shards Discord (1 = pas de sharding)
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", 1))
+# Shards gérés par ce processus, ex: "0,1" (vide = tous). Chaque processus ne fait tourner le tick que pour ses serveurs.
+SHARD_IDS = [int(shard_id) for shard_id in os.getenv("SHARD_IDS", "").split(",") if shard_id.strip()] or list(range(SHARD_COUNT))
+
+# --- Outbox des notifications ---
+# Débit moyen (messages/seconde) et rafale maximale de notifications par salon.
+# Discord limite à 5 requêtes / 5 s par salon, éditions du tableau de bord comprises.
+OUTBOX_CHANNEL_RATE_PER_SECOND = float(os.getenv("OUTBOX_CHANNEL_RATE_PER_SECOND", 0.5))
+OUTBOX_CHANNEL_BURST = int(os.getenv("OUTBOX_CHANNEL_BURST", 3))
@@ -1,7 +1,11 @@
 # --- db/database.py (REVISED) ---
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
+from typing import Tuple
+from config import SQLITE_PRAGMAS, DB_POOL_SIZE, DB_POOL_MAX_OVERFLOW, DB_POOL_TIMEOUT_SECONDS, DB_ASYNC_POOL_SIZE
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -13,12 +17,60 @@ DB_PATH = os.path.join(DATA_DIR, DB_FILE_NAME)
 os.makedirs(DATA_DIR, exist_ok=True)
 
 DATABASE_URL = f"sqlite:///{DB_PATH}"
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{DB_PATH}"
 
 logger.info(f"Database path set to: {DB_PATH}")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: dict = SQLITE_PRAGMAS) -> None:
+    """Applique un profil de stockage (pragma → valeur) à une connexion SQLite brute."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def install_sqlite_pragmas(target_engine, pragmas: dict = SQLITE_PRAGMAS) -> None:
+    """Applique `pragmas` à chaque nouvelle connexion de `target_engine` (moteur synchrone)."""
+    event.listen(target_engine, "connect", lambda dbapi_connection, _record: apply_sqlite_pragmas(dbapi_connection, pragmas))
+
+
+# Sessions courtes (une par interaction, une par phase DB du tick) : les connexions sont empruntées au pool
+# le temps d'une session, puis rendues.
+engine = create_engine(
+    DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=QueuePool,
+    pool_size=DB_POOL_SIZE, max_overflow=DB_POOL_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+)
+install_sqlite_pragmas(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Moteur asynchrone (aiosqlite) sur le même fichier, pour les interactions : les requêtes
+# s'exécutent hors de la boucle asyncio et n'en bloquent plus les heartbeats.
+# Pool borné (DB_ASYNC_POOL_SIZE, sans débordement) : au-delà, les sessions attendent leur tour
+# dans la file du pool au lieu d'ouvrir des connexions qui finiraient en "database is locked".
+# expire_on_commit=False : après un commit, les objets restent lisibles sans rechargement implicite
+# (un chargement paresseux est impossible en asynchrone).
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, poolclass=AsyncAdaptedQueuePool,
+    pool_size=DB_ASYNC_POOL_SIZE, max_overflow=0, pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+)
+install_sqlite_pragmas(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+def checkpoint_wal(mode: str = "PASSIVE") -> Tuple[int, int, int]:
+    """
+    Reporte le journal WAL dans la base. PASSIVE n'attend ni lecteur ni écrivain ;
+    TRUNCATE (à l'arrêt) vide aussi le fichier -wal.
+    Retourne (bloqué, pages dans le journal, pages reportées) ; (0, -1, -1) hors mode WAL.
+    """
+    with engine.connect() as connection:
+        busy, log_pages, checkpointed = connection.exec_driver_sql(f"PRAGMA wal_checkpoint({mode})").one()
+    return busy, log_pages, checkpointed
+
+
 # Base est simplement défini ici. Les modèles l'importeront.
 Base = declarative_base()
 
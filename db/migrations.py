@@ -0,0 +1,65 @@
+# --- db/migrations.py ---
+# Mises à niveau du schéma d'une base existante, jouées au démarrage avant create_all (cf. bot.init_db).
+# create_all crée les tables absentes mais ne modifie jamais une table existante.
+
+from sqlalchemy import column, insert, inspect, select, table
+from db.database import Base
+from db.models import PlayerProfile, COLD_PARTS
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+LEGACY_PLAYER_TABLE = "player_profile_legacy"
+
+
+def split_player_profile(bind) -> int:
+    """
+    Découpe l'ancienne table player_profile (une ligne d'environ 200 colonnes) en ligne chaude
+    et parties froides (COLD_PARTS). SQLite ne sait pas retirer des colonnes en masse : l'ancienne
+    table est renommée, les nouvelles tables sont créées puis remplies par INSERT ... SELECT,
+    et l'ancienne table est supprimée, le tout dans une transaction.
+    Les colonnes absentes de l'ancienne table reçoivent leur valeur par défaut.
+    Sans effet si la base est neuve ou déjà découpée. Retourne le nombre de profils migrés.
+    """
+    inspector = inspect(bind)
+    if PlayerProfile.__tablename__ not in inspector.get_table_names():
+        return 0
+    legacy_columns = {info["name"] for info in inspector.get_columns(PlayerProfile.__tablename__)}
+    cold_columns = {name for model in COLD_PARTS.values() for name in model.__table__.columns.keys()}
+    if not legacy_columns & (cold_columns - {"player_id"}):
+        return 0
+    legacy_indexes = [info["name"] for info in inspector.get_indexes(PlayerProfile.__tablename__)]
+
+    with bind.connect() as connection:
+        # pysqlite n'ouvre pas de transaction avant un DDL : BEGIN explicite pour que la migration soit atomique
+        connection.exec_driver_sql("BEGIN")
+        try:
+            connection.exec_driver_sql(f"ALTER TABLE {PlayerProfile.__tablename__} RENAME TO {LEGACY_PLAYER_TABLE}")
+            # Les index suivent la table renommée mais gardent leur nom, repris par la nouvelle table
+            for name in legacy_indexes:
+                connection.exec_driver_sql(f'DROP INDEX IF EXISTS "{name}"')
+            targets = [PlayerProfile.__table__] + [model.__table__ for model in COLD_PARTS.values()]
+            Base.metadata.create_all(connection, tables=targets)
+
+            legacy = table(LEGACY_PLAYER_TABLE, *(column(name) for name in legacy_columns))
+            copies = [(PlayerProfile.__table__, {name: name for name in PlayerProfile.__table__.columns.keys()})]
+            copies += [
+                (model.__table__, {name: "id" if name == "player_id" else name for name in model.__table__.columns.keys()})
+                for model in COLD_PARTS.values()
+            ]
+            for target, sources in copies:
+                names = [name for name, source in sources.items() if source in legacy_columns]
+                connection.execute(insert(target).from_select(names, select(*(legacy.c[sources[name]] for name in names))))
+            migrated = connection.exec_driver_sql(f"SELECT COUNT(*) FROM {LEGACY_PLAYER_TABLE}").scalar()
+            connection.exec_driver_sql(f"DROP TABLE {LEGACY_PLAYER_TABLE}")
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+    logger.info(f"Schéma : {migrated} profil(s) joueur découpé(s) en ligne chaude et parties froides ({', '.join(COLD_PARTS)}).")
+    return migrated
+
+
+def upgrade_schema(bind) -> None:
+    """Joue les mises à niveau nécessaires, dans l'ordre."""
+    split_player_profile(bind)
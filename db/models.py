@@ -5,8 +5,9 @@ from __future__ import annotations
 
 from datetime import datetime
 from typing import Optional
-from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import DateTime, Integer, String, Boolean, Float, BigInteger, Text, UniqueConstraint
+from sqlalchemy.ext.associationproxy import association_proxy
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import DateTime, Integer, String, Boolean, Float, BigInteger, Text, UniqueConstraint, ForeignKey, event, inspect
 
 from db.database import Base
 
@@ -103,20 +104,19 @@ class ServerState(Base):
 
 
 class PlayerProfile(Base):
+    """
+    Ligne chaude du joueur : stats vitales, statuts et horodatages lus ou écrits à chaque tick.
+    Les données qui changent rarement (inventaire, travail, messages, notifications, téléphone) sont
+    dans des tables annexes un-à-un (parties froides), chargées à la première lecture. Leurs colonnes
+    restent accessibles directement sur le profil (player.wallet, player.messages...).
+    """
     __tablename__ = "player_profile"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     guild_id: Mapped[str] = mapped_column(String, nullable=False, index=True, unique=True)
 
     # === SYSTEM STATE ===
-    created_at: Mapped[datetime] = mapped_column("created_at", DateTime, default=datetime.utcnow)
-    last_tick: Mapped[datetime] = mapped_column("last_tick", DateTime, default=datetime.utcnow)
-    last_save: Mapped[datetime] = mapped_column("last_save", DateTime, default=datetime.utcnow)
     last_autonomous_action: Mapped[Optional[datetime]] = mapped_column("last_autonomous_action", DateTime, nullable=True)
     willpower_last_check: Mapped[Optional[datetime]] = mapped_column("willpower_last_check", DateTime, nullable=True)
-    game_version: Mapped[str] = mapped_column("game_version", String, default="1.0.0")
-    tutorial_stage: Mapped[int] = mapped_column("tutorial_stage", Integer, default=0)
-    flags: Mapped[str] = mapped_column("flags", String, default="")  # JSON string for various flags
-    flags: Mapped[str] = mapped_column(String, default="")  # JSON string for various flags
 
     # === SECTION 1: PHYSICAL HEALTH CORE ===
     health: Mapped[float] = mapped_column(Float, default=100.0)
@@ -241,15 +241,7 @@ class PlayerProfile(Base):
     immune_system: Mapped[float] = mapped_column(Float, default=100.0)
     is_sick: Mapped[bool] = mapped_column(Boolean, default=False)
 
-    # === SECTION 6.1: STATISTIQUES DE TRAVAIL ===
-    total_minutes_late: Mapped[int] = mapped_column(Integer, default=0)
-    total_break_time: Mapped[int] = mapped_column(Integer, default=0)
-    total_work_time: Mapped[int] = mapped_column(Integer, default=0)
-    work_days_streak: Mapped[int] = mapped_column(Integer, default=0)
-    last_break_start: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-
     # === SECTION 7: AUTRES & MÉTA-DONNÉES ===
-    wallet: Mapped[int] = mapped_column(Integer, default=20)
     show_stats_in_view: Mapped[bool] = mapped_column(Boolean, default=False)
     show_inventory_in_view: Mapped[bool] = mapped_column(Boolean, default=False)
     show_schedule_in_view: Mapped[bool] = mapped_column(Boolean, default=False)
@@ -259,11 +251,6 @@ class PlayerProfile(Base):
     is_working: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     is_on_break: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     is_sleeping: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
-    missed_work_days: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
-    last_worked_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-    first_day_reward_given: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
-    lateness_minutes: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
-    has_completed_first_work_day: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     
     # === SECTION 8.1: GESTION DU SOMMEIL ===
     sleep_quality: Mapped[float] = mapped_column(Float, default=100.0)  # Qualité du sommeil (affecte la récupération)
@@ -272,6 +259,38 @@ class PlayerProfile(Base):
     last_sleep_check: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)  # Pour le calcul du quota
     insomnia: Mapped[float] = mapped_column(Float, default=0.0)  # Difficulté à dormir (augmente avec stress/santé mentale basse)
     
+    # --- Timestamps & Cooldowns ---
+    last_update: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    last_action_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_action: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    last_action_time: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    action_cooldown_end_time: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    #... (autres timestamps)
+    last_eaten_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_drank_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_slept_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_smoked_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_urinated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_shower_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    sickness_end_time: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_defecated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    last_action_by: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+
+    # --- Parties froides (tables annexes, une ligne par joueur) ---
+    inventory: Mapped[PlayerInventory] = relationship(cascade="all, delete-orphan")
+    career: Mapped[PlayerCareer] = relationship(cascade="all, delete-orphan")
+    meta: Mapped[PlayerMeta] = relationship(cascade="all, delete-orphan")
+
+    __table_args__ = (UniqueConstraint('guild_id', name='uq_guild_player'),)
+
+
+class PlayerInventory(Base):
+    """Partie froide : argent, inventaire, achats du smoke shop et historique des crafts."""
+    __tablename__ = "player_inventory"
+    player_id: Mapped[int] = mapped_column(ForeignKey("player_profile.id", ondelete="CASCADE"), primary_key=True)
+    wallet: Mapped[int] = mapped_column(Integer, default=20)
+
     # --- INVENTAIRE BASE ---
     food_servings: Mapped[int] = mapped_column(Integer, default=1)
     water_bottles: Mapped[int] = mapped_column(Integer, default=5)
@@ -302,36 +321,81 @@ class PlayerProfile(Base):
     chillum_uses: Mapped[int] = mapped_column(Integer, default=0)
     vaporizer_uses: Mapped[int] = mapped_column(Integer, default=0)
 
+
+class PlayerCareer(Base):
+    """Partie froide : statistiques de travail (bilans quotidiens et de fin de journée)."""
+    __tablename__ = "player_career"
+    player_id: Mapped[int] = mapped_column(ForeignKey("player_profile.id", ondelete="CASCADE"), primary_key=True)
+    total_minutes_late: Mapped[int] = mapped_column(Integer, default=0)
+    total_break_time: Mapped[int] = mapped_column(Integer, default=0)
+    total_work_time: Mapped[int] = mapped_column(Integer, default=0)
+    work_days_streak: Mapped[int] = mapped_column(Integer, default=0)
+    last_break_start: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    missed_work_days: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_worked_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    first_day_reward_given: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    lateness_minutes: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    has_completed_first_work_day: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+
+
+class PlayerMeta(Base):
+    """Partie froide : méta-données, notifications, messages et téléphone."""
+    __tablename__ = "player_meta"
+    player_id: Mapped[int] = mapped_column(ForeignKey("player_profile.id", ondelete="CASCADE"), primary_key=True)
+    created_at: Mapped[datetime] = mapped_column("created_at", DateTime, default=datetime.utcnow)
+    last_tick: Mapped[datetime] = mapped_column("last_tick", DateTime, default=datetime.utcnow)
+    last_save: Mapped[datetime] = mapped_column("last_save", DateTime, default=datetime.utcnow)
+    game_version: Mapped[str] = mapped_column("game_version", String, default="1.0.0")
+    tutorial_stage: Mapped[int] = mapped_column("tutorial_stage", Integer, default=0)
+    flags: Mapped[str] = mapped_column(String, default="")  # JSON string for various flags
+
     # --- Notifications Config ---
     notifications_config: Mapped[str] = mapped_column(Text, default="")
     notification_history: Mapped[str] = mapped_column(Text, default="")
 
-    # --- Timestamps & Cooldowns ---
-    last_update: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    last_action_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-    last_action: Mapped[Optional[str]] = mapped_column(String, nullable=True)
-    last_action_time: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-    action_cooldown_end_time: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-    #... (autres timestamps)
-    last_eaten_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-    last_drank_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-    last_slept_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-    last_smoked_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-    last_urinated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-    last_shower_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-    sickness_end_time: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-    last_defecated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-
     # --- Flags Narratifs ---
     has_unlocked_smokeshop: Mapped[bool] = mapped_column(Boolean, default=False)
     messages: Mapped[str] = mapped_column(Text, default="")
-    last_action_by: Mapped[Optional[str]] = mapped_column(String, nullable=True)
-    
+
     # --- Téléphone ---
     phone_uses_today: Mapped[int] = mapped_column(Integer, default=0)
     last_phone_reset_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
-    __table_args__ = (UniqueConstraint('guild_id', name='uq_guild_player'),)
+
+# Partie froide (relation de PlayerProfile) → modèle
+COLD_PARTS = {"inventory": PlayerInventory, "career": PlayerCareer, "meta": PlayerMeta}
+# Colonne d'une partie froide → relation qui la porte
+COLD_ATTRIBUTES = {
+    column.key: part
+    for part, model in COLD_PARTS.items()
+    for column in model.__table__.columns
+    if not column.primary_key
+}
+
+# Les colonnes froides restent des attributs du profil : lecture et écriture passent par la partie
+for _key, _part in COLD_ATTRIBUTES.items():
+    setattr(PlayerProfile, _key, association_proxy(_part, _key))
+
+
+@event.listens_for(PlayerProfile, "init")
+def _create_cold_parts(target, args, kwargs):
+    """Un nouveau profil naît avec ses parties froides (insérées avec lui, valeurs par défaut des colonnes)."""
+    for part, model in COLD_PARTS.items():
+        if part not in kwargs:
+            setattr(target, part, model())
+
+
+def loaded_cold_parts(player: PlayerProfile) -> list:
+    """Parties froides déjà chargées de `player`, sans en déclencher le chargement."""
+    state = inspect(player)
+    return [state.dict[part] for part in COLD_PARTS if state.dict.get(part) is not None]
+
+
+def player_values(player: PlayerProfile) -> dict:
+    """Toutes les colonnes du profil, parties froides comprises (chargées au besoin)."""
+    values = {attr.key: getattr(player, attr.key) for attr in inspect(player).mapper.column_attrs}
+    values.update({key: getattr(player, key) for key in COLD_ATTRIBUTES})
+    return values
 
 class ActionLog(Base):
     __tablename__ = "action_log"
@@ -340,4 +404,13 @@ class ActionLog(Base):
     user_id: Mapped[str] = mapped_column(String, index=True)
     action: Mapped[str] = mapped_column(String)
     effect: Mapped[str] = mapped_column(String)
-    timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+class WriteBehindCommit(Base):
+    """
+    Marqueur d'une transaction validée par PlayerStateCache.commit (db/write_behind.py), inséré dans la
+    même transaction : au démarrage, seules les lignes du journal dont la transaction a abouti sont rejouées.
+    """
+    __tablename__ = "write_behind_commit"
+    journal: Mapped[str] = mapped_column(String, primary_key=True)  # Répertoire de journal du processus (ex: shard-0)
+    txid: Mapped[str] = mapped_column(String, primary_key=True)
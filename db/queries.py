@@ -0,0 +1,53 @@
+# --- db/queries.py ---
+# Requêtes des chemins chauds des interactions, version asynchrone (AsyncSessionLocal).
+# Mêmes critères que les `db.query(...).filter_by(guild_id=...).first()` des cogs synchrones.
+# Un chargement paresseux est impossible en asynchrone : les parties froides du profil utilisées
+# par l'appelant (`cold`, toutes par défaut) sont chargées avec lui, par jointure dans la même requête
+# (une seule ligne lue : chaque instruction évitée est un aller-retour de moins vers le thread aiosqlite).
+
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from db.models import ServerState, PlayerProfile, COLD_PARTS
+
+
+def _with_cold_parts(statement, cold: Iterable[str]):
+    return statement.options(*(joinedload(getattr(PlayerProfile, part)) for part in cold))
+
+
+async def get_player(session: AsyncSession, guild_id, refresh: bool = False,
+                     cold: Iterable[str] = tuple(COLD_PARTS)) -> Optional[PlayerProfile]:
+    """
+    Profil joueur du serveur, ou None.
+    `refresh=True` recharge les colonnes d'un objet déjà présent dans la session
+    (après un UPDATE SQL direct, par exemple).
+    `cold` : parties froides chargées (clés de COLD_PARTS).
+    """
+    statement = _with_cold_parts(select(PlayerProfile).filter_by(guild_id=str(guild_id)).limit(1), cold)
+    if refresh:
+        statement = statement.execution_options(populate_existing=True)
+    return (await session.execute(statement)).scalars().first()
+
+
+async def get_server_state(session: AsyncSession, guild_id) -> Optional[ServerState]:
+    """Configuration du serveur, ou None."""
+    statement = select(ServerState).filter_by(guild_id=str(guild_id)).limit(1)
+    return (await session.execute(statement)).scalars().first()
+
+
+async def get_game(session: AsyncSession, guild_id,
+                   cold: Iterable[str] = tuple(COLD_PARTS)) -> Tuple[Optional[ServerState], Optional[PlayerProfile]]:
+    """
+    Configuration du serveur et profil joueur en une seule requête (jointure externe),
+    plus les parties froides `cold` du profil.
+    """
+    statement = _with_cold_parts(
+        select(ServerState, PlayerProfile)
+        .outerjoin(PlayerProfile, PlayerProfile.guild_id == ServerState.guild_id)
+        .filter(ServerState.guild_id == str(guild_id))
+        .limit(1),
+        cold,
+    )
+    row = (await session.execute(statement)).first()
+    return (row[0], row[1]) if row else (None, None)
@@ -0,0 +1,538 @@
+# --- db/write_behind.py ---
+# Écriture différée (write-behind) des profils joueurs.
+# Les commits du tick et des interactions ne réécrivent plus PlayerProfile en base : les colonnes modifiées
+# sont ajoutées à un journal en ajout seul (JSONL) puis gardées en mémoire, par joueur. Un flush périodique
+# les écrit par lots (un executemany par ensemble de colonnes) dans une seule transaction : le volume
+# d'écriture suit la fréquence des flushs, plus celle des interactions.
+# La mémoire fait foi pour les colonnes en attente : tout chargement d'un profil, depuis n'importe quelle
+# session (synchrone ou asynchrone), les reçoit par-dessus les valeurs lues en base. Les écritures directes
+# qui restent (commandes d'administration) sont reprises dans le cache pour qu'un flush ne les écrase pas.
+# Au démarrage, le journal laissé par un arrêt brutal est rejoué en base (recover).
+# Un commit journalise les colonnes détournées AVANT de valider la session, et insère dans la même transaction
+# un marqueur (WriteBehindCommit) : le rejeu ne reprend que les lignes dont la transaction a abouti, si bien
+# qu'un arrêt entre le commit et la mise en mémoire ne perd rien, et qu'un commit annulé n'est jamais rejoué.
+# Chaque processus (ses SHARD_IDS) a son propre répertoire de journal : il ne rejoue et ne supprime que ses segments.
+# Seule la ligne chaude (player_profile) passe par le cache : les parties froides (inventaire, travail,
+# messages), rarement modifiées, sont écrites directement par le commit de la session.
+
+import asyncio
+import datetime
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, delete, event, inspect, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import NO_VALUE, set_committed_value
+from config import WRITE_BEHIND_ENABLED, WRITE_BEHIND_JOURNAL_FSYNC, SHARD_COUNT, SHARD_IDS
+from db.database import DATA_DIR, engine
+from db.models import PlayerProfile, WriteBehindCommit, COLD_PARTS
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+JOURNAL_ROOT = os.path.join(DATA_DIR, "state_journal")
+# Un sous-répertoire par processus, nommé d'après ses shards (ex: shard-0, shard-2-3)
+JOURNAL_DIR = os.path.join(JOURNAL_ROOT, "shard-" + "-".join(str(shard_id) for shard_id in SHARD_IDS))
+# Segments écrits à la racine avant les répertoires par processus : repris par le processus qui gère tous les shards
+LEGACY_JOURNAL_DIR = JOURNAL_ROOT if sorted(SHARD_IDS) == list(range(SHARD_COUNT)) else None
+# Attribut de PlayerProfile → colonne de player_profile ou d'une partie froide (hors clés primaires).
+# Les colonnes froides n'y figurent que pour rejouer un journal écrit avant le découpage du profil.
+PLAYER_COLUMNS = {
+    attribute.key: attribute.columns[0]
+    for model in (PlayerProfile, *COLD_PARTS.values())
+    for attribute in inspect(model).column_attrs
+    if not attribute.columns[0].primary_key
+}
+
+# Modification validée d'un profil : (id, guild_id, {attribut: valeur})
+Change = Tuple[int, str, Dict[str, object]]
+
+
+def _encode(value):
+    if isinstance(value, datetime.datetime):
+        return {"$dt": value.isoformat()}
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict) and "$dt" in value:
+        return datetime.datetime.fromisoformat(value["$dt"])
+    return value
+
+
+def _modified_values(player: PlayerProfile) -> Dict[str, object]:
+    """Colonnes modifiées depuis le chargement (ou le dernier commit) et leur valeur courante."""
+    state = inspect(player)
+    # committed_state : valeur d'origine des attributs modifiés (flag_modified compris)
+    return {key: state.dict[key] for key in state.committed_state if key in PLAYER_COLUMNS and key in state.dict}
+
+
+@dataclass
+class DetachedCommit:
+    """Modifications détournées d'une session, journalisées et en attente du commit de celle-ci."""
+    changes: List[Change]
+    # (profil, {attribut: valeur validée avant modification}) : de quoi restaurer si le commit échoue
+    originals: List[Tuple[PlayerProfile, Dict[str, object]]]
+    txid: str
+    segment: str
+
+
+@dataclass
+class PendingRow:
+    """Colonnes d'un profil pas encore écrites en base."""
+    guild_id: str
+    values: Dict[str, object]
+    since: float  # time.monotonic() de la plus ancienne modification non écrite
+
+
+class PlayerStateCache:
+    """
+    Profils modifiés en attente d'écriture, par id de PlayerProfile. Alimenté depuis la boucle asyncio
+    (interactions) et depuis le thread DB du Scheduler (ticks, flushs) : tout accès passe par un verrou,
+    et aucun accès à la base n'a lieu sous ce verrou.
+    Les colonnes d'un flush en cours restent visibles (`_in_flight`) jusqu'à son commit.
+    """
+    def __init__(self, bind, journal_dir: str, enabled: bool = True, fsync: bool = False,
+                 legacy_journal_dir: Optional[str] = None):
+        self.bind = bind
+        self.journal_dir = journal_dir
+        self.legacy_journal_dir = legacy_journal_dir
+        self.enabled = enabled
+        self.fsync = fsync
+        self._pending: Dict[int, PendingRow] = {}
+        self._in_flight: Dict[int, PendingRow] = {}
+        self._lock = threading.Lock()
+        self._journal = None
+        self._journal_path: Optional[str] = None
+        self._closed_segments: List[str] = []
+        # Segment → nombre de commits journalisés pas encore aboutis (segment à garder) et marqueurs qu'il porte
+        self._open_commits: Dict[str, int] = {}
+        self._segment_txids: Dict[str, List[str]] = {}
+        self.journal_key = os.path.basename(os.path.normpath(journal_dir))
+        self._installed = False
+        # Clé de Session.info : modifications directes de profils, reportées dans le cache au commit
+        self._session_key = f"write_behind_changes_{id(self)}"
+        # Métriques
+        self.recorded_changes = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.rows_flushed = 0
+        self.statements = 0
+        self.last_flush_rows = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+        self.journal_records = 0
+        self.journal_bytes = 0
+        self.recovered_rows = 0
+
+    # --- Écritures ---
+
+    def commit(self, session: Session) -> int:
+        """
+        Valide `session` ; les profils joueurs modifiés n'en font pas partie : leurs colonnes partent
+        dans le cache (journal puis flush). Retourne le nombre de profils détournés.
+        """
+        if not self.enabled:
+            session.commit()
+            return 0
+        detached = self._begin_commit(session)
+        try:
+            session.commit()
+        except BaseException:
+            self._abort_commit(detached)
+            raise
+        return self._finish_commit(detached)
+
+    async def commit_async(self, session) -> int:
+        """Équivalent de `commit` pour une AsyncSession."""
+        if not self.enabled:
+            await session.commit()
+            return 0
+        detached = self._begin_commit(session.sync_session)
+        try:
+            await session.commit()
+        except BaseException:
+            self._abort_commit(detached)
+            raise
+        return self._finish_commit(detached)
+
+    async def write_async(self, player: PlayerProfile, values: Dict[str, object]) -> None:
+        """
+        Modifie `player` (attaché ou non à une session) et enregistre `values` sans ouvrir de session.
+        Appelé depuis la boucle asyncio : sans écriture différée, l'UPDATE direct passe par un thread.
+        """
+        for key, value in values.items():
+            set_committed_value(player, key, value)
+        if not self.enabled:
+            await asyncio.to_thread(self._write_direct, {player.id: dict(values)})
+            return
+        self.record([(player.id, player.guild_id, dict(values))])
+
+    def _write_direct(self, rows: Dict[int, Dict[str, object]]) -> None:
+        with self.bind.begin() as connection:
+            self._write_rows(connection, rows)
+
+    def record(self, changes: List[Change]) -> None:
+        """Journalise puis garde en mémoire des modifications déjà validées."""
+        if not changes:
+            return
+        with self._lock:
+            self._append_journal(changes)
+            self._remember(changes)
+
+    def _remember(self, changes: List[Change]) -> None:
+        """Sous verrou : ajoute des modifications validées aux lignes en attente."""
+        now = time.monotonic()
+        for player_id, guild_id, values in changes:
+            row = self._pending.get(player_id)
+            if row is None:
+                self._pending[player_id] = PendingRow(guild_id, dict(values), now)
+            else:
+                row.values.update(values)
+        self.recorded_changes += len(changes)
+
+    def _begin_commit(self, session: Session) -> Optional[DetachedCommit]:
+        """
+        Avant le commit de `session` : détourne les colonnes modifiées des profils (marquées validées, hors UPDATE),
+        les journalise avec un identifiant de transaction et ajoute à la session le marqueur correspondant.
+        """
+        changes, originals = [], []
+        for instance in list(session.identity_map.values()):
+            if not isinstance(instance, PlayerProfile) or instance in session.deleted:
+                continue
+            values = _modified_values(instance)
+            if not values:
+                continue
+            state = inspect(instance)
+            originals.append((instance, {key: state.committed_state[key] for key in values}))
+            for key, value in values.items():
+                set_committed_value(instance, key, value)
+            changes.append((instance.id, instance.guild_id, values))
+        if not changes:
+            return None
+        txid = uuid.uuid4().hex
+        with self._lock:
+            self._append_journal(changes, txid)
+            segment = self._journal_path
+            self._open_commits[segment] = self._open_commits.get(segment, 0) + 1
+            self._segment_txids.setdefault(segment, []).append(txid)
+        session.add(WriteBehindCommit(journal=self.journal_key, txid=txid))
+        return DetachedCommit(changes, originals, txid, segment)
+
+    def _settle(self, segment: str) -> None:
+        """Sous verrou : le commit journalisé dans `segment` est terminé (validé ou annulé)."""
+        remaining = self._open_commits.get(segment, 0) - 1
+        if remaining > 0:
+            self._open_commits[segment] = remaining
+        else:
+            self._open_commits.pop(segment, None)
+
+    def _finish_commit(self, detached: Optional[DetachedCommit]) -> int:
+        """Commit réussi : les modifications journalisées passent en mémoire (lignes en attente)."""
+        if detached is None:
+            return 0
+        with self._lock:
+            self._settle(detached.segment)
+            self._remember(detached.changes)
+        return len(detached.changes)
+
+    def _abort_commit(self, detached: Optional[DetachedCommit]) -> None:
+        """
+        Commit en échec : les profils redeviennent modifiés (valeurs validées d'origine restaurées), comme sans
+        écriture différée. Les lignes journalisées restent sans marqueur : le rejeu les ignore.
+        """
+        if detached is None:
+            return
+        with self._lock:
+            self._settle(detached.segment)
+        for (instance, originals), (_, _, values) in zip(detached.originals, detached.changes):
+            for key, original in originals.items():
+                if original is not NO_VALUE:
+                    set_committed_value(instance, key, original)
+                setattr(instance, key, values[key])
+
+    # --- Lectures : les colonnes en attente passent par-dessus la base ---
+
+    def pending_values(self, player_id: int) -> Dict[str, object]:
+        with self._lock:
+            values = {}
+            for rows in (self._in_flight, self._pending):
+                row = rows.get(player_id)
+                if row is not None:
+                    values.update(row.values)
+            return values
+
+    def _overlay(self, target: PlayerProfile, attrs=None) -> None:
+        if not self._pending and not self._in_flight:
+            return
+        for key, value in self.pending_values(target.id).items():
+            if attrs is None or key in attrs:
+                set_committed_value(target, key, value)
+
+    def _on_load(self, target, _context) -> None:
+        self._overlay(target)
+
+    def _on_refresh(self, target, _context, attrs) -> None:
+        self._overlay(target, attrs)
+
+    # --- Écritures directes (sessions qui ne passent pas par commit) ---
+
+    def _after_flush(self, session: Session, _flush_context) -> None:
+        if not self._pending and not self._in_flight:
+            return
+        changes = session.info.setdefault(self._session_key, [])
+        for instance in session.dirty:
+            if isinstance(instance, PlayerProfile):
+                values = _modified_values(instance)
+                if values:
+                    changes.append((instance.id, instance.guild_id, values))
+        for instance in session.deleted:
+            if isinstance(instance, PlayerProfile):
+                changes.append((instance.id, instance.guild_id, None))
+
+    def _after_commit(self, session: Session) -> None:
+        """Les valeurs écrites directement deviennent celles du cache : un flush plus ancien ne les écrase pas."""
+        changes = session.info.pop(self._session_key, None)
+        if not changes:
+            return
+        tracked = []
+        with self._lock:
+            for player_id, guild_id, values in changes:
+                if values is None:
+                    self._pending.pop(player_id, None)
+                elif player_id in self._pending or player_id in self._in_flight:
+                    tracked.append((player_id, guild_id, values))
+        self.record(tracked)
+
+    def _after_rollback(self, session: Session) -> None:
+        session.info.pop(self._session_key, None)
+
+    # --- Flush ---
+
+    def flush(self) -> int:
+        """
+        Écrit en base les profils en attente, en une transaction (bloquant : thread DB du Scheduler ou arrêt).
+        Un flush déjà en cours ailleurs est laissé finir. En cas d'échec, les lignes restent en attente.
+        Retourne le nombre de profils écrits.
+        """
+        with self._lock:
+            if self._in_flight or not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            self._in_flight = batch
+            self._close_journal()
+            # Un segment portant un commit pas encore abouti est gardé pour le flush suivant
+            segments = [path for path in self._closed_segments if path not in self._open_commits]
+            txids = [txid for path in segments for txid in self._segment_txids.get(path, ())]
+        started = time.perf_counter()
+        lag = time.monotonic() - min(row.since for row in batch.values())
+        try:
+            with self.bind.begin() as connection:
+                statements = self._write_rows(connection, {player_id: row.values for player_id, row in batch.items()})
+                # Les marqueurs des segments supprimés ne servent plus au rejeu
+                if txids:
+                    connection.execute(delete(WriteBehindCommit).where(
+                        WriteBehindCommit.journal == self.journal_key, WriteBehindCommit.txid.in_(txids),
+                    ))
+        except Exception as e:
+            with self._lock:
+                # Les valeurs enregistrées pendant le flush sont plus récentes
+                for player_id, row in batch.items():
+                    newer = self._pending.get(player_id)
+                    if newer is not None:
+                        row.values.update(newer.values)
+                    self._pending[player_id] = row
+                self._in_flight = {}
+                self.failed_flushes += 1
+            logger.error(f"Écriture différée : échec du flush de {len(batch)} profil(s), nouvel essai au prochain flush ({e}).", exc_info=True)
+            return 0
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._in_flight = {}
+            self._closed_segments = [path for path in self._closed_segments if path not in segments]
+            for path in segments:
+                self._segment_txids.pop(path, None)
+            self.flushes += 1
+            self.rows_flushed += len(batch)
+            self.statements += statements
+            self.last_flush_rows = len(batch)
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self.last_lag_seconds = lag
+            self.max_lag_seconds = max(self.max_lag_seconds, lag)
+        for path in segments:
+            try:
+                os.remove(path)
+            except OSError:
+                logger.warning(f"Écriture différée : segment de journal {path} non supprimé.")
+        return len(batch)
+
+    def _write_rows(self, connection, rows: Dict[int, Dict[str, object]]) -> int:
+        """Un UPDATE executemany par table et ensemble de colonnes ; retourne le nombre d'instructions."""
+        groups: Dict[tuple, list] = {}
+        for player_id, values in rows.items():
+            keys_by_table: Dict[object, list] = {}
+            for key in sorted(values):
+                if key in PLAYER_COLUMNS:
+                    keys_by_table.setdefault(PLAYER_COLUMNS[key].table, []).append(key)
+            for table, keys in keys_by_table.items():
+                groups.setdefault((table, tuple(keys)), []).append(
+                    {"_id": player_id, **{f"v_{key}": values[key] for key in keys}}
+                )
+        for (table, keys), parameters in groups.items():
+            # Clé de la ligne : id du profil, ou player_id d'une partie froide
+            key_column = table.primary_key.columns.values()[0]
+            statement = (
+                update(table)
+                .where(key_column == bindparam("_id"))
+                .values({PLAYER_COLUMNS[key]: bindparam(f"v_{key}") for key in keys})
+            )
+            connection.execute(statement, parameters)
+        return len(groups)
+
+    # --- Journal ---
+
+    def _segment_paths(self, journal_dir: Optional[str] = None) -> List[str]:
+        journal_dir = journal_dir or self.journal_dir
+        if not os.path.isdir(journal_dir):
+            return []
+        return sorted(
+            os.path.join(journal_dir, name) for name in os.listdir(journal_dir)
+            if name.startswith("segment-") and name.endswith(".jsonl")
+        )
+
+    def _append_journal(self, changes: List[Change], txid: Optional[str] = None) -> None:
+        if self._journal is None:
+            os.makedirs(self.journal_dir, exist_ok=True)
+            existing = self._segment_paths()
+            number = int(os.path.basename(existing[-1])[8:-6]) + 1 if existing else 1
+            self._journal_path = os.path.join(self.journal_dir, f"segment-{number:08d}.jsonl")
+            self._journal = open(self._journal_path, "a", encoding="utf-8")
+        # "tx" : transaction dont dépend la ligne (rejouée seulement si son marqueur est en base) ;
+        # absent pour les modifications déjà validées ailleurs (écritures directes, write_async)
+        extra = {"tx": txid} if txid else {}
+        text = "".join(
+            json.dumps({"id": player_id, "guild_id": guild_id,
+                        "values": {key: _encode(value) for key, value in values.items()}, **extra}) + "\n"
+            for player_id, guild_id, values in changes
+        )
+        self._journal.write(text)
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+        self.journal_records += len(changes)
+        self.journal_bytes += len(text)
+
+    def _close_journal(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+            self._closed_segments.append(self._journal_path)
+            self._journal, self._journal_path = None, None
+
+    def recover(self) -> int:
+        """
+        Rejoue en base les segments de journal laissés par un arrêt brutal (au démarrage, avant le premier tick).
+        Seuls les segments de ce processus sont rejoués (plus ceux de l'ancien emplacement commun,
+        s'il y en a un), jamais ceux des autres shards, encore en cours d'écriture.
+        Les lignes d'une transaction sans marqueur en base (commit annulé, ou arrêt avant le commit) sont ignorées.
+        Une dernière ligne tronquée est ignorée. Retourne le nombre de profils rétablis.
+        """
+        paths = self._segment_paths()
+        if self.legacy_journal_dir:
+            # Plus anciens : rejoués en premier
+            paths = self._segment_paths(self.legacy_journal_dir) + paths
+        if not paths:
+            return 0
+        rows: Dict[int, Dict[str, object]] = {}
+        skipped = 0
+        with self.bind.begin() as connection:
+            committed = set(connection.execute(
+                select(WriteBehindCommit.txid).where(WriteBehindCommit.journal == self.journal_key)
+            ).scalars())
+            for path in paths:
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        if "tx" in record and record["tx"] not in committed:
+                            skipped += 1
+                            continue
+                        rows.setdefault(record["id"], {}).update(
+                            {key: _decode(value) for key, value in record["values"].items() if key in PLAYER_COLUMNS}
+                        )
+            self._write_rows(connection, rows)
+            connection.execute(delete(WriteBehindCommit).where(WriteBehindCommit.journal == self.journal_key))
+        for path in paths:
+            os.remove(path)
+        self.recovered_rows = len(rows)
+        logger.info(f"Écriture différée : {len(rows)} profil(s) rétabli(s) depuis {len(paths)} segment(s) de journal"
+                    f" ({skipped} ligne(s) de transactions non abouties ignorée(s)).")
+        return len(rows)
+
+    def close(self) -> None:
+        """Ferme le journal courant (arrêt). Les lignes encore en attente y restent pour le prochain démarrage."""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal, self._journal_path = None, None
+
+    # --- Installation et métriques ---
+
+    def install(self) -> None:
+        """Branche le cache sur les événements ORM (chargements de profils, commits des autres sessions)."""
+        if self._installed:
+            return
+        event.listen(PlayerProfile, "load", self._on_load)
+        event.listen(PlayerProfile, "refresh", self._on_refresh)
+        event.listen(Session, "after_flush", self._after_flush)
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_rollback", self._after_rollback)
+        self._installed = True
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            oldest = min((row.since for row in self._pending.values()), default=None)
+            return {
+                "enabled": self.enabled,
+                "pending_rows": len(self._pending),
+                "in_flight_rows": len(self._in_flight),
+                "oldest_pending_seconds": round(time.monotonic() - oldest, 1) if oldest is not None else 0.0,
+                "recorded_changes": self.recorded_changes,
+                "flushes": self.flushes,
+                "failed_flushes": self.failed_flushes,
+                "rows_flushed": self.rows_flushed,
+                "statements": self.statements,
+                "last_flush_rows": self.last_flush_rows,
+                "last_flush_ms": round(self.last_flush_ms, 2),
+                "max_flush_ms": round(self.max_flush_ms, 2),
+                "last_lag_seconds": round(self.last_lag_seconds, 2),
+                "max_lag_seconds": round(self.max_lag_seconds, 2),
+                "journal_records": self.journal_records,
+                "journal_bytes": self.journal_bytes,
+                "recovered_rows": self.recovered_rows,
+            }
+
+    def summary_line(self) -> str:
+        snapshot = self.snapshot()
+        return (
+            f"Écriture différée: {snapshot['pending_rows']} profil(s) en attente, {snapshot['recorded_changes']} modification(s) "
+            f"→ {snapshot['rows_flushed']} ligne(s) écrite(s) en {snapshot['flushes']} flush(s) ; dernier flush "
+            f"{snapshot['last_flush_rows']} ligne(s) en {snapshot['last_flush_ms']:.1f} ms, retard {snapshot['last_lag_seconds']:.1f} s."
+        )
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+PLAYER_STATES = PlayerStateCache(engine, JOURNAL_DIR, WRITE_BEHIND_ENABLED, WRITE_BEHIND_JOURNAL_FSYNC, LEGACY_JOURNAL_DIR)
+if WRITE_BEHIND_ENABLED:
+    PLAYER_STATES.install()
@@ -0,0 +1,259 @@
+# --- scripts/balance_explorer.py ---
+# Explorateur Monte Carlo de l'équilibrage (difficulté × durée de partie), hors ligne.
+# Chaque case de la grille reprend les réglages de AdminCog (BASE_DAILY_RATES × DIFFICULTY_MULTIPLIERS,
+# DURATION_SETTINGS) et simule des milliers de vies avec le code réel : actions CookerBrain,
+# dégradation et réactions en chaîne (moteur groupé). Les vies sont découpées en lots répartis
+# sur un pool de processus ; chaque lot a sa propre graine, le résultat ne dépend donc pas du
+# nombre de processus.
+# Sortie JSON par case : courbe de survie (part des vies sans besoin vital critique à la fin de chaque jour),
+# rechutes (envie de nicotine qui franchit le seuil) et délai avant chaque stat critique.
+#
+# Usage : python scripts/balance_explorer.py [--lives 1000] [--days 14] [--difficulties peaceful medium hard]
+#                                             [--durations test real_time] [--workers 8] [--output rapport.json]
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from statistics import quantiles
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils  # noqa: F401  (initialise le paquet utils avant cogs/*, cf. imports croisés)
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from db.database import Base
+from cogs.admin import AdminCog
+from cogs.cooker_brain import CookerBrain
+from utils import sim_clock
+from utils.offline_sim import advance_population, create_population, START_TIME
+from utils.scheduler_utils import load_active_games, tick_interval_minutes
+from utils.time_manager import get_current_game_time, is_work_time
+
+# Seuils critiques : (stat, sens, valeur). "high" = critique au-dessus, "low" = en dessous.
+CRITICAL_THRESHOLDS = (
+    ("hunger", "high", 95),
+    ("thirst", "high", 95),
+    ("bladder", "high", 100),
+    ("energy", "low", 5),
+    ("health", "low", 10),
+    ("stress", "high", 95),
+    ("boredom", "high", 95),
+    ("fatigue", "high", 95),
+)
+# Stats dont le passage en zone critique met fin à la vie (courbe de survie) ;
+# les autres ne sont que mesurées (délai avant stat critique)
+FATAL_STATS = frozenset(("hunger", "thirst", "bladder", "energy", "health"))
+# Une rechute = l'envie de nicotine franchit ce seuil (le joueur fumerait)
+RELAPSE_CRAVING = 80
+
+# Besoin → action CookerBrain, par ordre de priorité. Seules des actions sans attribut manquant
+# (cf. utils/offline_sim.SCRIPTED_ACTIONS) ; hygiene est exclue : sa dégradation la fait monter.
+NEED_ACTIONS = (
+    ("bladder", 60, "perform_urinate"),
+    ("thirst", 50, "perform_drink_water"),
+    ("hunger", 50, "perform_eat_food"),
+    ("boredom", 60, "perform_check_phone"),
+)
+
+
+def sample_life(rng) -> dict:
+    """Profil de départ tiré au hasard : ancien fumeur qui vient d'arrêter, assiduité du joueur."""
+    return {
+        "stress": rng.uniform(10, 50),
+        "willpower": rng.uniform(30, 90),
+        "nicotine_addiction": rng.uniform(30, 90),
+        "physical_dependence": rng.uniform(10, 80),
+        "substance_tolerance": rng.uniform(10, 70),
+        "food_servings": 60,
+        "water_bottles": 60,
+        "soda_cans": 0,
+        "cigarettes": 0,
+        "last_smoked_at": START_TIME,
+    }
+
+
+def play_turn(brain: CookerBrain, player, game_time, attentiveness: float, rng) -> None:
+    """Joueur simulé : suit les horaires de travail, sinon répond (selon son assiduité) au besoin le plus urgent."""
+    working_hours = is_work_time(game_time)
+    if player.is_working:
+        if not working_hours:
+            brain.perform_go_home(player, game_time)
+        return
+    if working_hours:
+        brain.perform_go_to_work(player, game_time)
+        return
+    if rng.random() >= attentiveness:
+        return
+    for stat, threshold, action in NEED_ACTIONS:
+        if getattr(player, stat) >= threshold:
+            getattr(brain, action)(player)
+            return
+
+
+def is_critical(player, stat: str, direction: str, value: float) -> bool:
+    current = getattr(player, stat)
+    return current >= value if direction == "high" else current <= value
+
+
+def simulate_chunk(task: dict) -> list:
+    """Simule un lot de vies d'une case de la grille (exécuté dans un processus du pool)."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    minutes_per_day = task["minutes_per_day"]
+    server_settings = {f"degradation_rate_{stat}": rate for stat, rate in task["rates"].items()}
+    server_settings.update(duration_key=task["duration"], game_minutes_per_day=minutes_per_day, game_mode=task["difficulty"])
+
+    clock = sim_clock.ManualClock(START_TIME)
+    lives = []
+    with sim_clock.deterministic(task["seed"], clock):
+        rng = sim_clock.rng()
+        profiles = [sample_life(rng) for _ in range(task["lives"])]
+        attentiveness = [rng.uniform(0.3, 1.0) for _ in range(task["lives"])]
+        create_population(session_factory, task["lives"], 30, lambda index: profiles[index], server_settings)
+        db = session_factory(expire_on_commit=False)
+        try:
+            active_games = load_active_games(db)
+            brain = CookerBrain(bot=None)
+            interval = tick_interval_minutes(active_games[0][0])
+            records = [{"critical": {}, "relapses": 0, "first_relapse_day": None, "craving_high": False} for _ in active_games]
+            sections = {}
+            for _ in range(int(task["days"] * minutes_per_day / interval)):
+                now = clock.advance(interval)
+                day = (now - START_TIME).total_seconds() / 60 / minutes_per_day
+                game_time = get_current_game_time(active_games[0][0])
+                for position, (_, player) in enumerate(active_games):
+                    play_turn(brain, player, game_time, attentiveness[position], rng)
+                advance_population(active_games, now, "batch", sections)
+                for record, (_, player) in zip(records, active_games):
+                    for stat, direction, value in CRITICAL_THRESHOLDS:
+                        if stat not in record["critical"] and is_critical(player, stat, direction, value):
+                            record["critical"][stat] = day
+                    craving_high = player.craving_nicotine >= RELAPSE_CRAVING
+                    if craving_high and not record["craving_high"]:
+                        record["relapses"] += 1
+                        if record["first_relapse_day"] is None:
+                            record["first_relapse_day"] = day
+                    record["craving_high"] = craving_high
+        finally:
+            db.close()
+    for record in records:
+        record.pop("craving_high")
+        lives.append(record)
+    return lives
+
+
+def percentiles(values: list) -> dict:
+    """p10 / p50 / p90 (en jours) ; None si trop peu de valeurs."""
+    if len(values) < 2:
+        value = round(values[0], 2) if values else None
+        return {"p10": value, "p50": value, "p90": value}
+    deciles = quantiles(values, n=10, method="inclusive")
+    return {"p10": round(deciles[0], 2), "p50": round(deciles[4], 2), "p90": round(deciles[8], 2)}
+
+
+def summarize_cell(cell: dict, lives: list, days: float) -> dict:
+    failure_days = [min(day for stat, day in life["critical"].items() if stat in FATAL_STATS)
+                    for life in lives if FATAL_STATS & life["critical"].keys()]
+    survival_curve = [
+        round(1 - sum(1 for failure_day in failure_days if failure_day <= day) / len(lives), 4)
+        for day in range(1, int(days) + 1)
+    ]
+    relapsed = [life for life in lives if life["relapses"]]
+    time_to_critical = {}
+    for stat, _, _ in CRITICAL_THRESHOLDS:
+        reached = [life["critical"][stat] for life in lives if stat in life["critical"]]
+        time_to_critical[stat] = {"reached": round(len(reached) / len(lives), 4), **percentiles(reached)}
+    return {
+        **{key: cell[key] for key in ("difficulty", "multiplier", "duration", "minutes_per_day")},
+        "lives": len(lives),
+        "survival_curve": survival_curve,
+        "failure_day": percentiles(failure_days),
+        "relapse": {
+            "rate": round(len(relapsed) / len(lives), 4),
+            "mean_episodes": round(sum(life["relapses"] for life in lives) / len(lives), 3),
+            "first_relapse_day": percentiles([life["first_relapse_day"] for life in relapsed]),
+        },
+        "time_to_critical": time_to_critical,
+    }
+
+
+def build_tasks(difficulties: list, durations: list, lives: int, days: float, chunk: int, seed: int) -> tuple:
+    """Grille difficulté × durée découpée en lots ; la graine d'un lot ne dépend que de sa place dans la grille."""
+    cells, tasks = [], []
+    for difficulty in difficulties:
+        multiplier = AdminCog.DIFFICULTY_MULTIPLIERS[difficulty]
+        for duration in durations:
+            cell = {
+                "difficulty": difficulty,
+                "multiplier": multiplier,
+                "duration": duration,
+                "minutes_per_day": AdminCog.DURATION_SETTINGS[duration]["minutes_per_day"],
+            }
+            for chunk_index, start in enumerate(range(0, lives, chunk)):
+                tasks.append({
+                    **cell,
+                    "cell": len(cells),
+                    "rates": {stat: rate * multiplier for stat, rate in AdminCog.BASE_DAILY_RATES.items()},
+                    "lives": min(chunk, lives - start),
+                    "days": days,
+                    "seed": seed * 1_000_003 + len(cells) * 10_007 + chunk_index,
+                })
+            cells.append(cell)
+    return cells, tasks
+
+
+def explore(difficulties: list, durations: list, lives: int, days: float, workers: int, chunk: int, seed: int) -> dict:
+    started = time.perf_counter()
+    cells, tasks = build_tasks(difficulties, durations, lives, days, chunk, seed)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(simulate_chunk, tasks))
+    else:
+        results = [simulate_chunk(task) for task in tasks]
+
+    lives_by_cell = [[] for _ in cells]
+    for task, chunk_lives in zip(tasks, results):
+        lives_by_cell[task["cell"]].extend(chunk_lives)
+    return {
+        "lives_per_cell": lives,
+        "days": days,
+        "workers": workers,
+        "chunks": len(tasks),
+        "seed": seed,
+        "critical_thresholds": {stat: f"{'>=' if direction == 'high' else '<='} {value}" for stat, direction, value in CRITICAL_THRESHOLDS},
+        "fatal_stats": sorted(FATAL_STATS),
+        "relapse_craving": RELAPSE_CRAVING,
+        "cells": [summarize_cell(cell, cell_lives, days) for cell, cell_lives in zip(cells, lives_by_cell)],
+        "elapsed_seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Explore l'équilibrage difficulté × durée par simulation Monte Carlo.")
+    parser.add_argument("--lives", type=int, default=1000, help="Nombre de vies simulées par case de la grille")
+    parser.add_argument("--days", type=float, default=14, help="Nombre de jours de jeu par vie")
+    parser.add_argument("--difficulties", nargs="+", choices=tuple(AdminCog.DIFFICULTY_MULTIPLIERS),
+                        default=list(AdminCog.DIFFICULTY_MULTIPLIERS), help="Difficultés explorées")
+    parser.add_argument("--durations", nargs="+", choices=tuple(AdminCog.DURATION_SETTINGS),
+                        default=list(AdminCog.DURATION_SETTINGS), help="Durées de partie explorées")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processus du pool (1 = exécution en série)")
+    parser.add_argument("--chunk", type=int, default=100, help="Vies par lot envoyé à un processus")
+    parser.add_argument("--seed", type=int, default=1234, help="Graine du générateur aléatoire")
+    parser.add_argument("--output", help="Fichier JSON de sortie (en plus de la sortie standard)")
+    args = parser.parse_args()
+
+    result = explore(args.difficulties, args.durations, args.lives, args.days, args.workers, args.chunk, args.seed)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# --- scripts/bench_interactions.py ---
+# Banc d'essai de la latence des interactions sous charge concurrente (sans connexion Discord).
+# Rejoue le chemin chaud d'un craft (profil et inventaire en une requête, UPDATE ... RETURNING, commit) par rafales
+# de `--concurrency` interactions simultanées, soit avec SessionLocal (requêtes bloquantes dans la
+# boucle asyncio), soit avec AsyncSessionLocal (aiosqlite). Une base SQLite temporaire (fichier)
+# est utilisée pour que les deux moteurs partagent les mêmes données.
+# Sortie JSON : latences p50 / p99 / max par mode (de l'arrivée à la fin du traitement) et retard
+# de la boucle (LoopLagMonitor), qui est celui subi par les heartbeats et les autres événements.
+#
+# Usage : python scripts/bench_interactions.py [--guilds 200] [--interactions 2000] [--concurrency 50]
+#                                                [--burst-interval 0.25] [--mode sync async]
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from statistics import quantiles
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils  # noqa: F401  (initialise le paquet utils avant cogs/*, cf. imports croisés)
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import joinedload, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from config import DB_ASYNC_POOL_SIZE
+from db.database import Base, install_sqlite_pragmas
+from db.models import PlayerProfile
+from db.queries import get_player
+from utils.offline_sim import create_population
+from utils.scheduler_utils import LoopLagMonitor
+
+# Chemin actuel de CraftSelect.callback : les nouvelles quantités reviennent avec l'UPDATE (pas de relecture)
+CRAFT_UPDATE = text("""
+    UPDATE player_inventory
+    SET joints = joints + 1, weed_grams = weed_grams - 1
+    WHERE player_id = (SELECT id FROM player_profile WHERE guild_id = :guild_id)
+    RETURNING joints, weed_grams
+""")
+
+
+def sync_interaction(session_factory, guild_id: str) -> None:
+    """Chemin de CraftSelect.callback avec SessionLocal (bloque la boucle)."""
+    db = session_factory()
+    try:
+        db.query(PlayerProfile).options(joinedload(PlayerProfile.inventory)).filter_by(guild_id=guild_id).first()
+        db.execute(CRAFT_UPDATE, {'guild_id': guild_id}).first()
+        db.commit()
+    finally:
+        db.close()
+
+
+async def async_interaction(session_factory, guild_id: str) -> None:
+    """Mêmes instructions avec AsyncSessionLocal et db/queries.py."""
+    async with session_factory() as db:
+        await get_player(db, guild_id, cold=("inventory",))
+        (await db.execute(CRAFT_UPDATE, {'guild_id': guild_id})).first()
+        await db.commit()
+
+
+async def run_mode(mode: str, db_path: str, guilds: int, interactions: int, concurrency: int, burst_interval: float) -> dict:
+    if mode == "sync":
+        engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+        install_sqlite_pragmas(engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    else:
+        # Même configuration que db/database.py (pool et pragmas)
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=AsyncAdaptedQueuePool,
+                                     pool_size=DB_ASYNC_POOL_SIZE, max_overflow=0)
+        install_sqlite_pragmas(engine.sync_engine)
+        session_factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    latencies = []
+
+    async def interaction(index: int, arrived: float) -> None:
+        # Latence vue par l'utilisateur : de l'arrivée de l'interaction à la fin de son traitement
+        guild_id = str(100000000000000000 + index % guilds)
+        if mode == "sync":
+            sync_interaction(session_factory, guild_id)
+        else:
+            await async_interaction(session_factory, guild_id)
+        latencies.append(time.perf_counter() - arrived)
+
+    monitor = LoopLagMonitor(interval=0.01)
+    monitor.start()
+    started = time.perf_counter()
+    # Arrivées par rafales de `concurrency` interactions, une rafale toutes les `burst_interval` secondes
+    tasks = []
+    for burst_start in range(0, interactions, concurrency):
+        tasks.extend(asyncio.create_task(interaction(index, time.perf_counter()))
+                     for index in range(burst_start, min(burst_start + concurrency, interactions)))
+        await asyncio.sleep(burst_interval)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    monitor.stop()
+    max_lag, average_lag = monitor.snapshot_and_reset()
+    if mode == "sync":
+        engine.dispose()
+    else:
+        await engine.dispose()
+
+    centiles = quantiles(latencies, n=100, method="inclusive")
+    return {
+        "interactions": interactions,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_per_second": round(interactions / elapsed, 1),
+        "latency_ms": {
+            "p50": round(centiles[49] * 1000, 3),
+            "p99": round(centiles[98] * 1000, 3),
+            "max": round(max(latencies) * 1000, 3),
+        },
+        "loop_lag_ms": {"max": round(max_lag * 1000, 3), "mean": round(average_lag * 1000, 3)},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mesure la latence des interactions DB, synchrone vs asynchrone.")
+    parser.add_argument("--guilds", type=int, default=200, help="Nombre de parties en base")
+    parser.add_argument("--interactions", type=int, default=2000, help="Nombre d'interactions jouées par mode")
+    parser.add_argument("--concurrency", type=int, default=50, help="Interactions simultanées")
+    parser.add_argument("--burst-interval", type=float, default=0.25, help="Secondes entre deux rafales d'interactions")
+    parser.add_argument("--mode", nargs="+", choices=("sync", "async"), default=["sync", "async"], help="Modes mesurés")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "bench.db")
+        engine = create_engine(f"sqlite:///{db_path}")
+        install_sqlite_pragmas(engine)
+        Base.metadata.create_all(engine)
+        create_population(sessionmaker(bind=engine), args.guilds, 30, lambda index: {"weed_grams": 10 ** 6})
+        engine.dispose()
+
+        result = {
+            "guilds": args.guilds,
+            "concurrency": args.concurrency,
+            "modes": {mode: asyncio.run(run_mode(mode, db_path, args.guilds, args.interactions, args.concurrency,
+                                                      args.burst_interval))
+                      for mode in args.mode},
+        }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# --- scripts/bench_simulation.py ---
+# Banc d'essai hors ligne de la simulation (sans connexion Discord).
+# Crée N couples ServerState/PlayerProfile dans une base SQLite en mémoire, puis rejoue
+# M jours de jeu tick par tick : actions scriptées (CookerBrain.perform_*), bilan de travail
+# (update_job_performance), dégradation et réactions en chaîne (mêmes fonctions que Scheduler.tick),
+# écriture différentielle et commit. Le résultat est imprimé en JSON pour suivre les régressions.
+#
+# Usage : python scripts/bench_simulation.py --guilds 500 --days 3 [--engine scalar] [--multi-rate] [--profile-rules] [--trace-memory]
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils  # noqa: F401  (initialise le paquet utils avant cogs/*, cf. imports croisés)
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from db.database import Base
+from cogs.cooker_brain import CookerBrain
+from config import RULE_GROUP_PERIODS
+from utils import sim_clock
+from utils.rule_profiler import PROFILER as RULE_PROFILER
+from utils.offline_sim import create_population, simulate_tick, START_TIME
+from utils.scheduler_utils import load_active_games, QueryCounter
+
+
+def run_benchmark(guilds: int, days: float, tick_minutes: float, engine_name: str, trace_memory: bool, seed: int = 0,
+                  multi_rate: bool = False, profile_rules: bool = False) -> dict:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    create_population(session_factory, guilds, tick_minutes)
+    brain = CookerBrain(bot=None)
+
+    if trace_memory:
+        tracemalloc.start()
+    if profile_rules:
+        RULE_PROFILER.reset()
+        RULE_PROFILER.enabled = True
+    sections = {}
+    ticks = int(days * 1440 / tick_minutes)
+    columns_written = 0
+    db = session_factory(expire_on_commit=False)
+    clock = sim_clock.ManualClock(START_TIME)
+    with sim_clock.deterministic(seed, clock), QueryCounter(engine) as query_counter:
+        active_games = load_active_games(db)
+        started = time.perf_counter()
+        for tick_index in range(1, ticks + 1):
+            now = clock.advance(tick_minutes)
+
+            columns_written += simulate_tick(active_games, now, tick_index, tick_minutes, engine_name, brain, sections,
+                                             RULE_GROUP_PERIODS if multi_rate else None)
+
+            section_start = time.perf_counter()
+            db.commit()
+            sections["commit"] = sections.get("commit", 0.0) + time.perf_counter() - section_start
+        elapsed_seconds = time.perf_counter() - started
+    db.close()
+    rule_profile = RULE_PROFILER.snapshot() if profile_rules else None
+    RULE_PROFILER.enabled = False
+
+    peak_traced = None
+    if trace_memory:
+        peak_traced = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    try:
+        import resource
+        max_rss_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:  # Windows
+        max_rss_kib = None
+
+    return {
+        "engine": engine_name,
+        "rule_periods": RULE_GROUP_PERIODS if multi_rate else None,
+        "guilds": guilds,
+        "days": days,
+        "tick_minutes": tick_minutes,
+        "ticks": ticks,
+        "elapsed_seconds": round(elapsed_seconds, 4),
+        "ticks_per_second": round(ticks / elapsed_seconds, 2) if elapsed_seconds else None,
+        "guild_ticks_per_second": round(ticks * guilds / elapsed_seconds, 1) if elapsed_seconds else None,
+        "ms_per_tick": round(elapsed_seconds / ticks * 1000, 3) if ticks else None,
+        "sections_ms_per_tick": {name: round(seconds / ticks * 1000, 3) for name, seconds in sections.items()} if ticks else {},
+        "sql_queries": query_counter.count,
+        "columns_written": columns_written,
+        "rule_profile": rule_profile,
+        "peak_traced_memory_bytes": peak_traced,
+        "max_rss_kib": max_rss_kib,
+        "python": platform.python_version(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Banc d'essai hors ligne de la simulation.")
+    parser.add_argument("--guilds", type=int, default=200, help="Nombre de serveurs simulés")
+    parser.add_argument("--days", type=float, default=2, help="Nombre de jours de jeu simulés")
+    parser.add_argument("--tick-minutes", type=float, default=30, help="Minutes de jeu par tick")
+    parser.add_argument("--engine", choices=("batch", "scalar"), default="batch", help="Moteur de réactions en chaîne")
+    parser.add_argument("--multi-rate", action="store_true", help="Groupes de règles lentes aux périodes de config.RULE_GROUP_PERIODS (variables RULE_PERIOD_*)")
+    parser.add_argument("--profile-rules", action="store_true", help="Profil de chain_reactions : temps par section, déclenchements par branche")
+    parser.add_argument("--seed", type=int, default=0, help="Graine du générateur aléatoire de la simulation")
+    parser.add_argument("--trace-memory", action="store_true", help="Mesure le pic mémoire Python avec tracemalloc (ralentit l'exécution)")
+    parser.add_argument("--output", help="Fichier JSON de sortie (en plus de la sortie standard)")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.guilds, args.days, args.tick_minutes, args.engine, args.trace_memory, args.seed, args.multi_rate, args.profile_rules)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
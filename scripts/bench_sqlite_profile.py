@@ -0,0 +1,164 @@
+# --- scripts/bench_sqlite_profile.py ---
+# Banc d'essai du profil de stockage SQLite (config.SQLITE_PRAGMAS), sur une base fichier temporaire.
+# Compare le comportement par défaut de SQLite (journal DELETE, synchronous=FULL) au profil configuré :
+#   - latence d'un commit isolé (une interaction : un UPDATE puis commit) ;
+#   - concurrence lecteurs/écrivain : un thread écrit des ticks (UPDATE de toutes les parties, commit)
+#     pendant que des threads lecteurs chargent des profils comme les boutons ; on mesure la latence des
+#     lectures, leur nombre et les erreurs "database is locked".
+# Sortie JSON pour suivre les régressions.
+#
+# Usage : python scripts/bench_sqlite_profile.py [--guilds 500] [--commits 300] [--seconds 5] [--readers 4]
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from statistics import quantiles
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils  # noqa: F401  (initialise le paquet utils avant cogs/*, cf. imports croisés)
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from config import SQLITE_PRAGMAS
+from db.database import Base, install_sqlite_pragmas
+from db.models import PlayerProfile
+from utils.offline_sim import create_population
+
+# Profil par défaut de SQLite (mêmes pragmas, valeurs d'origine)
+DEFAULT_PRAGMAS = {"busy_timeout": 5000, "journal_mode": "DELETE", "synchronous": "FULL"}
+
+TICK_UPDATE = text("UPDATE player_profile SET hunger = hunger + 0.1, thirst = thirst + 0.1")
+INTERACTION_UPDATE = text(
+    "UPDATE player_inventory SET wallet = wallet + 1 "
+    "WHERE player_id = (SELECT id FROM player_profile WHERE guild_id = :guild_id)"
+)
+
+
+def latency_summary(latencies: list) -> dict:
+    if len(latencies) < 2:
+        return {"count": len(latencies)}
+    centiles = quantiles(latencies, n=100, method="inclusive")
+    return {
+        "count": len(latencies),
+        "p50_ms": round(centiles[49] * 1000, 3),
+        "p99_ms": round(centiles[98] * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+    }
+
+
+def guild_id(index: int, guilds: int) -> str:
+    return str(100000000000000000 + index % guilds)
+
+
+def bench_commits(session_factory, guilds: int, commits: int) -> dict:
+    """Latence d'un commit isolé (UPDATE d'un profil puis commit), une session par commit."""
+    latencies = []
+    for index in range(commits):
+        db = session_factory()
+        try:
+            started = time.perf_counter()
+            db.execute(INTERACTION_UPDATE, {"guild_id": guild_id(index, guilds)})
+            db.commit()
+            latencies.append(time.perf_counter() - started)
+        finally:
+            db.close()
+    return latency_summary(latencies)
+
+
+def bench_concurrency(session_factory, guilds: int, seconds: float, readers: int) -> dict:
+    """Un écrivain (ticks) et `readers` lecteurs (profils) en parallèle pendant `seconds` secondes."""
+    stop = threading.Event()
+    read_latencies, tick_latencies = [], []
+    errors = {"reader": 0, "writer": 0}
+    lock = threading.Lock()
+
+    def writer() -> None:
+        while not stop.is_set():
+            db = session_factory()
+            try:
+                started = time.perf_counter()
+                db.execute(TICK_UPDATE)
+                db.commit()
+                tick_latencies.append(time.perf_counter() - started)
+            except OperationalError:
+                db.rollback()
+                errors["writer"] += 1
+            finally:
+                db.close()
+
+    def reader(offset: int) -> None:
+        index = offset
+        local = []
+        while not stop.is_set():
+            db = session_factory()
+            try:
+                started = time.perf_counter()
+                db.query(PlayerProfile).filter_by(guild_id=guild_id(index, guilds)).first()
+                db.commit()
+                local.append(time.perf_counter() - started)
+            except OperationalError:
+                db.rollback()
+                with lock:
+                    errors["reader"] += 1
+            finally:
+                db.close()
+            index += readers
+        with lock:
+            read_latencies.extend(local)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader, args=(offset,)) for offset in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {
+        "reads": latency_summary(read_latencies),
+        "reads_per_second": round(len(read_latencies) / seconds, 1),
+        "ticks": latency_summary(tick_latencies),
+        "locked_errors": errors,
+    }
+
+
+def run_profile(pragmas: dict, guilds: int, commits: int, seconds: float, readers: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", connect_args={"check_same_thread": False})
+        install_sqlite_pragmas(engine, pragmas)
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        create_population(session_factory, guilds, 30)
+        with engine.connect() as connection:
+            journal_mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+        result = {
+            "pragmas": pragmas,
+            "journal_mode": journal_mode,
+            "commit_latency": bench_commits(session_factory, guilds, commits),
+            "concurrency": bench_concurrency(session_factory, guilds, seconds, readers),
+        }
+        engine.dispose()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare le profil SQLite par défaut au profil configuré (SQLITE_PRAGMAS).")
+    parser.add_argument("--guilds", type=int, default=500, help="Nombre de parties en base")
+    parser.add_argument("--commits", type=int, default=300, help="Commits isolés mesurés par profil")
+    parser.add_argument("--seconds", type=float, default=5, help="Durée du test lecteurs/écrivain par profil")
+    parser.add_argument("--readers", type=int, default=4, help="Threads lecteurs")
+    args = parser.parse_args()
+
+    result = {
+        profile: run_profile(pragmas, args.guilds, args.commits, args.seconds, args.readers)
+        for profile, pragmas in (("default", DEFAULT_PRAGMAS), ("configured", SQLITE_PRAGMAS))
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# --- scripts/golden_traces.py ---
+# Traces de référence (golden traces) de la simulation, en mode déterministe.
+# `record` rejoue quelques jours de jeu avec une graine et une horloge injectées, et enregistre
+# l'état complet de chaque joueur à intervalles réguliers. `verify` rejoue le même scénario
+# (avec le moteur choisi) et compare chaque valeur à la trace : un moteur optimisé doit la reproduire.
+#
+# Usage : python scripts/golden_traces.py record
+#         python scripts/golden_traces.py verify [--engine scalar] [--tolerance 1e-9]
+
+import argparse
+import datetime
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils  # noqa: F401  (initialise le paquet utils avant cogs/*, cf. imports croisés)
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from db.database import Base
+from db.models import player_values
+from cogs.cooker_brain import CookerBrain
+from utils import sim_clock
+from utils.batch_calculations import CHAIN_REACTION_STATS
+from utils.calculations import calculate_overall_mood
+from utils.offline_sim import create_population, simulate_tick, START_TIME
+from utils.scheduler_utils import load_active_games
+
+TRACE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden", "traces.json")
+
+# Scénario enregistré : le modifier impose de réenregistrer les traces
+SCENARIO = {"seed": 1234, "guilds": 6, "days": 3, "tick_minutes": 30, "snapshot_every_ticks": 12}
+
+
+def _serialize(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def _snapshot(active_games) -> dict:
+    """État complet (toutes les colonnes, parties froides comprises) de chaque joueur, plus l'humeur calculée (qui consomme le RNG)."""
+    snapshot = {}
+    for _, player in active_games:
+        state = {key: _serialize(value) for key, value in player_values(player).items()}
+        state["_mood_score"] = calculate_overall_mood(player)[0]
+        snapshot[player.guild_id] = state
+    return snapshot
+
+
+def run_scenario(engine_name: str, scenario: dict = SCENARIO) -> list:
+    """Rejoue le scénario en mode déterministe et retourne la liste des instantanés."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    clock = sim_clock.ManualClock(START_TIME)
+    snapshots = []
+    with sim_clock.deterministic(scenario["seed"], clock):
+        rng = sim_clock.rng()
+
+        def initial_state(index: int) -> dict:
+            # États de départ variés pour que chaque règle des réactions en chaîne soit exercée
+            state = {stat: rng.uniform(0, 100) for stat in CHAIN_REACTION_STATS}
+            state["blood_pressure"] = rng.uniform(90, 170)
+            return state
+
+        create_population(session_factory, scenario["guilds"], scenario["tick_minutes"], initial_state)
+        db = session_factory(expire_on_commit=False)
+        try:
+            active_games = load_active_games(db)
+            brain = CookerBrain(bot=None)
+            ticks = int(scenario["days"] * 1440 / scenario["tick_minutes"])
+            for tick_index in range(1, ticks + 1):
+                now = clock.advance(scenario["tick_minutes"])
+                simulate_tick(active_games, now, tick_index, scenario["tick_minutes"], engine_name, brain, {})
+                db.commit()
+                if tick_index % scenario["snapshot_every_ticks"] == 0:
+                    snapshots.append({"tick": tick_index, "time": now.isoformat(), "players": _snapshot(active_games)})
+        finally:
+            db.close()
+    return snapshots
+
+
+def compare(expected: list, actual: list, tolerance: float) -> list:
+    """Liste des écarts (tick, serveur, colonne, attendu, obtenu) entre deux traces."""
+    mismatches = []
+    for expected_snapshot, actual_snapshot in zip(expected, actual):
+        for guild_id, expected_state in expected_snapshot["players"].items():
+            actual_state = actual_snapshot["players"].get(guild_id, {})
+            for key, expected_value in expected_state.items():
+                actual_value = actual_state.get(key)
+                if isinstance(expected_value, float) and isinstance(actual_value, (int, float)):
+                    equal = abs(expected_value - actual_value) <= tolerance
+                else:
+                    equal = expected_value == actual_value
+                if not equal:
+                    mismatches.append((expected_snapshot["tick"], guild_id, key, expected_value, actual_value))
+    if len(expected) != len(actual):
+        mismatches.append(("-", "-", "snapshots", len(expected), len(actual)))
+    return mismatches
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Enregistre ou vérifie les traces de référence de la simulation.")
+    parser.add_argument("command", choices=("record", "verify"))
+    parser.add_argument("--engine", choices=("batch", "scalar"), default="scalar",
+                        help="Moteur utilisé (la référence est enregistrée avec le moteur scalaire)")
+    parser.add_argument("--tolerance", type=float, default=0.0, help="Écart toléré sur les valeurs flottantes")
+    args = parser.parse_args()
+
+    snapshots = run_scenario(args.engine)
+    if args.command == "record":
+        os.makedirs(os.path.dirname(TRACE_FILE), exist_ok=True)
+        with open(TRACE_FILE, "w", encoding="utf-8") as f:
+            json.dump({"scenario": SCENARIO, "engine": args.engine, "snapshots": snapshots}, f, indent=1, sort_keys=True)
+            f.write("\n")
+        print(f"{len(snapshots)} instantané(s) enregistré(s) dans {TRACE_FILE}")
+        return
+
+    with open(TRACE_FILE, encoding="utf-8") as f:
+        golden = json.load(f)
+    if golden["scenario"] != SCENARIO:
+        sys.exit("Le scénario a changé depuis l'enregistrement : relancez `record`.")
+    mismatches = compare(golden["snapshots"], json.loads(json.dumps(snapshots)), args.tolerance)
+    for tick, guild_id, key, expected_value, actual_value in mismatches[:20]:
+        print(f"tick {tick} serveur {guild_id} {key}: attendu {expected_value!r}, obtenu {actual_value!r}")
+    print(f"{len(mismatches)} écart(s) ({args.engine}, tolérance {args.tolerance}).")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
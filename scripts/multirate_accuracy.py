@@ -0,0 +1,117 @@
+# --- scripts/multirate_accuracy.py ---
+# Rapport de précision de la simulation multi-cadence.
+# Rejoue le même scénario déterministe deux fois : référence (toutes les règles à chaque tick)
+# puis groupes de règles lentes aux périodes choisies (coefficients multipliés par la période).
+# Compare les trajectoires de chaque stat simulée tick par tick et le temps CPU de l'étape des stats.
+#
+# Usage : python scripts/multirate_accuracy.py [--guilds 50] [--days 7] [--period 4] [--output rapport.json]
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils  # noqa: F401  (initialise le paquet utils avant cogs/*, cf. imports croisés)
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from db.database import Base
+from cogs.cooker_brain import CookerBrain
+from config import RULE_GROUP_PERIODS
+from utils import sim_clock
+from utils.batch_calculations import CHAIN_REACTION_STATS, SIMULATED_STATS
+from utils.offline_sim import create_population, simulate_tick, START_TIME
+from utils.scheduler_utils import load_active_games
+
+
+def run_trajectories(guilds: int, days: float, tick_minutes: float, engine_name: str, seed: int, rule_periods):
+    """Rejoue le scénario ; retourne les trajectoires [tick][joueur][stat] et le temps passé dans l'étape des stats."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    clock = sim_clock.ManualClock(START_TIME)
+    trajectories, sections = [], {}
+    with sim_clock.deterministic(seed, clock):
+        rng = sim_clock.rng()
+
+        def initial_state(index: int) -> dict:
+            # États de départ variés, comme les traces de référence
+            state = {stat: rng.uniform(0, 100) for stat in CHAIN_REACTION_STATS}
+            state["blood_pressure"] = rng.uniform(90, 170)
+            return state
+
+        create_population(session_factory, guilds, tick_minutes, initial_state)
+        db = session_factory(expire_on_commit=False)
+        try:
+            active_games = load_active_games(db)
+            brain = CookerBrain(bot=None)
+            for tick_index in range(1, int(days * 1440 / tick_minutes) + 1):
+                now = clock.advance(tick_minutes)
+                simulate_tick(active_games, now, tick_index, tick_minutes, engine_name, brain, sections, rule_periods)
+                db.commit()
+                trajectories.append([[getattr(player, stat) for stat in SIMULATED_STATS] for _, player in active_games])
+        finally:
+            db.close()
+    return trajectories, sections.get("stats", 0.0)
+
+
+def accuracy_report(guilds: int, days: float, tick_minutes: float, engine_name: str, seed: int, rule_periods: dict) -> dict:
+    started = time.perf_counter()
+    reference, reference_seconds = run_trajectories(guilds, days, tick_minutes, engine_name, seed, None)
+    multi_rate, multi_rate_seconds = run_trajectories(guilds, days, tick_minutes, engine_name, seed, rule_periods)
+
+    per_stat = {}
+    for position, stat in enumerate(SIMULATED_STATS):
+        errors = [abs(ref_player[position] - player[position])
+                  for ref_tick, tick in zip(reference, multi_rate) for ref_player, player in zip(ref_tick, tick)]
+        final_errors = [abs(ref_player[position] - player[position]) for ref_player, player in zip(reference[-1], multi_rate[-1])]
+        if max(errors) > 0:
+            per_stat[stat] = {
+                "max_abs_error": round(max(errors), 4),
+                "mean_abs_error": round(sum(errors) / len(errors), 4),
+                "final_mean_abs_error": round(sum(final_errors) / len(final_errors), 4),
+            }
+    ticks = len(reference)
+    return {
+        "engine": engine_name,
+        "guilds": guilds,
+        "days": days,
+        "tick_minutes": tick_minutes,
+        "ticks": ticks,
+        "rule_periods": rule_periods,
+        "stats_ms_per_tick": {
+            "reference": round(reference_seconds / ticks * 1000, 3),
+            "multi_rate": round(multi_rate_seconds / ticks * 1000, 3),
+        },
+        "stats_with_error": len(per_stat),
+        "errors": dict(sorted(per_stat.items(), key=lambda item: -item[1]["max_abs_error"])),
+        "elapsed_seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare la simulation multi-cadence à la référence (toutes les règles à chaque tick).")
+    parser.add_argument("--guilds", type=int, default=50, help="Nombre de serveurs simulés")
+    parser.add_argument("--days", type=float, default=7, help="Nombre de jours de jeu simulés")
+    parser.add_argument("--tick-minutes", type=float, default=30, help="Minutes de jeu par tick")
+    parser.add_argument("--engine", choices=("batch", "scalar"), default="batch", help="Moteur de réactions en chaîne")
+    parser.add_argument("--period", type=int, default=4,
+                        help="Période commune des groupes lents (0 : périodes de config.RULE_GROUP_PERIODS, 1 par défaut)")
+    parser.add_argument("--seed", type=int, default=1234, help="Graine du générateur aléatoire de la simulation")
+    parser.add_argument("--output", help="Fichier JSON de sortie (en plus de la sortie standard)")
+    args = parser.parse_args()
+
+    rule_periods = {group: args.period for group in RULE_GROUP_PERIODS} if args.period else dict(RULE_GROUP_PERIODS)
+    result = accuracy_report(args.guilds, args.days, args.tick_minutes, args.engine, args.seed, rule_periods)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
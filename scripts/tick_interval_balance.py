@@ -0,0 +1,107 @@
+# --- scripts/tick_interval_balance.py ---
+# Vérifie que l'intervalle de tick d'un serveur ne change pas l'équilibre du jeu : l'évolution des stats
+# (dégradation + réactions en chaîne, utils.calculations.advance_state) est rejouée sur plusieurs jours
+# pour une population aux états de départ variés, avec des ticks d'une minute (référence) puis avec
+# des ticks plus longs. Le pas de simulation (SIM_STEP_MINUTES) étant fixe, les trajectoires doivent
+# coïncider à chaque instant commun. À titre de comparaison, l'écart obtenu avec un seul pas par tick
+# (pas = intervalle de tick) est aussi affiché.
+#
+# Usage : python scripts/tick_interval_balance.py [--intervals 5 15 30] [--days 2] [--engine scalar]
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils  # noqa: F401  (initialise le paquet utils avant cogs/*, cf. imports croisés)
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from config import CATCHUP_MAX_STEPS, RULE_GROUP_PERIODS
+from db.database import Base
+from utils import sim_clock
+from utils.batch_calculations import advance_states_batch, CHAIN_REACTION_STATS, SIMULATED_STATS
+from utils.calculations import advance_state
+from utils.offline_sim import create_population, START_TIME
+from utils.scheduler_utils import load_active_games, stat_evolution_inputs
+
+
+def run_stats(tick_minutes: float, days: float, guilds: int, seed: int, engine_name: str,
+              step_per_tick: bool = False) -> dict:
+    """Rejoue l'évolution des stats seule ; retourne {minute écoulée: [[stat par joueur]]} à chaque tick."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    clock = sim_clock.ManualClock(START_TIME)
+    trajectory = {}
+    with sim_clock.deterministic(seed, clock):
+        rng = sim_clock.rng()
+
+        def initial_state(index: int) -> dict:
+            state = {stat: rng.uniform(0, 100) for stat in CHAIN_REACTION_STATS}
+            state["blood_pressure"] = rng.uniform(90, 170)
+            return state
+
+        create_population(session_factory, guilds, tick_minutes, initial_state)
+        db = session_factory(expire_on_commit=False)
+        try:
+            active_games = load_active_games(db)
+            states = [{stat: getattr(player, stat) for stat in SIMULATED_STATS} for _, player in active_games]
+            for tick_index in range(1, int(days * 1440 / tick_minutes) + 1):
+                now = clock.advance(tick_minutes)
+                inputs = [stat_evolution_inputs(server_state, player, now) for server_state, player in active_games]
+                steps = [tick_minutes if step_per_tick else step for _, _, step in inputs]
+                if engine_name == "batch":
+                    cols, _, _ = advance_states_batch(
+                        states, [rates for rates, _, _ in inputs], [elapsed for _, elapsed, _ in inputs], steps,
+                        now, [None] * len(states), CATCHUP_MAX_STEPS, RULE_GROUP_PERIODS,
+                    )
+                    states = [{stat: float(values[index]) for stat, values in cols.items()} for index in range(len(states))]
+                else:
+                    states = [advance_state(dict(state), rates, elapsed, step, now, None, CATCHUP_MAX_STEPS, RULE_GROUP_PERIODS)[0]
+                              for state, (rates, elapsed, _), step in zip(states, inputs, steps)]
+                for _, player in active_games:
+                    player.last_update = now
+                trajectory[round(tick_index * tick_minutes)] = [[state[stat] for stat in SIMULATED_STATS] for state in states]
+        finally:
+            db.close()
+    engine.dispose()
+    return trajectory
+
+
+def max_deviation(reference: dict, trajectory: dict) -> tuple:
+    """Plus grand écart absolu (écart, minute, stat) aux instants communs aux deux trajectoires."""
+    worst = (0.0, None, None)
+    for minute, players in trajectory.items():
+        for expected, actual in zip(reference[minute], players):
+            for stat, expected_value, actual_value in zip(SIMULATED_STATS, expected, actual):
+                if abs(expected_value - actual_value) > worst[0]:
+                    worst = (abs(expected_value - actual_value), minute, stat)
+    return worst
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Vérifie que l'intervalle de tick ne change pas l'évolution des stats.")
+    parser.add_argument("--intervals", type=float, nargs="+", default=(5, 15, 30), help="Intervalles de tick comparés (minutes)")
+    parser.add_argument("--days", type=float, default=2)
+    parser.add_argument("--guilds", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--engine", choices=("batch", "scalar"), default="scalar")
+    parser.add_argument("--tolerance", type=float, default=1e-9, help="Écart toléré sur les valeurs flottantes")
+    args = parser.parse_args()
+
+    reference = run_stats(1, args.days, args.guilds, args.seed, args.engine)
+    failed = False
+    for interval in args.intervals:
+        deviation, minute, stat = max_deviation(reference, run_stats(interval, args.days, args.guilds, args.seed, args.engine))
+        legacy = max_deviation(reference, run_stats(interval, args.days, args.guilds, args.seed, args.engine, step_per_tick=True))
+        failed |= deviation > args.tolerance
+        print(f"tick de {interval:g} min : écart max {deviation:.3g}" + (f" ({stat} à {minute} min)" if stat else "")
+              + f" ; un pas par tick : {legacy[0]:.3g} ({legacy[2]} à {legacy[1]} min)")
+    print(f"{'ÉCHEC' if failed else 'OK'} ({args.engine}, tolérance {args.tolerance}).")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# --- scripts/tick_query_budget.py ---
+# Vérifie que la phase DB du tick (Scheduler._db_phase) exécute un nombre de requêtes SQL
+# indépendant du nombre de serveurs, à toute heure de jeu : une journée complète est rejouée
+# (bilan quotidien et rapport de 17h30 compris) pour deux tailles de population, et le nombre
+# de requêtes de chaque tick (QueryCounter) doit être identique. Un chargement paresseux oublié
+# (une requête par serveur) fait diverger les deux séries.
+#
+# Usage : python scripts/tick_query_budget.py [--guilds 4 40] [--tick-minutes 30]
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils  # noqa: F401  (initialise le paquet utils avant cogs/*, cf. imports croisés)
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from db.database import Base
+from db.write_behind import PlayerStateCache
+import cogs.scheduler as scheduler_module
+from cogs.cooker_brain import CookerBrain
+from utils import sim_clock
+from utils.offline_sim import create_population, START_TIME
+
+
+class _OfflineBot:
+    """Bot minimal : la phase DB du tick ne lit aucun cog hors CookerBrain, passé explicitement."""
+    def get_cog(self, name):
+        return None
+
+
+async def run_day(guilds: int, tick_minutes: float, seed: int = 0) -> list:
+    """Rejoue une journée de ticks sur une base en mémoire ; retourne [(heure de jeu, requêtes)] par tick."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    # Volonté alternée : la moitié des joueurs va travailler seule (rapport de 17h30 exercé)
+    create_population(session_factory, guilds, tick_minutes, lambda index: {"willpower": 80 if index % 2 else 50})
+    scheduler_module.SessionLocal = session_factory
+    scheduler_module.engine = engine
+    with tempfile.TemporaryDirectory() as journal_dir:
+        player_states = PlayerStateCache(engine, journal_dir, True)
+        player_states.install()
+        scheduler_module.PLAYER_STATES = player_states
+        clock = sim_clock.ManualClock(START_TIME)
+        counts = []
+        with sim_clock.deterministic(seed, clock):
+            scheduler = scheduler_module.Scheduler(_OfflineBot())
+            scheduler.tick.cancel()
+            scheduler.flush_player_states.cancel()
+            brain = CookerBrain(bot=None)
+            guild_ids = [str(100000000000000000 + index) for index in range(guilds)]
+            for _ in range(int(1440 / tick_minutes)):
+                now = clock.advance(tick_minutes)
+                _, failures, queries = scheduler._db_phase(guild_ids, brain)
+                if failures:
+                    sys.exit(f"{now:%H:%M} : serveur(s) en échec {sorted(failures)}")
+                counts.append((now.strftime("%H:%M"), queries))
+                player_states.flush()
+    engine.dispose()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Vérifie que le nombre de requêtes d'un tick ne dépend pas du nombre de serveurs.")
+    parser.add_argument("--guilds", type=int, nargs=2, default=(4, 40), help="Les deux tailles de population comparées")
+    parser.add_argument("--tick-minutes", type=float, default=30)
+    args = parser.parse_args()
+
+    small, large = (asyncio.run(run_day(guilds, args.tick_minutes)) for guilds in args.guilds)
+    mismatches = [(time, expected, actual) for (time, expected), (_, actual) in zip(small, large) if expected != actual]
+    for time, expected, actual in mismatches:
+        print(f"{time} : {expected} requête(s) pour {args.guilds[0]} serveurs, {actual} pour {args.guilds[1]}")
+    print(f"{len(small)} tick(s), {min(q for _, q in small)} à {max(q for _, q in small)} requête(s) par tick, "
+          f"{len(mismatches)} écart(s).")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
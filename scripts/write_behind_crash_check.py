@@ -0,0 +1,157 @@
+# --- scripts/write_behind_crash_check.py ---
+# Vérifie les garanties de l'écriture différée (db/write_behind.py) face aux pannes, sur une base temporaire :
+# - arrêt brutal entre le commit de la session et la mise en mémoire : le redémarrage (recover) rétablit
+#   les colonnes du profil en même temps que le reste de la transaction (partie froide, ServerState) ;
+# - arrêt après la journalisation mais avant le commit : rien n'est rejoué ;
+# - commit en échec : le profil redevient modifié, rien n'est gardé en mémoire ni rejoué ;
+# - flush normal : segments de journal et marqueurs de transaction sont supprimés.
+#
+# Usage : python scripts/write_behind_crash_check.py
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils  # noqa: F401  (initialise le paquet utils avant cogs/*, cf. imports croisés)
+from sqlalchemy import create_engine, event, func, inspect, select
+from sqlalchemy.orm import sessionmaker
+from db.database import Base
+from db.models import PlayerProfile, ServerState, WriteBehindCommit
+from db.write_behind import PlayerStateCache
+
+
+class SimulatedCrash(BaseException):
+    """Arrêt brutal simulé : rien après lui ne s'exécute dans le processus."""
+
+
+def _setup(directory: str):
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'check.db')}")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    db = session_factory()
+    db.add(ServerState(guild_id="1"))
+    db.add(PlayerProfile(guild_id="1", hunger=10.0, joints=0))
+    db.commit()
+    db.close()
+    return engine, session_factory
+
+
+def _restart(engine, journal_dir: str) -> PlayerStateCache:
+    """Nouveau processus : cache vide sur le même journal, puis rejeu."""
+    cache = PlayerStateCache(engine, journal_dir, True)
+    cache.recover()
+    return cache
+
+
+def _row(session_factory):
+    db = session_factory()
+    try:
+        player = db.query(PlayerProfile).filter_by(guild_id="1").one()
+        state = db.query(ServerState).filter_by(guild_id="1").one()
+        markers = db.scalar(select(func.count()).select_from(WriteBehindCommit))
+        return player.hunger, player.joints, state.game_channel_id, markers
+    finally:
+        db.close()
+
+
+def _modify(db):
+    player = db.query(PlayerProfile).filter_by(guild_id="1").one()
+    player.hunger = 55.0          # ligne chaude : écriture différée
+    player.joints = 3             # partie froide : écrite par le commit
+    db.query(ServerState).filter_by(guild_id="1").one().game_channel_id = 42
+    return player
+
+
+def check_crash_after_commit(directory: str) -> list:
+    engine, session_factory = _setup(directory)
+    journal_dir = os.path.join(directory, "journal")
+    cache = PlayerStateCache(engine, journal_dir, True)
+    cache._finish_commit = lambda detached: (_ for _ in ()).throw(SimulatedCrash())
+    db = session_factory()
+    _modify(db)
+    try:
+        cache.commit(db)
+    except SimulatedCrash:
+        pass
+    before = _row(session_factory)
+    _restart(engine, journal_dir)
+    after = _row(session_factory)
+    return [] if before[1:3] == (3, 42) and after == (55.0, 3, 42, 0) else [
+        f"arrêt après commit : base {before} avant rejeu, {after} après (attendu (55.0, 3, 42, 0))"
+    ]
+
+
+def check_crash_before_commit(directory: str) -> list:
+    engine, session_factory = _setup(directory)
+    journal_dir = os.path.join(directory, "journal")
+    cache = PlayerStateCache(engine, journal_dir, True)
+    db = session_factory()
+    _modify(db)
+    cache._begin_commit(db)  # journalisé, puis arrêt avant session.commit()
+    _restart(engine, journal_dir)
+    after = _row(session_factory)
+    return [] if after == (10.0, 0, None, 0) else [f"arrêt avant commit : base {after} (attendu (10.0, 0, None, 0))"]
+
+
+def check_failed_commit(directory: str) -> list:
+    engine, session_factory = _setup(directory)
+    journal_dir = os.path.join(directory, "journal")
+    cache = PlayerStateCache(engine, journal_dir, True)
+    db = session_factory()
+    player = _modify(db)
+
+    def refuse(_session):
+        raise RuntimeError("commit refusé")
+    event.listen(db, "before_commit", refuse)
+    errors = []
+    try:
+        cache.commit(db)
+        errors.append("commit en échec : aucune exception propagée")
+    except RuntimeError:
+        pass
+    history = inspect(player).attrs.hunger.history
+    if list(history.added) != [55.0] or list(history.deleted) != [10.0]:
+        errors.append(f"commit en échec : profil non restauré (historique {history})")
+    if len(cache):
+        errors.append(f"commit en échec : {len(cache)} profil(s) gardé(s) en mémoire")
+    db.rollback()
+    db.close()
+    _restart(engine, journal_dir)
+    after = _row(session_factory)
+    if after != (10.0, 0, None, 0):
+        errors.append(f"commit en échec : base {after} après rejeu (attendu (10.0, 0, None, 0))")
+    return errors
+
+
+def check_flush(directory: str) -> list:
+    engine, session_factory = _setup(directory)
+    journal_dir = os.path.join(directory, "journal")
+    cache = PlayerStateCache(engine, journal_dir, True)
+    db = session_factory()
+    _modify(db)
+    cache.commit(db)
+    db.close()
+    cache.flush()
+    after = _row(session_factory)
+    leftovers = os.listdir(journal_dir)
+    return [] if after == (55.0, 3, 42, 0) and not leftovers else [
+        f"flush : base {after}, segments restants {leftovers} (attendu (55.0, 3, 42, 0), aucun segment)"
+    ]
+
+
+def main() -> None:
+    errors = []
+    for check in (check_crash_after_commit, check_crash_before_commit, check_failed_commit, check_flush):
+        with tempfile.TemporaryDirectory() as directory:
+            found = check(directory)
+        print(f"{check.__name__}: {'OK' if not found else 'ÉCHEC'}")
+        errors += found
+    for error in errors:
+        print(error)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# --- utils/activities.py ---
+# Table compilée des activités (sport, méditation, travail...) utilisée par `process_activity_impact`.
+# Les définitions sont compilées une seule fois, à l'import : chaque stat est résolue en indice
+# dans ACTIVITY_STATS et vérifiée contre les colonnes de PlayerProfile (une stat inconnue lève
+# une ValueError au chargement au lieu d'être ignorée à chaque appel).
+# Une activité s'applique à un joueur (boucle sur des tuples) ou à une population entière
+# (addition vectorielle NumPy sur une matrice joueurs × ACTIVITY_STATS).
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Mapping, Sequence, Tuple
+import numpy as np
+from sqlalchemy import inspect
+from db.models import PlayerProfile
+from utils.helpers import clamp
+
+# Durée de référence des définitions : facteur de durée 1 pour 30 minutes
+ACTIVITY_BASE_MINUTES = 30.0
+# Au-delà, l'activité fatigue en plus (effets appliqués après ceux de l'activité)
+LONG_ACTIVITY_MINUTES = 120
+LONG_ACTIVITY_EFFECTS = {"fatigue": +20, "energy": -15}
+# Variation à partir de laquelle un message est affiché
+SIGNIFICANT_CHANGE = 15
+
+# Variation des stats pour 30 minutes d'activité.
+# `physical_fitness` (sport) a été retirée : la colonne n'existe pas sur PlayerProfile
+# et l'effet était ignoré silencieusement.
+ACTIVITY_DEFINITIONS: Dict[str, Dict[str, float]] = {
+    "sport": {
+        "energy": -15,
+        "stamina": +5,
+        "health": +3,
+        "stress": -10,
+        "mood_volatility": -5,
+        "emotional_stability": +2,
+        "mental_clarity": +8,
+    },
+    "meditation": {
+        "stress": -15,
+        "emotional_stability": +4,
+        "mental_clarity": +10,
+        "concentration": +8,
+        "mood_volatility": -8,
+        "anxiety": -12,
+        "serenity": +10,
+    },
+    "social": {
+        "social_energy": -10,
+        "loneliness": -20,
+        "social_anxiety": -5,
+        "happiness": +8,
+        "emotional_stability": +2,
+        "stress": -5,
+    },
+    "work": {
+        "mental_clarity": -5,
+        "energy": -10,
+        "stress": +8,
+        "cognitive_load": +15,
+        "decision_making": +2,
+    },
+    "rest": {
+        "energy": +15,
+        "fatigue": -20,
+        "stress": -8,
+        "mental_clarity": +5,
+        "cognitive_load": -10,
+    },
+}
+
+
+@dataclass(frozen=True)
+class CompiledActivity:
+    """Activité compilée : stats, indices dans ACTIVITY_STATS et variations pour 30 minutes."""
+    name: str
+    index: int
+    stats: Tuple[str, ...]
+    indices: Tuple[int, ...]
+    deltas: Tuple[float, ...]
+
+
+def compile_activities(definitions: Mapping[str, Mapping[str, float]], known_stats: Sequence[str]
+                       ) -> Tuple[Tuple[str, ...], Dict[str, CompiledActivity]]:
+    """
+    Valide et compile les définitions. Retourne l'ordre des stats (ACTIVITY_STATS) et les activités par nom.
+    Lève ValueError si une définition (ou LONG_ACTIVITY_EFFECTS) référence une stat absente de `known_stats`.
+    """
+    known = set(known_stats)
+    used = [stat for effects in (*definitions.values(), LONG_ACTIVITY_EFFECTS) for stat in effects]
+    unknown = sorted(set(used) - known)
+    if unknown:
+        raise ValueError(f"Stats d'activité inconnues de PlayerProfile : {', '.join(unknown)}")
+    stats = tuple(dict.fromkeys(used))
+    position = {stat: index for index, stat in enumerate(stats)}
+    activities = {
+        name: CompiledActivity(
+            name=name,
+            index=index,
+            stats=tuple(effects),
+            indices=tuple(position[stat] for stat in effects),
+            deltas=tuple(float(value) for value in effects.values()),
+        )
+        for index, (name, effects) in enumerate(definitions.items())
+    }
+    return stats, activities
+
+
+ACTIVITY_STATS, ACTIVITIES = compile_activities(
+    ACTIVITY_DEFINITIONS, [attr.key for attr in inspect(PlayerProfile).column_attrs],
+)
+_LONG_EFFECTS = tuple((stat, ACTIVITY_STATS.index(stat), float(value)) for stat, value in LONG_ACTIVITY_EFFECTS.items())
+
+# Forme dense pour le calcul groupé : une ligne par activité (ordre de ACTIVITIES)
+_DELTA_MATRIX = np.zeros((len(ACTIVITIES), len(ACTIVITY_STATS)))
+_TOUCHED = np.zeros((len(ACTIVITIES), len(ACTIVITY_STATS)), dtype=bool)
+for _activity in ACTIVITIES.values():
+    _DELTA_MATRIX[_activity.index, list(_activity.indices)] = _activity.deltas
+    _TOUCHED[_activity.index, list(_activity.indices)] = True
+
+
+@lru_cache(maxsize=256)
+def scaled_deltas(activity_type: str, duration_minutes: float) -> Tuple[Tuple[str, float, float], ...]:
+    """(stat, variation de base, variation pour la durée) d'une activité ; mis en cache par durée."""
+    activity = ACTIVITIES[activity_type]
+    duration_factor = duration_minutes / ACTIVITY_BASE_MINUTES
+    return tuple((stat, value, value * duration_factor) for stat, value in zip(activity.stats, activity.deltas))
+
+
+def apply_activity(player, activity_type: str, duration_minutes: float) -> List[str]:
+    """Applique une activité à un joueur ; retourne les messages des changements significatifs."""
+    messages = []
+    if activity_type not in ACTIVITIES:
+        return messages
+    for stat, value, delta in scaled_deltas(activity_type, duration_minutes):
+        current_value = getattr(player, stat)
+        new_value = clamp(current_value + delta, 0, 100)
+        setattr(player, stat, new_value)
+        if abs(new_value - current_value) > SIGNIFICANT_CHANGE:
+            if value > 0:
+                messages.append(f"📈 {stat.replace('_', ' ').title()} s'améliore significativement")
+            else:
+                messages.append(f"📉 {stat.replace('_', ' ').title()} diminue notablement")
+
+    if duration_minutes > LONG_ACTIVITY_MINUTES:
+        messages.append("⚠️ Cette longue activité vous a particulièrement fatigué")
+        for stat, _, value in _LONG_EFFECTS:
+            setattr(player, stat, clamp(getattr(player, stat) + value, 0, 100))
+    return messages
+
+
+def to_matrix(players: Sequence) -> np.ndarray:
+    """Matrice (joueurs × ACTIVITY_STATS) des stats concernées par les activités."""
+    return np.array([[getattr(player, stat) for stat in ACTIVITY_STATS] for player in players], dtype=np.float64)
+
+
+def apply_activity_batch(matrix: np.ndarray, activity_types: Sequence[str], durations) -> np.ndarray:
+    """
+    Applique à chaque joueur (ligne de `matrix`) son activité, en une addition vectorielle.
+    Même résultat que `apply_activity` joueur par joueur (sans les messages) ; retourne une nouvelle matrice.
+    """
+    ids = np.array([ACTIVITIES[activity_type].index for activity_type in activity_types], dtype=np.intp)
+    durations = np.broadcast_to(np.asarray(durations, dtype=np.float64), ids.shape)
+    delta = _DELTA_MATRIX[ids] * (durations / ACTIVITY_BASE_MINUTES)[:, None]
+    result = np.where(_TOUCHED[ids], np.maximum(0, np.minimum(100, matrix + delta)), matrix)
+    long_rows = durations > LONG_ACTIVITY_MINUTES
+    for _, column, value in _LONG_EFFECTS:
+        result[:, column] = np.where(long_rows, np.maximum(0, np.minimum(100, result[:, column] + value)), result[:, column])
+    return result
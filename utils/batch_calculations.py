@@ -0,0 +1,340 @@
+# --- utils/batch_calculations.py ---
+# Version vectorisée (NumPy) de `chain_reactions` : les stats de tous les joueurs simulés
+# pendant un tick sont stockées en colonnes (un tableau par stat) et chaque règle est
+# appliquée en une opération masquée sur toute la population.
+# Doit rester strictement équivalente à `utils.calculations.chain_reactions` :
+# toute règle modifiée d'un côté doit l'être de l'autre, dans le même ordre.
+
+import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from utils.calculations import RULE_PERIOD_EPOCH
+from utils import rule_profiler
+
+Columns = Dict[str, np.ndarray]
+
+# Stats lues ou écrites par chain_reactions
+CHAIN_REACTION_STATS = (
+    'alcohol_addiction', 'anxiety', 'bladder', 'blood_pressure', 'bowels', 'cannabis_addiction',
+    'cognitive_load', 'cold_sweats', 'comfort', 'concentration', 'contentment', 'craving_alcohol',
+    'craving_cannabis', 'craving_nicotine', 'decision_making', 'emotional_stability', 'energy',
+    'environmental_stress', 'fatigue', 'guilt', 'happiness', 'headache', 'health', 'hopelessness',
+    'hunger', 'hygiene', 'immune_system', 'irritability', 'loneliness', 'memory_function',
+    'mental_clarity', 'muscle_tension', 'nausea', 'nicotine_addiction', 'pain', 'physical_dependence',
+    'shame', 'social_anxiety', 'social_energy', 'social_trigger_level', 'stomachache', 'stress',
+    'substance_tolerance', 'temperature_comfort', 'thirst', 'tremors', 'willpower', 'withdrawal_severity',
+)
+
+# Stats recalculées à chaque tick : réactions en chaîne et besoins soumis à la dégradation
+DEGRADED_STATS = ('hunger', 'thirst', 'stress', 'bladder', 'boredom', 'hygiene')
+SIMULATED_STATS = tuple(dict.fromkeys(CHAIN_REACTION_STATS + DEGRADED_STATS))
+
+
+def _clamp(value, min_val, max_val):
+    """Équivalent vectoriel de helpers.clamp : max(min_val, min(max_val, value))."""
+    return np.maximum(min_val, np.minimum(max_val, value))
+
+
+def _where(mask: np.ndarray, new, old: np.ndarray) -> np.ndarray:
+    return np.where(mask, new, old)
+
+
+def to_columns(states: Sequence[dict], stats: Sequence[str] = CHAIN_REACTION_STATS) -> Columns:
+    """Construit les colonnes (float64) à partir d'une liste de dictionnaires d'état."""
+    return {stat: np.array([state[stat] for state in states], dtype=np.float64) for stat in stats}
+
+
+def chain_reactions_batch(cols: Columns, seconds_since_last_smoke: np.ndarray,
+                          group_scales: Optional[Dict[str, np.ndarray]] = None) -> Tuple[Columns, List[List[str]]]:
+    """
+    Applique `chain_reactions` à tous les joueurs à la fois.
+    `seconds_since_last_smoke` : temps depuis la dernière cigarette de chaque joueur, en secondes.
+    `group_scales` : facteur de chaque groupe lent, par joueur (0 = groupe sauté) ; absent = 1.
+    Un groupe qu'aucun joueur ne doit faire tourner à ce pas n'est pas calculé.
+    Retourne les colonnes mises à jour et la liste des logs de chaque joueur (même ordre que la version scalaire).
+    Profilage : mêmes sections et mêmes noms de branches que la version scalaire (déclenchements = joueurs concernés).
+    """
+    size = len(seconds_since_last_smoke)
+    log_masks: List[Tuple[np.ndarray, str]] = []
+    c = cols
+    scales = group_scales or {}
+    profiler = rule_profiler.active()
+    mark = profiler.begin(size) if profiler else 0.0
+
+    # === 1. NATURAL RECOVERY & DECAY ===
+    scale = scales.get('mental_baseline')
+    if scale is None:
+        c['guilt'] = _clamp(c['guilt'] - 0.2, 0, 100)
+        c['shame'] = _clamp(c['shame'] - 0.15, 0, 100)
+        c['hopelessness'] = _clamp(c['hopelessness'] - 0.1, 0, 100)
+    elif scale.any():
+        due = scale > 0
+        c['guilt'] = _where(due, _clamp(c['guilt'] - 0.2 * scale, 0, 100), c['guilt'])
+        c['shame'] = _where(due, _clamp(c['shame'] - 0.15 * scale, 0, 100), c['shame'])
+        c['hopelessness'] = _where(due, _clamp(c['hopelessness'] - 0.1 * scale, 0, 100), c['hopelessness'])
+    c['headache'] = _clamp(c['headache'] - 0.5, 0, 100)
+    c['muscle_tension'] = _clamp(c['muscle_tension'] - 0.3, 0, 100)
+    c['nausea'] = _clamp(c['nausea'] - 0.4, 0, 100)
+    if profiler: mark = profiler.section('recovery', mark)
+
+    # === 2. ADDICTION MECHANICS ===
+    # Progression lente ; le plafond (dépendance physique) s'applique à chaque pas
+    max_withdrawal = c['physical_dependence'] * 0.8
+    withdrawal_rate = (c['substance_tolerance'] / 100.0) * 0.7
+    scale = scales.get('withdrawal_progression')
+    if scale is not None:
+        withdrawal_rate = withdrawal_rate * scale
+    c['withdrawal_severity'] = _clamp(c['withdrawal_severity'] + withdrawal_rate, 0, max_withdrawal)
+
+    severity = c['withdrawal_severity']
+    mask = severity > 10
+    severity_factor = severity / 100.0
+    c['tremors'] = _where(mask, _clamp(c['tremors'] + severity_factor * 0.8, 0, 100), c['tremors'])
+    c['cold_sweats'] = _where(mask, _clamp(c['cold_sweats'] + severity_factor * 0.6, 0, 100), c['cold_sweats'])
+    c['headache'] = _where(mask, _clamp(c['headache'] + severity_factor * 0.5, 0, 100), c['headache'])
+    c['anxiety'] = _where(mask, _clamp(c['anxiety'] + severity_factor * 0.9, 0, 100), c['anxiety'])
+    c['concentration'] = _where(mask, _clamp(c['concentration'] - severity_factor * 1.2, 0, 100), c['concentration'])
+    c['irritability'] = _where(mask, _clamp(c['irritability'] + severity_factor * 1.1, 0, 100), c['irritability'])
+    log_masks.append((mask & (severity > 60), "😖 Withdrawal symptoms are intense, affecting both body and mind."))
+    if profiler:
+        profiler.hit('withdrawal_severity>10', int(np.count_nonzero(mask)))
+        profiler.hit('withdrawal_severity>60', int(np.count_nonzero(log_masks[-1][0])))
+        mark = profiler.section('withdrawal', mark)
+
+    # === 3. CRAVING DYNAMICS ===
+    stress_impact = c['stress'] * 0.3
+    anxiety_impact = c['anxiety'] * 0.2
+    environmental_trigger = c['environmental_stress'] * 0.15
+    base_craving = (
+        c['withdrawal_severity'] * 0.4 +
+        stress_impact +
+        anxiety_impact +
+        environmental_trigger +
+        (seconds_since_last_smoke / 400.0)
+    )
+    low_clarity = c['mental_clarity'] < 50
+    social_trigger = c['social_trigger_level'] > 50
+    base_craving = _where(low_clarity, base_craving * 1.2, base_craving)
+    base_craving = _where(social_trigger, base_craving * 1.3, base_craving)
+    if profiler:
+        profiler.hit('mental_clarity<50', int(np.count_nonzero(low_clarity)))
+        profiler.hit('social_trigger_level>50', int(np.count_nonzero(social_trigger)))
+
+    for substance in ('nicotine', 'alcohol', 'cannabis'):
+        addiction = c[f'{substance}_addiction']
+        craving_key = f'craving_{substance}'
+        c[craving_key] = _where(addiction > 0, _clamp(base_craving * (addiction / 100), 0, 100), c[craving_key])
+        if profiler: profiler.hit(f'{substance}_addiction>0', int(np.count_nonzero(addiction > 0)))
+    if profiler: mark = profiler.section('cravings', mark)
+
+    # === 4. PHYSICAL & MENTAL STATE INTERACTIONS ===
+    mask = c['fatigue'] > 70
+    if profiler: profiler.hit('fatigue>70', int(np.count_nonzero(mask)))
+    fatigue_factor = (c['fatigue'] - 70) / 30.0
+    c['energy'] = _where(mask, _clamp(c['energy'] - 1.2 * fatigue_factor, 0, 100), c['energy'])
+    c['mental_clarity'] = _where(mask, _clamp(c['mental_clarity'] - 1.0 * fatigue_factor, 0, 100), c['mental_clarity'])
+    c['concentration'] = _where(mask, _clamp(c['concentration'] - 1.5 * fatigue_factor, 0, 100), c['concentration'])
+    c['cognitive_load'] = _where(mask, _clamp(c['cognitive_load'] + 1.0 * fatigue_factor, 0, 100), c['cognitive_load'])
+    log_masks.append((mask & (c['fatigue'] > 90), "😴 Extreme fatigue is affecting your mental performance."))
+    if profiler: profiler.hit('fatigue>90', int(np.count_nonzero(log_masks[-1][0])))
+
+    mask = c['comfort'] < 40
+    if profiler: profiler.hit('comfort<40', int(np.count_nonzero(mask)))
+    comfort_factor = (40 - c['comfort']) / 40.0
+    c['stress'] = _where(mask, _clamp(c['stress'] + 0.7 * comfort_factor, 0, 100), c['stress'])
+    c['muscle_tension'] = _where(mask, _clamp(c['muscle_tension'] + 0.5 * comfort_factor, 0, 100), c['muscle_tension'])
+    c['environmental_stress'] = _where(mask, _clamp(c['environmental_stress'] + 0.6 * comfort_factor, 0, 100), c['environmental_stress'])
+    if profiler: mark = profiler.section('physical', mark)
+
+    # === 5. SOCIAL & COGNITIVE INTERACTIONS ===
+    social_anxiety = c['social_anxiety']
+    mask = social_anxiety > 60
+    if profiler: profiler.hit('social_anxiety>60', int(np.count_nonzero(mask)))
+    social_factor = (social_anxiety - 60) / 40.0
+    c['social_energy'] = _where(mask, _clamp(c['social_energy'] - 1.0 * social_factor, 0, 100), c['social_energy'])
+    c['environmental_stress'] = _where(mask, _clamp(c['environmental_stress'] + 0.8 * social_factor, 0, 100), c['environmental_stress'])
+    c['emotional_stability'] = _where(mask, _clamp(c['emotional_stability'] - 0.5 * social_factor, 0, 100), c['emotional_stability'])
+    log_masks.append((mask & (social_anxiety > 80), "😰 High social anxiety is draining your social energy."))
+    if profiler: profiler.hit('social_anxiety>80', int(np.count_nonzero(log_masks[-1][0])))
+
+    cognitive_load = c['cognitive_load']
+    mask = cognitive_load > 70
+    if profiler: profiler.hit('cognitive_load>70', int(np.count_nonzero(mask)))
+    cognitive_factor = (cognitive_load - 70) / 30.0
+    c['mental_clarity'] = _where(mask, _clamp(c['mental_clarity'] - 1.0 * cognitive_factor, 0, 100), c['mental_clarity'])
+    c['decision_making'] = _where(mask, _clamp(c['decision_making'] - 0.8 * cognitive_factor, 0, 100), c['decision_making'])
+    c['memory_function'] = _where(mask, _clamp(c['memory_function'] - 0.7 * cognitive_factor, 0, 100), c['memory_function'])
+    log_masks.append((mask & (cognitive_load > 85), "🤯 High cognitive load is affecting your mental functions."))
+    if profiler: profiler.hit('cognitive_load>85', int(np.count_nonzero(log_masks[-1][0])))
+
+    loneliness = c['loneliness']
+    mask = loneliness > 50
+    if profiler: profiler.hit('loneliness>50', int(np.count_nonzero(mask)))
+    loneliness_factor = (loneliness - 50) / 50.0
+    c['emotional_stability'] = _where(mask, _clamp(c['emotional_stability'] - 0.6 * loneliness_factor, 0, 100), c['emotional_stability'])
+    c['contentment'] = _where(mask, _clamp(c['contentment'] - 0.8 * loneliness_factor, 0, 100), c['contentment'])
+    c['social_anxiety'] = _where(mask, _clamp(c['social_anxiety'] + 0.4 * loneliness_factor, 0, 100), c['social_anxiety'])
+    log_masks.append((mask & (loneliness > 75), "😔 Feelings of loneliness are affecting your emotional well-being."))
+    if profiler: profiler.hit('loneliness>75', int(np.count_nonzero(log_masks[-1][0])))
+
+    temperature_gap = np.abs(c['temperature_comfort'] - 50)
+    mask = temperature_gap > 30
+    if profiler: profiler.hit('temperature_gap>30', int(np.count_nonzero(mask)))
+    temp_discomfort = temperature_gap - 30
+    c['stress'] = _where(mask, _clamp(c['stress'] + 0.3 * (temp_discomfort / 20), 0, 100), c['stress'])
+    c['concentration'] = _where(mask, _clamp(c['concentration'] - 0.4 * (temp_discomfort / 20), 0, 100), c['concentration'])
+    if profiler: mark = profiler.section('social_cognitive', mark)
+
+    # === 5. VITAL NEEDS EFFECTS ===
+    mask = c['hunger'] > 70
+    if profiler: profiler.hit('hunger>70', int(np.count_nonzero(mask)))
+    hunger_factor = (c['hunger'] - 70) / 30.0
+    c['energy'] = _where(mask, _clamp(c['energy'] - hunger_factor * 1.0, 0, 100), c['energy'])
+    c['concentration'] = _where(mask, _clamp(c['concentration'] - hunger_factor * 1.2, 0, 100), c['concentration'])
+    c['irritability'] = _where(mask, _clamp(c['irritability'] + hunger_factor * 1.5, 0, 100), c['irritability'])
+
+    mask = c['thirst'] > 60
+    if profiler: profiler.hit('thirst>60', int(np.count_nonzero(mask)))
+    thirst_factor = (c['thirst'] - 60) / 40.0
+    c['headache'] = _where(mask, _clamp(c['headache'] + thirst_factor * 1.0, 0, 100), c['headache'])
+    c['mental_clarity'] = _where(mask, _clamp(c['mental_clarity'] - thirst_factor * 1.3, 0, 100), c['mental_clarity'])
+
+    mask = c['bladder'] > 80
+    if profiler: profiler.hit('bladder>80', int(np.count_nonzero(mask)))
+    bladder_factor = (c['bladder'] - 80) / 20.0
+    c['stress'] = _where(mask, _clamp(c['stress'] + bladder_factor * 1.2, 0, 100), c['stress'])
+    c['concentration'] = _where(mask, _clamp(c['concentration'] - bladder_factor * 1.0, 0, 100), c['concentration'])
+    accident = mask & (c['bladder'] >= 100)
+    c['bladder'] = _where(accident, 0.0, c['bladder'])
+    c['hygiene'] = _where(accident, _clamp(c['hygiene'] - 50, 0, 100), c['hygiene'])
+    c['shame'] = _where(accident, _clamp(c['shame'] + 40, 0, 100), c['shame'])
+    log_masks.append((accident, "� You couldn't hold it anymore..."))
+    if profiler:
+        profiler.hit('bladder_accident', int(np.count_nonzero(accident)))
+        mark = profiler.section('vital_needs', mark)
+
+    # === 6. MENTAL STATE INTERACTIONS ===
+    mask = c['stress'] > 60
+    if profiler: profiler.hit('stress>60', int(np.count_nonzero(mask)))
+    stress_factor = (c['stress'] - 60) / 40.0
+    c['muscle_tension'] = _where(mask, _clamp(c['muscle_tension'] + stress_factor * 0.8, 0, 100), c['muscle_tension'])
+    c['headache'] = _where(mask, _clamp(c['headache'] + stress_factor * 0.6, 0, 100), c['headache'])
+    c['blood_pressure'] = _where(mask, _clamp(c['blood_pressure'] + stress_factor * 10, 100, 160), c['blood_pressure'])
+
+    mask = c['anxiety'] > 50
+    if profiler: profiler.hit('anxiety>50', int(np.count_nonzero(mask)))
+    anxiety_factor = (c['anxiety'] - 50) / 50.0
+    c['concentration'] = _where(mask, _clamp(c['concentration'] - anxiety_factor * 1.0, 0, 100), c['concentration'])
+    c['decision_making'] = _where(mask, _clamp(c['decision_making'] - anxiety_factor * 1.2, 0, 100), c['decision_making'])
+    c['social_anxiety'] = _where(mask, _clamp(c['social_anxiety'] + anxiety_factor * 0.8, 0, 100), c['social_anxiety'])
+
+    accident = c['bladder'] >= 100
+    if profiler: profiler.hit('bladder>=100', int(np.count_nonzero(accident)))
+    c['bladder'] = _where(accident, 0.0, c['bladder'])
+    c['hygiene'] = _where(accident, _clamp(c['hygiene'] - 50, 0, 100), c['hygiene'])
+    c['happiness'] = _where(accident, _clamp(c['happiness'] - 30, 0, 100), c['happiness'])
+    c['stress'] = _where(accident, _clamp(c['stress'] + 15, 0, 100), c['stress'])
+    log_masks.append((accident, " humiliant... Vous n'avez pas pu vous retenir à temps."))
+
+    bowels = c['bowels']
+    mask = bowels > 80
+    if profiler: profiler.hit('bowels>80', int(np.count_nonzero(mask)))
+    c['stress'] = _where(mask, _clamp(c['stress'] + 0.4, 0, 100), c['stress'])
+    c['pain'] = _where(mask, _clamp(c['pain'] + 0.5, 0, 100), c['pain'])
+    log_masks.append((mask & (bowels > 95), "💩 Une crampe douloureuse vous rappelle une urgence intestinale !"))
+    if profiler: profiler.hit('bowels>95', int(np.count_nonzero(log_masks[-1][0])))
+
+    # --- 3. CONSÉQUENCES DE L'ÉTAT MENTAL ---
+    stress = c['stress']
+    mask = stress > 50
+    if profiler: profiler.hit('stress>50', int(np.count_nonzero(mask)))
+    stress_effect = (stress - 50) / 50.0
+    c['happiness'] = _where(mask, _clamp(c['happiness'] - 0.6 * stress_effect, 0, 100), c['happiness'])
+    scale = scales.get('immune_response')
+    if scale is None:
+        c['immune_system'] = _where(mask, _clamp(c['immune_system'] - 0.7 * stress_effect, 0, 100), c['immune_system'])
+    elif scale.any():
+        c['immune_system'] = _where(mask & (scale > 0), _clamp(c['immune_system'] - 0.7 * stress_effect * scale, 0, 100), c['immune_system'])
+    c['headache'] = _where(mask, _clamp(c['headache'] + 0.5 * stress_effect, 0, 100), c['headache'])
+    c['craving_alcohol'] = _where(mask, _clamp(c['craving_alcohol'] + 1.0 * stress_effect, 0, 100), c['craving_alcohol'])
+    log_masks.append((mask & (stress > 80), "😨 Le stress devient insupportable."))
+    if profiler:
+        profiler.hit('stress>80', int(np.count_nonzero(log_masks[-1][0])))
+        mark = profiler.section('mental_state', mark)
+
+    # --- 4. RÉGÉNÉRATION ET ÉQUILIBRE ---
+    scale = scales.get('regeneration')
+    if scale is None:
+        mask = (c['stress'] < 40) & (c['happiness'] > 50) & (c['fatigue'] < 50)
+        c['willpower'] = _where(mask, _clamp(c['willpower'] + 0.5, 0, 100), c['willpower'])
+        c['health'] = _where(mask, _clamp(c['health'] + 0.1, 0, 100), c['health'])
+        if profiler: profiler.hit('regeneration', int(np.count_nonzero(mask)))
+    elif scale.any():
+        mask = (scale > 0) & (c['stress'] < 40) & (c['happiness'] > 50) & (c['fatigue'] < 50)
+        c['willpower'] = _where(mask, _clamp(c['willpower'] + 0.5 * scale, 0, 100), c['willpower'])
+        c['health'] = _where(mask, _clamp(c['health'] + 0.1 * scale, 0, 100), c['health'])
+        if profiler: profiler.hit('regeneration', int(np.count_nonzero(mask)))
+
+    # --- 5. STATS COMPOSITES POUR L'AFFICHAGE ---
+    c['stomachache'] = _clamp((c['hunger'] * 0.5 + c['nausea']), 0, 100)
+    if profiler: mark = profiler.section('regeneration', mark)
+
+    logs: List[List[str]] = [[] for _ in range(size)]
+    for mask, message in log_masks:
+        for index in np.flatnonzero(mask):
+            logs[index].append(message)
+    if profiler: profiler.section('logs', mark)
+    return c, logs
+
+
+def advance_states_batch(states: Sequence[dict], degradation_per_minute: Sequence[Dict[str, float]],
+                         elapsed_minutes: Sequence[float], step_minutes: Sequence[float], end_time: datetime.datetime,
+                         last_smoked_at: Sequence[Optional[datetime.datetime]], max_steps: int = 288,
+                         rule_periods: Optional[Dict[str, int]] = None) -> Tuple[Columns, List[List[str]], np.ndarray]:
+    """
+    Équivalent vectoriel de `advance_state` pour plusieurs joueurs (mêmes `rule_periods`).
+    Chaque joueur avance de son propre nombre de pas ; au pas k, seuls les joueurs
+    qui ont encore au moins k pas à jouer sont mis à jour.
+    Retourne les colonnes finales, les logs (sans doublons) de chaque joueur et le nombre de pas de chacun.
+    """
+    degraded_stats = sorted({stat for rates in degradation_per_minute for stat in rates})
+    stats = tuple(dict.fromkeys(CHAIN_REACTION_STATS + tuple(degraded_stats)))
+    cols = to_columns(states, stats)
+    elapsed = np.array(elapsed_minutes, dtype=np.float64)
+    step_lengths = np.array(step_minutes, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        raw_steps = np.where(step_lengths > 0, np.floor_divide(elapsed, step_lengths), 1)
+    steps = np.maximum(1, np.minimum(max_steps, raw_steps.astype(np.int64)))
+    step = elapsed / steps
+    rates = {stat: np.array([player_rates.get(stat, 0.0) for player_rates in degradation_per_minute], dtype=np.float64)
+             for stat in degraded_stats}
+    # Dernière cigarette, en secondes avant `end_time`
+    smoked_offset = np.array([(end_time - smoked_at).total_seconds() if smoked_at else np.nan for smoked_at in last_smoked_at])
+    logs: List[List[str]] = [[] for _ in range(len(states))]
+    # Groupes lents : fin de période comptée en minutes depuis RULE_PERIOD_EPOCH (cf. rule_group_scales)
+    slow_periods = {group: period for group, period in (rule_periods or {}).items() if period > 1}
+    end_minutes = (end_time - RULE_PERIOD_EPOCH).total_seconds() / 60
+
+    for index in range(1, int(steps.max(initial=0)) + 1):
+        active = np.flatnonzero(steps >= index)
+        subset = {stat: values[active] for stat, values in cols.items()}
+        for stat, rate in rates.items():
+            subset[stat] = _clamp(subset[stat] + rate[active] * step[active], 0, 100)
+        # Temps depuis la dernière cigarette à la fin de ce pas (0 si jamais fumé)
+        step_end = step[active] * (steps[active] - index) * 60
+        since_smoke = np.where(np.isnan(smoked_offset[active]), 0.0, smoked_offset[active] - step_end)
+        group_scales = None
+        if slow_periods:
+            step_end_minutes = end_minutes - step[active] * (steps[active] - index)
+            group_scales = {}
+            has_interval = step_lengths[active] > 0
+            for group, period in slow_periods.items():
+                length = np.where(has_interval, period * step_lengths[active], 1.0)
+                crossings = np.floor_divide(step_end_minutes, length) - np.floor_divide(step_end_minutes - step[active], length)
+                group_scales[group] = np.where(has_interval, period * crossings, 1.0)
+        subset, step_logs = chain_reactions_batch(subset, since_smoke, group_scales)
+        for stat, values in subset.items():
+            cols[stat][active] = values
+        for position, player_logs in zip(active, step_logs):
+            logs[position].extend(log for log in player_logs if log not in logs[position])
+    return cols, logs, steps
@@ -1,9 +1,11 @@
 # --- utils/calculations.py (REFACTORED WITH NEW STATS) ---
 
 from .helpers import clamp
-from datetime import datetime
-from typing import Tuple
-import random  # Pour la variabilité de l'humeur
+from . import sim_clock
+from . import rule_profiler
+from .activities import apply_activity
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
 
 def update_work_stats(player, game_time) -> Tuple[float, str]:
     """
@@ -22,7 +24,7 @@ def update_work_stats(player, game_time) -> Tuple[float, str]:
 
     # Gestion des pauses
     if player.last_break_start:
-        break_duration = (datetime.now() - player.last_break_start).total_seconds() / 60
+        break_duration = (sim_clock.now() - player.last_break_start).total_seconds() / 60
         if break_duration > 15:  # Pause standard de 15 minutes
             excess_time = break_duration - 15
             player.total_break_time += excess_time
@@ -85,7 +87,7 @@ def calculate_overall_mood(player) -> Tuple[float, str, str]:
     mood_variance = (100 - mood_score) * volatility
 
     # Ajuster le score avec la variance
-    final_score = max(0, min(100, mood_score + ((-mood_variance/2) + (mood_variance * random.random()))))
+    final_score = max(0, min(100, mood_score + ((-mood_variance/2) + (mood_variance * sim_clock.rng().random()))))
 
     # Définir l'emoji et la description
     if final_score >= 90:
@@ -110,111 +112,72 @@ def calculate_overall_mood(player) -> Tuple[float, str, str]:
 
 def process_activity_impact(player, activity_type: str, duration_minutes: int) -> list:
     """
-    Traite l'impact d'une activité sur les stats du joueur
+    Traite l'impact d'une activité sur les stats du joueur (table compilée de utils.activities)
     """
-    messages = []
-    
-    # Base de modification pour chaque activité
-    activity_impacts = {
-        "sport": {
-            "energy": -15,
-            "stamina": +5,
-            "health": +3,
-            "stress": -10,
-            "mood_volatility": -5,
-            "emotional_stability": +2,
-            "physical_fitness": +4,
-            "mental_clarity": +8,
-        },
-        "meditation": {
-            "stress": -15,
-            "emotional_stability": +4,
-            "mental_clarity": +10,
-            "concentration": +8,
-            "mood_volatility": -8,
-            "anxiety": -12,
-            "serenity": +10,
-        },
-        "social": {
-            "social_energy": -10,
-            "loneliness": -20,
-            "social_anxiety": -5,
-            "happiness": +8,
-            "emotional_stability": +2,
-            "stress": -5,
-        },
-        "work": {
-            "mental_clarity": -5,
-            "energy": -10,
-            "stress": +8,
-            "cognitive_load": +15,
-            "decision_making": +2,
-        },
-        "rest": {
-            "energy": +15,
-            "fatigue": -20,
-            "stress": -8,
-            "mental_clarity": +5,
-            "cognitive_load": -10,
-        }
-    }
-
-    if activity_type in activity_impacts:
-        # Calculer le facteur de durée (1 pour 30 minutes)
-        duration_factor = duration_minutes / 30.0
-        
-        # Appliquer les modifications avec le facteur de durée
-        for stat, value in activity_impacts[activity_type].items():
-            if hasattr(player, stat):
-                current_value = getattr(player, stat)
-                new_value = clamp(current_value + (value * duration_factor), 0, 100)
-                setattr(player, stat, new_value)
-                
-                # Générer des messages pour les changements significatifs
-                if abs(new_value - current_value) > 15:
-                    if value > 0:
-                        messages.append(f"📈 {stat.replace('_', ' ').title()} s'améliore significativement")
-                    else:
-                        messages.append(f"📉 {stat.replace('_', ' ').title()} diminue notablement")
-
-        # Effets spéciaux selon la durée
-        if duration_minutes > 120:  # Activité longue
-            messages.append("⚠️ Cette longue activité vous a particulièrement fatigué")
-            player.fatigue = clamp(player.fatigue + 20, 0, 100)
-            player.energy = clamp(player.energy - 15, 0, 100)
-
-    return messages
-
-def chain_reactions(state_dict: dict, time_since_last_smoke) -> Tuple[dict, list]:
+    return apply_activity(player, activity_type, duration_minutes)
+
+# Groupes de règles lentes de chain_reactions (traits qui évoluent lentement). Un groupe de période N
+# ne tourne qu'un pas sur N, avec des coefficients multipliés par N ; les autres règles tournent à chaque pas.
+SLOW_RULE_GROUPS = ('mental_baseline', 'withdrawal_progression', 'immune_response', 'regeneration')
+# Origine des frontières de période : tous les joueurs de même intervalle font tourner un groupe au même tick
+RULE_PERIOD_EPOCH = datetime(2000, 1, 1)
+
+def rule_group_scales(rule_periods: Optional[dict], step_end: datetime, step: float, step_minutes: float) -> Optional[dict]:
+    """
+    Facteur de chaque groupe lent pour le pas de `step` minutes se terminant à `step_end` :
+    période × nombre de frontières de période (période × pas de simulation) franchies pendant le pas, 0 si aucune.
+    Les groupes de période 1 sont omis (ils tournent à chaque pas, comme la référence).
+    """
+    if not rule_periods or step_minutes <= 0:
+        return None
+    end = (step_end - RULE_PERIOD_EPOCH).total_seconds() / 60
+    scales = {}
+    for group, period in rule_periods.items():
+        if period > 1:
+            length = period * step_minutes
+            scales[group] = period * (end // length - (end - step) // length)
+    return scales
+
+def chain_reactions(state_dict: dict, time_since_last_smoke, group_scales: Optional[dict] = None) -> Tuple[dict, list]:
     """
     Applies chain reactions on the player's state dictionary.
     This is the core of the simulation, with non-linear effects and interdependencies.
+    `group_scales` : facteur des groupes lents pour ce pas (cf. rule_group_scales) ; absent = 1.
+    Profilage (temps par section, branches déclenchées) si utils.rule_profiler est activé.
     """
     logs = []
+    scales = group_scales or {}
+    profiler = rule_profiler.active()
+    mark = profiler.begin(1) if profiler else 0.0
 
     # === 1. NATURAL RECOVERY & DECAY ===
     # Mental states naturally tend towards baseline
-    state_dict['guilt'] = clamp(state_dict['guilt'] - 0.2, 0, 100)
-    state_dict['shame'] = clamp(state_dict['shame'] - 0.15, 0, 100)
-    state_dict['hopelessness'] = clamp(state_dict['hopelessness'] - 0.1, 0, 100)
+    scale = scales.get('mental_baseline', 1.0)
+    if scale:
+        state_dict['guilt'] = clamp(state_dict['guilt'] - 0.2 * scale, 0, 100)
+        state_dict['shame'] = clamp(state_dict['shame'] - 0.15 * scale, 0, 100)
+        state_dict['hopelessness'] = clamp(state_dict['hopelessness'] - 0.1 * scale, 0, 100)
     
     # Physical symptoms naturally improve
     state_dict['headache'] = clamp(state_dict['headache'] - 0.5, 0, 100)
     state_dict['muscle_tension'] = clamp(state_dict['muscle_tension'] - 0.3, 0, 100)
     state_dict['nausea'] = clamp(state_dict['nausea'] - 0.4, 0, 100)
+    if profiler: mark = profiler.section('recovery', mark)
 
     # === 2. ADDICTION MECHANICS ===
     # Calculate base withdrawal progression
+    # Progression lente ; le plafond (dépendance physique) s'applique à chaque pas
     max_withdrawal = state_dict['physical_dependence'] * 0.8
     withdrawal_rate = (state_dict['substance_tolerance'] / 100.0) * 0.7
     state_dict['withdrawal_severity'] = clamp(
-        state_dict['withdrawal_severity'] + withdrawal_rate,
+        state_dict['withdrawal_severity'] + withdrawal_rate * scales.get('withdrawal_progression', 1.0),
         0,
         max_withdrawal
     )
     
     # Process withdrawal effects
     if state_dict['withdrawal_severity'] > 10:
+        if profiler: profiler.hit('withdrawal_severity>10')
         severity = state_dict['withdrawal_severity']
         severity_factor = severity / 100.0
         
@@ -229,7 +192,9 @@ def chain_reactions(state_dict: dict, time_since_last_smoke) -> Tuple[dict, list
         state_dict['irritability'] = clamp(state_dict.get('irritability', 0) + severity_factor * 1.1, 0, 100)
         
         if severity > 60:
+            if profiler: profiler.hit('withdrawal_severity>60')
             logs.append("😖 Withdrawal symptoms are intense, affecting both body and mind.")
+    if profiler: mark = profiler.section('withdrawal', mark)
 
     # === 3. CRAVING DYNAMICS ===
     # Base craving calculation
@@ -247,73 +212,92 @@ def chain_reactions(state_dict: dict, time_since_last_smoke) -> Tuple[dict, list
     
     # Modify craving based on psychological factors
     if state_dict['mental_clarity'] < 50:
+        if profiler: profiler.hit('mental_clarity<50')
         base_craving *= 1.2
     if state_dict['social_trigger_level'] > 50:
+        if profiler: profiler.hit('social_trigger_level>50')
         base_craving *= 1.3
     
     # Apply cravings to specific substances
     if state_dict['nicotine_addiction'] > 0:
+        if profiler: profiler.hit('nicotine_addiction>0')
         state_dict['craving_nicotine'] = clamp(base_craving * (state_dict['nicotine_addiction'] / 100), 0, 100)
     if state_dict['alcohol_addiction'] > 0:
+        if profiler: profiler.hit('alcohol_addiction>0')
         state_dict['craving_alcohol'] = clamp(base_craving * (state_dict['alcohol_addiction'] / 100), 0, 100)
     if state_dict['cannabis_addiction'] > 0:
+        if profiler: profiler.hit('cannabis_addiction>0')
         state_dict['craving_cannabis'] = clamp(base_craving * (state_dict['cannabis_addiction'] / 100), 0, 100)
+    if profiler: mark = profiler.section('cravings', mark)
 
     # === 4. PHYSICAL & MENTAL STATE INTERACTIONS ===
     # Fatigue effects
     if state_dict['fatigue'] > 70:
+        if profiler: profiler.hit('fatigue>70')
         fatigue_factor = (state_dict['fatigue'] - 70) / 30.0
         state_dict['energy'] = clamp(state_dict['energy'] - 1.2 * fatigue_factor, 0, 100)
         state_dict['mental_clarity'] = clamp(state_dict['mental_clarity'] - 1.0 * fatigue_factor, 0, 100)
         state_dict['concentration'] = clamp(state_dict['concentration'] - 1.5 * fatigue_factor, 0, 100)
         state_dict['cognitive_load'] = clamp(state_dict['cognitive_load'] + 1.0 * fatigue_factor, 0, 100)
         if state_dict['fatigue'] > 90:
+            if profiler: profiler.hit('fatigue>90')
             logs.append("😴 Extreme fatigue is affecting your mental performance.")
 
     # Comfort and environmental effects
     if state_dict['comfort'] < 40:
+        if profiler: profiler.hit('comfort<40')
         comfort_factor = (40 - state_dict['comfort']) / 40.0
         state_dict['stress'] = clamp(state_dict['stress'] + 0.7 * comfort_factor, 0, 100)
         state_dict['muscle_tension'] = clamp(state_dict['muscle_tension'] + 0.5 * comfort_factor, 0, 100)
         state_dict['environmental_stress'] = clamp(state_dict['environmental_stress'] + 0.6 * comfort_factor, 0, 100)
+    if profiler: mark = profiler.section('physical', mark)
 
     # === 5. SOCIAL & COGNITIVE INTERACTIONS ===
     # Social anxiety effects
     if state_dict['social_anxiety'] > 60:
+        if profiler: profiler.hit('social_anxiety>60')
         social_factor = (state_dict['social_anxiety'] - 60) / 40.0
         state_dict['social_energy'] = clamp(state_dict['social_energy'] - 1.0 * social_factor, 0, 100)
         state_dict['environmental_stress'] = clamp(state_dict['environmental_stress'] + 0.8 * social_factor, 0, 100)
         state_dict['emotional_stability'] = clamp(state_dict['emotional_stability'] - 0.5 * social_factor, 0, 100)
         if state_dict['social_anxiety'] > 80:
+            if profiler: profiler.hit('social_anxiety>80')
             logs.append("😰 High social anxiety is draining your social energy.")
 
     # Cognitive load effects
     if state_dict['cognitive_load'] > 70:
+        if profiler: profiler.hit('cognitive_load>70')
         cognitive_factor = (state_dict['cognitive_load'] - 70) / 30.0
         state_dict['mental_clarity'] = clamp(state_dict['mental_clarity'] - 1.0 * cognitive_factor, 0, 100)
         state_dict['decision_making'] = clamp(state_dict['decision_making'] - 0.8 * cognitive_factor, 0, 100)
         state_dict['memory_function'] = clamp(state_dict['memory_function'] - 0.7 * cognitive_factor, 0, 100)
         if state_dict['cognitive_load'] > 85:
+            if profiler: profiler.hit('cognitive_load>85')
             logs.append("🤯 High cognitive load is affecting your mental functions.")
 
     # Loneliness and social interaction effects
     if state_dict['loneliness'] > 50:
+        if profiler: profiler.hit('loneliness>50')
         loneliness_factor = (state_dict['loneliness'] - 50) / 50.0
         state_dict['emotional_stability'] = clamp(state_dict['emotional_stability'] - 0.6 * loneliness_factor, 0, 100)
         state_dict['contentment'] = clamp(state_dict['contentment'] - 0.8 * loneliness_factor, 0, 100)
         state_dict['social_anxiety'] = clamp(state_dict['social_anxiety'] + 0.4 * loneliness_factor, 0, 100)
         if state_dict['loneliness'] > 75:
+            if profiler: profiler.hit('loneliness>75')
             logs.append("😔 Feelings of loneliness are affecting your emotional well-being.")
 
     # Temperature effects
     if abs(state_dict['temperature_comfort'] - 50) > 30:
+        if profiler: profiler.hit('temperature_gap>30')
         temp_discomfort = abs(state_dict['temperature_comfort'] - 50) - 30
         state_dict['stress'] = clamp(state_dict['stress'] + 0.3 * (temp_discomfort / 20), 0, 100)
         state_dict['concentration'] = clamp(state_dict['concentration'] - 0.4 * (temp_discomfort / 20), 0, 100)
+    if profiler: mark = profiler.section('social_cognitive', mark)
 
     # === 5. VITAL NEEDS EFFECTS ===
     # Hunger effects
     if state_dict['hunger'] > 70:
+        if profiler: profiler.hit('hunger>70')
         hunger_factor = (state_dict['hunger'] - 70) / 30.0
         state_dict['energy'] = clamp(state_dict['energy'] - hunger_factor * 1.0, 0, 100)
         state_dict['concentration'] = clamp(state_dict['concentration'] - hunger_factor * 1.2, 0, 100)
@@ -321,24 +305,29 @@ def chain_reactions(state_dict: dict, time_since_last_smoke) -> Tuple[dict, list
 
     # Thirst effects
     if state_dict['thirst'] > 60:
+        if profiler: profiler.hit('thirst>60')
         thirst_factor = (state_dict['thirst'] - 60) / 40.0
         state_dict['headache'] = clamp(state_dict['headache'] + thirst_factor * 1.0, 0, 100)
         state_dict['mental_clarity'] = clamp(state_dict['mental_clarity'] - thirst_factor * 1.3, 0, 100)
 
     # Bladder effects
     if state_dict['bladder'] > 80:
+        if profiler: profiler.hit('bladder>80')
         bladder_factor = (state_dict['bladder'] - 80) / 20.0
         state_dict['stress'] = clamp(state_dict['stress'] + bladder_factor * 1.2, 0, 100)
         state_dict['concentration'] = clamp(state_dict['concentration'] - bladder_factor * 1.0, 0, 100)
         if state_dict['bladder'] >= 100:
+            if profiler: profiler.hit('bladder_accident')
             state_dict['bladder'] = 0
             state_dict['hygiene'] = clamp(state_dict['hygiene'] - 50, 0, 100)
             state_dict['shame'] = clamp(state_dict['shame'] + 40, 0, 100)
             logs.append("� You couldn't hold it anymore...")
+    if profiler: mark = profiler.section('vital_needs', mark)
 
     # === 6. MENTAL STATE INTERACTIONS ===
     # Stress effects on physical symptoms
     if state_dict['stress'] > 60:
+        if profiler: profiler.hit('stress>60')
         stress_factor = (state_dict['stress'] - 60) / 40.0
         state_dict['muscle_tension'] = clamp(state_dict['muscle_tension'] + stress_factor * 0.8, 0, 100)
         state_dict['headache'] = clamp(state_dict['headache'] + stress_factor * 0.6, 0, 100)
@@ -346,41 +335,115 @@ def chain_reactions(state_dict: dict, time_since_last_smoke) -> Tuple[dict, list
 
     # Anxiety effects
     if state_dict['anxiety'] > 50:
+        if profiler: profiler.hit('anxiety>50')
         anxiety_factor = (state_dict['anxiety'] - 50) / 50.0
         state_dict['concentration'] = clamp(state_dict['concentration'] - anxiety_factor * 1.0, 0, 100)
         state_dict['decision_making'] = clamp(state_dict['decision_making'] - anxiety_factor * 1.2, 0, 100)
         state_dict['social_anxiety'] = clamp(state_dict['social_anxiety'] + anxiety_factor * 0.8, 0, 100)
     if state_dict.get('bladder', 0) >= 100:
+        if profiler: profiler.hit('bladder>=100')
         state_dict['bladder'] = 0 # L'accident vide la vessie
         state_dict['hygiene'] = clamp(state_dict.get('hygiene', 100) - 50, 0, 100)
         state_dict['happiness'] = clamp(state_dict.get('happiness', 50) - 30, 0, 100) # C'est humiliant
         state_dict['stress'] = clamp(state_dict.get('stress', 0) + 15, 0, 100)
         logs.append(" humiliant... Vous n'avez pas pu vous retenir à temps.")
     if state_dict['bowels'] > 80:
+        if profiler: profiler.hit('bowels>80')
         state_dict['stress'] = clamp(state_dict['stress'] + 0.4, 0, 100)
         state_dict['pain'] = clamp(state_dict['pain'] + 0.5, 0, 100) # C'est plus douloureux
         if state_dict['bowels'] > 95:
+            if profiler: profiler.hit('bowels>95')
             logs.append("💩 Une crampe douloureuse vous rappelle une urgence intestinale !")
     # --- 3. CONSÉQUENCES DE L'ÉTAT MENTAL ---
     if state_dict['stress'] > 50:
+        if profiler: profiler.hit('stress>50')
         stress_effect = (state_dict['stress'] - 50) / 50.0 # scale
         state_dict['happiness'] = clamp(state_dict['happiness'] - 0.6 * stress_effect, 0, 100)
-        state_dict['immune_system'] = clamp(state_dict['immune_system'] - 0.7 * stress_effect, 0, 100)
+        scale = scales.get('immune_response', 1.0)
+        if scale:
+            state_dict['immune_system'] = clamp(state_dict['immune_system'] - 0.7 * stress_effect * scale, 0, 100)
         state_dict['headache'] = clamp(state_dict['headache'] + 0.5 * stress_effect, 0, 100)
         # Cercle vicieux : le stress donne envie de solutions rapides
         state_dict['craving_alcohol'] = clamp(state_dict['craving_alcohol'] + 1.0 * stress_effect, 0, 100)
-        if state_dict['stress'] > 80: logs.append("😨 Le stress devient insupportable.")
+        if state_dict['stress'] > 80:
+            if profiler: profiler.hit('stress>80')
+            logs.append("😨 Le stress devient insupportable.")
+    if profiler: mark = profiler.section('mental_state', mark)
 
     # --- 4. RÉGÉNÉRATION ET ÉQUILIBRE ---
-    if state_dict['stress'] < 40 and state_dict['happiness'] > 50 and state_dict['fatigue'] < 50:
-        state_dict['willpower'] = clamp(state_dict['willpower'] + 0.5, 0, 100)
-        state_dict['health'] = clamp(state_dict['health'] + 0.1, 0, 100)
+    scale = scales.get('regeneration', 1.0)
+    if scale and state_dict['stress'] < 40 and state_dict['happiness'] > 50 and state_dict['fatigue'] < 50:
+        if profiler: profiler.hit('regeneration')
+        state_dict['willpower'] = clamp(state_dict['willpower'] + 0.5 * scale, 0, 100)
+        state_dict['health'] = clamp(state_dict['health'] + 0.1 * scale, 0, 100)
 
     # --- 5. STATS COMPOSITES POUR L'AFFICHAGE ---
     state_dict['stomachache'] = clamp((state_dict['hunger'] * 0.5 + state_dict['nausea']), 0, 100)
+    if profiler: profiler.section('regeneration', mark)
     
     return state_dict, logs
 
+def advance_state(state_dict: dict, degradation_per_minute: dict, elapsed_minutes: float, step_minutes: float,
+                  end_time: datetime, last_smoked_at: Optional[datetime] = None, max_steps: int = 288,
+                  rule_periods: Optional[dict] = None) -> Tuple[dict, list, int]:
+    """
+    Fait avancer l'état du joueur de `elapsed_minutes` par pas fixes de `step_minutes` (SIM_STEP_MINUTES).
+    Chaque pas applique la dégradation linéaire des besoins puis `chain_reactions`, dont les constantes
+    sont calibrées pour ce pas : un tick plus long ou une longue interruption rejouent plusieurs pas.
+    Le nombre de pas est plafonné à `max_steps` (les pas sont alors allongés).
+    `rule_periods` : période (en pas) des groupes lents ; None = tous à chaque pas (référence).
+    Travaille uniquement sur le dictionnaire ; retourne (état, logs sans doublons, nombre de pas).
+    """
+    steps = max(1, min(max_steps, int(elapsed_minutes // step_minutes) if step_minutes > 0 else 1))
+    step = elapsed_minutes / steps
+    logs = []
+    for index in range(1, steps + 1):
+        for stat, rate in degradation_per_minute.items():
+            state_dict[stat] = clamp(state_dict[stat] + rate * step, 0, 100)
+        step_time = end_time - timedelta(minutes=step * (steps - index))
+        time_since_last_smoke = step_time - last_smoked_at if last_smoked_at else timedelta(0)
+        group_scales = rule_group_scales(rule_periods, step_time, step, step_minutes)
+        state_dict, step_logs = chain_reactions(state_dict, time_since_last_smoke, group_scales)
+        logs.extend(log for log in step_logs if log not in logs)
+    return state_dict, logs, steps
+
+def diff_state(before: dict, after: dict, tolerance: float = 1e-9) -> dict:
+    """
+    Retourne uniquement les stats de `after` qui diffèrent de `before` de plus de `tolerance`.
+    La tolérance doit rester de l'ordre du bruit flottant : une variation plus petite ignorée
+    à chaque tick ne serait jamais rattrapée (la comparaison se fait avec la valeur stockée).
+    """
+    changes = {}
+    for key, value in after.items():
+        old = before.get(key)
+        if old is None or value is None:
+            if old != value:
+                changes[key] = value
+        elif abs(value - old) > tolerance:
+            changes[key] = value
+    return changes
+
+# Besoins à dégradation linéaire (taux ServerState.degradation_rate_*) ; stomachache en dérive (stat composite)
+LINEAR_STATS = ('hunger', 'thirst', 'stress', 'bladder', 'boredom', 'hygiene')
+
+def project_linear_stats(state_dict: dict, degradation_per_minute: dict, minutes: float) -> dict:
+    """
+    Forme close de la dégradation linéaire : valeur des besoins `minutes` plus tard, sans réactions en chaîne.
+    À taux constant, borner une seule fois équivaut à borner à chaque pas. Retourne les besoins
+    projetés et stomachache recalculé comme le fait `chain_reactions`.
+    """
+    projected = {stat: clamp(state_dict[stat] + rate * minutes, 0, 100) for stat, rate in degradation_per_minute.items()}
+    projected['stomachache'] = clamp(projected['hunger'] * 0.5 + state_dict['nausea'], 0, 100)
+    return projected
+
+def is_linear_drift(before: dict, after: dict, degradation_per_minute: dict, minutes: float, tolerance: float = 1e-9) -> bool:
+    """
+    Vrai si `after` ne diffère de `before` que par la dérive linéaire des besoins sur `minutes` :
+    les réactions en chaîne n'ont rien changé d'autre et aucun seuil n'a été franchi.
+    """
+    expected = dict(before, **project_linear_stats(before, degradation_per_minute, minutes))
+    return not diff_state(expected, after, tolerance)
+
 def update_job_performance(player, game_time=None):
     performance_modifier = 0
     messages = []
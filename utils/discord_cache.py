@@ -0,0 +1,85 @@
+# --- utils/discord_cache.py ---
+import hashlib
+import json
+from typing import Dict, Optional, Set, Tuple
+import discord
+from discord.ext import commands
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def render_fingerprint(embed: discord.Embed, view: Optional[discord.ui.View]) -> str:
+    """Empreinte du contenu envoyé à Discord pour un message (embed + composants de la vue)."""
+    payload = {
+        "embed": embed.to_dict(),
+        "components": view.to_components() if view is not None else [],
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class MessageHandleCache:
+    """
+    Cache des salons et messages de jeu utilisés par le Scheduler.
+    Les salons sont résolus depuis le cache gateway (`bot.get_channel`) et ne sont
+    récupérés via l'API REST qu'en dernier recours. Les messages sont manipulés via
+    des `PartialMessage` : les modifier ne coûte qu'un seul appel REST, sans `fetch_message`.
+    """
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._channels: Dict[int, discord.abc.Messageable] = {}
+        self._messages: Dict[Tuple[int, int], discord.PartialMessage] = {}
+        self._deleted_messages: Set[Tuple[int, int]] = set()
+        self._fingerprints: Dict[Tuple[int, int], str] = {}
+        self.rest_fetches = 0
+        self.suppressed_edits = 0
+
+    async def get_channel(self, channel_id: int) -> discord.abc.Messageable:
+        """Retourne le salon, depuis le cache si possible. Lève discord.NotFound/Forbidden comme fetch_channel."""
+        channel_id = int(channel_id)
+        channel = self._channels.get(channel_id) or self.bot.get_channel(channel_id)
+        if channel is None:
+            channel = await self.bot.fetch_channel(channel_id)
+            self.rest_fetches += 1
+        self._channels[channel_id] = channel
+        return channel
+
+    async def get_message(self, channel_id: int, message_id: int) -> Optional[discord.PartialMessage]:
+        """Retourne un PartialMessage modifiable, ou None si le message a été supprimé."""
+        key = (int(channel_id), int(message_id))
+        if key in self._deleted_messages:
+            return None
+        message = self._messages.get(key)
+        if message is None:
+            channel = await self.get_channel(key[0])
+            message = channel.get_partial_message(key[1])
+            self._messages[key] = message
+        return message
+
+    def is_unchanged(self, channel_id: int, message_id: int, fingerprint: str) -> bool:
+        """Vrai si le dernier contenu envoyé pour ce message a la même empreinte (l'édition est alors comptée comme évitée)."""
+        if self._fingerprints.get((int(channel_id), int(message_id))) == fingerprint:
+            self.suppressed_edits += 1
+            return True
+        return False
+
+    def remember_fingerprint(self, channel_id: int, message_id: int, fingerprint: str) -> None:
+        self._fingerprints[(int(channel_id), int(message_id))] = fingerprint
+
+    def forget_fingerprint(self, channel_id: int, message_id: int) -> None:
+        """Oublie le dernier rendu envoyé pour un message modifié hors du Scheduler : sa prochaine édition n'est pas évitée."""
+        self._fingerprints.pop((int(channel_id), int(message_id)), None)
+
+    def forget_channel(self, channel_id: int) -> None:
+        channel_id = int(channel_id)
+        self._channels.pop(channel_id, None)
+        for key in [key for key in self._messages if key[0] == channel_id]:
+            del self._messages[key]
+            self._fingerprints.pop(key, None)
+
+    def forget_message(self, channel_id: int, message_id: int) -> None:
+        """Marque un message de jeu connu comme supprimé : les modifications suivantes sont ignorées."""
+        key = (int(channel_id), int(message_id))
+        self._fingerprints.pop(key, None)
+        if self._messages.pop(key, None) is not None:
+            self._deleted_messages.add(key)
@@ -3,7 +3,8 @@ from typing import Optional, Dict, Any
 import discord
 from discord.ext import commands
 from db.models import PlayerProfile, ServerState
-from db.database import SessionLocal
+from db.database import AsyncSessionLocal
+from db.queries import get_game
 from utils.time_manager import get_current_game_time, is_work_time, is_night
 from utils.logger import get_logger
 
@@ -59,6 +60,12 @@ class GameStateManager:
             player.is_working = True
             player.is_at_home = False
             
+    def _dashboard_edited(self, interaction: discord.Interaction, channel_id: int, message_id: int) -> None:
+        """Signale au Scheduler une édition du message de jeu faite hors du tick."""
+        scheduler = interaction.client.get_cog("Scheduler")
+        if scheduler:
+            scheduler.dashboard_edited(channel_id, message_id)
+
     async def update_game_message(self, 
                                 interaction: discord.Interaction, 
                                 player: PlayerProfile, 
@@ -70,6 +77,8 @@ class GameStateManager:
             # First try to edit the original response if this was from an interaction
             try:
                 await interaction.edit_original_response(view=view, embed=embed)
+                if interaction.message:
+                    self._dashboard_edited(interaction, interaction.message.channel.id, interaction.message.id)
                 return True
             except (discord.NotFound, discord.HTTPException, AttributeError):
                 pass
@@ -86,6 +95,7 @@ class GameStateManager:
                     
                 message = await channel.fetch_message(server_state.game_message_id)
                 await message.edit(view=view, embed=embed)
+                self._dashboard_edited(interaction, server_state.game_channel_id, message.id)
                 return True
                 
             except (discord.NotFound, discord.Forbidden, discord.HTTPException) as e:
@@ -125,17 +135,14 @@ class GameStateManager:
         if not interaction.guild:
             return None, None
             
-        db = SessionLocal()
         try:
-            guild_id = str(interaction.guild.id)
-            player = db.query(PlayerProfile).filter_by(guild_id=guild_id).first()
-            state = db.query(ServerState).filter_by(guild_id=guild_id).first()
+            # Objets rendus détachés : get_game charge les parties froides du profil avant la fermeture
+            async with AsyncSessionLocal() as db:
+                state, player = await get_game(db, interaction.guild.id)
             return player, state
         except Exception as e:
             logger.error(f"Error getting player/state: {e}")
             return None, None
-        finally:
-            db.close()
 
 # Global instance
 game_manager = GameStateManager()
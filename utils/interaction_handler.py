@@ -6,6 +6,8 @@ from db.models import PlayerProfile, ServerState
 from db.database import SessionLocal
 from utils.logger import get_logger
 from utils.time_manager import get_current_game_time
+from utils.scheduler_utils import materialize_linear_stats
+from utils import sim_clock
 
 logger = get_logger(__name__)
 
@@ -82,6 +84,8 @@ class InteractionRouter:
                 
                 if custom_id in action_map:
                     try:
+                        # Besoins amenés à l'heure courante avant que l'action ne les modifie
+                        materialize_linear_stats(state, player, sim_clock.utcnow())
                         result = await action_map[custom_id](player, get_current_game_time(state))
                         if isinstance(result, tuple):
                             message = result[0]
@@ -0,0 +1,117 @@
+# --- utils/offline_sim.py ---
+# Pilote de simulation hors ligne (sans Discord), partagé par les scripts de banc d'essai
+# et de traces de référence. Un tick reprend les étapes de Scheduler.tick : actions,
+# bilan de travail, dégradation + réactions en chaîne, écriture différentielle.
+
+import datetime
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from db.models import ServerState, PlayerProfile
+from cogs.cooker_brain import CookerBrain
+from config import CATCHUP_MAX_STEPS, WRITEBACK_TOLERANCE
+from utils.calculations import advance_state, update_job_performance
+from utils.batch_calculations import advance_states_batch, SIMULATED_STATS
+from utils.scheduler_utils import stat_evolution_inputs, apply_stat_changes
+
+START_TIME = datetime.datetime(2024, 1, 2, 6, 0)  # Un mardi : jour travaillé
+
+# Actions scriptées hors travail : (méthode CookerBrain, prend game_time).
+# perform_sleep, perform_smoke_cigarette, perform_smoke_joint et perform_drink_alcohol sont exclus :
+# ils lisent des attributs absents de PlayerProfile (sanity, substance_addiction_level, intoxication_level).
+SCRIPTED_ACTIONS = (
+    ("perform_eat_food", False),
+    ("perform_drink_water", False),
+    ("perform_check_phone", False),
+    ("perform_drink_soda", False),
+    ("perform_urinate", False),
+    ("perform_take_shower", False),
+    ("perform_sport", True),
+)
+
+
+def create_population(session_factory, guilds: int, tick_minutes: float,
+                      initial_state: Optional[Callable[[int], dict]] = None,
+                      server_settings: Optional[dict] = None) -> None:
+    """
+    Crée `guilds` parties démarrées à START_TIME ; `initial_state(index)` peut fixer des stats de départ,
+    `server_settings` des colonnes de ServerState (taux de dégradation, durée d'une journée...).
+    """
+    db = session_factory()
+    for index in range(guilds):
+        guild_id = str(100000000000000000 + index)
+        settings = dict(duration_key="real_time", game_minutes_per_day=1440, game_tick_interval_minutes=tick_minutes)
+        settings.update(server_settings or {})
+        db.add(ServerState(
+            guild_id=guild_id, game_started=True, game_start_time=START_TIME,
+            game_channel_id=index + 1, game_message_id=index + 1, **settings,
+        ))
+        # Horodatages fixés explicitement : les valeurs par défaut du modèle lisent l'horloge murale
+        stats = dict(cigarettes=20, beers=5, food_servings=10, created_at=START_TIME, last_tick=START_TIME, last_save=START_TIME)
+        if initial_state:
+            stats.update(initial_state(index))
+        db.add(PlayerProfile(guild_id=guild_id, last_update=START_TIME, **stats))
+    db.commit()
+    db.close()
+
+
+def run_actions(brain: CookerBrain, player: PlayerProfile, game_time: datetime.datetime, tick_index: int, position: int) -> None:
+    """Mélange déterministe d'actions : travail aux horaires prévus, sinon une action scriptée un tick sur deux."""
+    if game_time.hour == 9 and game_time.minute < 30:
+        brain.perform_go_to_work(player, game_time)
+    elif game_time.hour == 17 and game_time.minute >= 30:
+        brain.perform_go_home(player, game_time)
+    elif (tick_index + position) % 2 == 0:
+        name, needs_time = SCRIPTED_ACTIONS[(tick_index + position) % len(SCRIPTED_ACTIONS)]
+        action = getattr(brain, name)
+        action(player, game_time) if needs_time else action(player)
+
+
+def simulate_tick(active_games: List[Tuple[ServerState, PlayerProfile]], now: datetime.datetime, tick_index: int,
+                  tick_minutes: float, engine_name: str, brain: CookerBrain, sections: Dict[str, float],
+                  rule_periods: Optional[dict] = None) -> int:
+    """
+    Joue un tick pour toutes les parties (sans commit). `sections` cumule le temps passé
+    dans chaque étape. `rule_periods` : périodes des groupes de règles lentes (None = référence, tout à chaque tick).
+    Retourne le nombre de colonnes de stats écrites.
+    """
+    section_start = time.perf_counter()
+    for position, (_, player) in enumerate(active_games):
+        run_actions(brain, player, now, tick_index, position)
+    sections["actions"] = sections.get("actions", 0.0) + time.perf_counter() - section_start
+
+    section_start = time.perf_counter()
+    if now.hour == 17 and 30 <= now.minute < 30 + tick_minutes:
+        for _, player in active_games:
+            update_job_performance(player, now)
+    sections["job_performance"] = sections.get("job_performance", 0.0) + time.perf_counter() - section_start
+    return advance_population(active_games, now, engine_name, sections, rule_periods)
+
+
+def advance_population(active_games: List[Tuple[ServerState, PlayerProfile]], now: datetime.datetime, engine_name: str,
+                       sections: Dict[str, float], rule_periods: Optional[dict] = None) -> int:
+    """Étape des stats d'un tick : dégradation + réactions en chaîne, puis écriture différentielle (sans commit)."""
+    section_start = time.perf_counter()
+    inputs = [stat_evolution_inputs(server_state, player, now) for server_state, player in active_games]
+    befores = [{stat: getattr(player, stat) for stat in SIMULATED_STATS} for _, player in active_games]
+    if engine_name == "batch":
+        cols, logs, _ = advance_states_batch(
+            befores, [rates for rates, _, _ in inputs], [elapsed for _, elapsed, _ in inputs],
+            [step for _, _, step in inputs], now, [player.last_smoked_at for _, player in active_games], CATCHUP_MAX_STEPS,
+            rule_periods,
+        )
+        columns = {stat: values.tolist() for stat, values in cols.items()}
+        updated = [{stat: values[index] for stat, values in columns.items()} for index in range(len(active_games))]
+    else:
+        updated, logs = [], []
+        for (_, player), before, (rates, elapsed, step) in zip(active_games, befores, inputs):
+            state, player_logs, _ = advance_state(dict(before), rates, elapsed, step, now, player.last_smoked_at, CATCHUP_MAX_STEPS, rule_periods)
+            updated.append(state)
+            logs.append(player_logs)
+    sections["stats"] = sections.get("stats", 0.0) + time.perf_counter() - section_start
+
+    section_start = time.perf_counter()
+    columns_written = 0
+    for index, (_, player) in enumerate(active_games):
+        columns_written += apply_stat_changes(player, befores[index], updated[index], logs[index], now, WRITEBACK_TOLERANCE)
+    sections["writeback"] = sections.get("writeback", 0.0) + time.perf_counter() - section_start
+    return columns_written
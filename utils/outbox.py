@@ -0,0 +1,181 @@
+# --- utils/outbox.py ---
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+import discord
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Priorités des notifications : plus la valeur est basse, plus la notification passe tôt
+PRIORITY_CRITICAL = 0
+PRIORITY_INFO = 1
+
+# Limites d'un message Discord
+MAX_CONTENT_LENGTH = 2000
+MAX_EMBEDS_PER_MESSAGE = 10
+
+
+@dataclass
+class Notice:
+    """Notification en attente pour un salon."""
+    priority: int
+    seq: int
+    content: Optional[str] = None
+    embeds: List[discord.Embed] = field(default_factory=list)
+    delete_after: Optional[float] = None
+
+
+class TokenBucket:
+    """Seau à jetons : `rate` envois par seconde en moyenne, rafales jusqu'à `capacity`."""
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, now: float) -> float:
+        """Secondes avant qu'un jeton soit disponible (0 si disponible)."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        """Vrai si le seau est plein : il ne se distingue plus d'un seau neuf."""
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class NotificationOutbox:
+    """
+    File d'envoi des notifications du Scheduler.
+    Le tick dépose ses messages (`enqueue`) et continue ; une tâche de fond les envoie en respectant
+    un seau à jetons par salon, les notifications critiques passant avant les informatives.
+    Les notifications en attente pour un même salon sont regroupées en un seul message.
+    """
+    def __init__(self, resolve_channel: Callable[[int], Awaitable[discord.abc.Messageable]],
+                 rate_per_second: float, burst: int, concurrency: int):
+        self.resolve_channel = resolve_channel
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self._pending: Dict[int, List[Notice]] = {}
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._in_flight: set = set()
+        # Tâches d'envoi en cours : la boucle asyncio ne garde qu'une référence faible aux tâches
+        self._send_tasks: set = set()
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._task: Optional[asyncio.Task] = None
+        self.sent_messages = 0
+        self.coalesced_notices = 0
+        self.dropped_notices = 0
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+
+    def enqueue(self, channel_id: int, priority: int = PRIORITY_INFO, content: Optional[str] = None,
+                embed: Optional[discord.Embed] = None, delete_after: Optional[float] = None) -> None:
+        """Dépose une notification pour un salon ; retourne immédiatement."""
+        notice = Notice(priority, next(self._seq), content, [embed] if embed is not None else [], delete_after)
+        self._pending.setdefault(int(channel_id), []).append(notice)
+        self._wakeup.set()
+
+    def pending_count(self) -> int:
+        return sum(len(notices) for notices in self._pending.values())
+
+    def _take_batch(self, channel_id: int) -> List[Notice]:
+        """Retire les notifications du salon qui tiennent dans un seul message, par priorité."""
+        notices = sorted(self._pending.pop(channel_id), key=lambda notice: (notice.priority, notice.seq))
+        batch, content_length, embed_count = [], 0, 0
+        while notices:
+            notice = notices[0]
+            extra_length = len(notice.content) + 1 if notice.content else 0
+            if batch and (content_length + extra_length > MAX_CONTENT_LENGTH or
+                          embed_count + len(notice.embeds) > MAX_EMBEDS_PER_MESSAGE):
+                break
+            batch.append(notices.pop(0))
+            content_length += extra_length
+            embed_count += len(notice.embeds)
+        if notices:
+            self._pending[channel_id] = notices
+        return batch
+
+    async def _send(self, channel_id: int, batch: List[Notice]) -> None:
+        contents, embeds, seen = [], [], set()
+        for notice in batch:
+            if notice.content and notice.content not in contents:
+                contents.append(notice.content)
+            for embed in notice.embeds:
+                # Deux notifications identiques en attente n'en font qu'une
+                key = repr(sorted(embed.to_dict().items()))
+                if key not in seen:
+                    seen.add(key)
+                    embeds.append(embed)
+        delete_afters = [notice.delete_after for notice in batch]
+        delete_after = None if None in delete_afters else max(delete_afters)
+        self.coalesced_notices += len(batch) - 1
+        try:
+            async with self._semaphore:
+                channel = await self.resolve_channel(channel_id)
+                await channel.send(content="\n".join(contents) or None, embeds=embeds, delete_after=delete_after)
+            self.sent_messages += 1
+        except (discord.NotFound, discord.Forbidden, ValueError):
+            self.dropped_notices += len(batch)
+        except discord.HTTPException as e:
+            self.dropped_notices += len(batch)
+            logger.warning(f"Envoi de {len(batch)} notification(s) au salon {channel_id} impossible: {e}")
+        finally:
+            self._in_flight.discard(channel_id)
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+            best, next_wait = None, None
+            for channel_id, notices in self._pending.items():
+                if channel_id in self._in_flight:
+                    continue
+                bucket = self._buckets.setdefault(channel_id, TokenBucket(self.rate_per_second, self.burst))
+                wait = bucket.wait_time(now)
+                if wait > 0:
+                    next_wait = wait if next_wait is None else min(next_wait, wait)
+                    continue
+                rank = min((notice.priority, notice.seq) for notice in notices)
+                if best is None or rank < best[0]:
+                    best = (rank, channel_id)
+            if best is None:
+                self._evict_idle_buckets(now)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), next_wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            channel_id = best[1]
+            self._buckets[channel_id].consume(now)
+            self._in_flight.add(channel_id)
+            task = asyncio.get_running_loop().create_task(self._send(channel_id, self._take_batch(channel_id)))
+            self._send_tasks.add(task)
+            task.add_done_callback(self._send_tasks.discard)
+
+    def _evict_idle_buckets(self, now: float) -> None:
+        """Oublie les seaux pleins des salons sans notification en attente ni en cours (recréés au besoin)."""
+        idle = [channel_id for channel_id, bucket in self._buckets.items()
+                if channel_id not in self._pending and channel_id not in self._in_flight and bucket.is_full(now)]
+        for channel_id in idle:
+            del self._buckets[channel_id]
@@ -0,0 +1,103 @@
+# --- utils/rule_profiler.py ---
+# Profilage à la demande de `chain_reactions` (versions scalaire et groupée).
+# Désactivé, le coût se limite à un test par section. Activé, chaque section de règles
+# cumule son temps d'exécution et chaque branche conditionnelle son nombre de déclenchements,
+# sur tous les joueurs et tous les ticks depuis la dernière remise à zéro.
+# Lu par /dev dev_rule_profile et par le résumé périodique du Scheduler.
+
+import time
+from typing import Dict, List, Optional
+from config import RULE_PROFILER_ENABLED
+
+# Sections de chain_reactions, dans l'ordre d'exécution ("logs" : assemblage des logs, version groupée seulement)
+RULE_SECTIONS = (
+    "recovery", "withdrawal", "cravings", "physical", "social_cognitive",
+    "vital_needs", "mental_state", "regeneration", "logs",
+)
+
+
+class RuleProfiler:
+    """
+    Compteurs du profilage : secondes par section, déclenchements par branche et nombre
+    d'évaluations (un joueur pendant un pas = une évaluation, quel que soit le moteur).
+    Écrit depuis le thread DB du Scheduler, lu depuis la boucle asyncio (copies de dictionnaires).
+    """
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self) -> None:
+        self.section_seconds: Dict[str, float] = {}
+        self.branch_hits: Dict[str, int] = {}
+        self.evaluations = 0
+        self.calls = 0
+        self.started_at = time.monotonic()
+
+    def begin(self, players: int) -> float:
+        """Début d'un appel de chain_reactions sur `players` joueurs ; retourne l'instant de départ."""
+        self.calls += 1
+        self.evaluations += players
+        return time.perf_counter()
+
+    def section(self, name: str, started: float) -> float:
+        """Clôt la section `name` commencée à `started` ; retourne l'instant de départ de la suivante."""
+        now = time.perf_counter()
+        self.section_seconds[name] = self.section_seconds.get(name, 0.0) + now - started
+        return now
+
+    def hit(self, branch: str, count: int = 1) -> None:
+        """Compte `count` déclenchements de la branche `branch` (nombre de joueurs concernés)."""
+        if count:
+            self.branch_hits[branch] = self.branch_hits.get(branch, 0) + count
+
+    def snapshot(self) -> dict:
+        """État des compteurs : temps par section (ms, part du total), taux de déclenchement des branches."""
+        sections = dict(self.section_seconds)
+        branches = dict(self.branch_hits)
+        evaluations = self.evaluations
+        total = sum(sections.values())
+        return {
+            "enabled": self.enabled,
+            "window_seconds": round(time.monotonic() - self.started_at, 1),
+            "calls": self.calls,
+            "evaluations": evaluations,
+            "total_ms": round(total * 1000, 3),
+            "sections": {
+                name: {
+                    "ms": round(sections[name] * 1000, 3),
+                    "share": round(sections[name] / total, 4) if total else 0.0,
+                    "us_per_evaluation": round(sections[name] / evaluations * 1e6, 3) if evaluations else 0.0,
+                }
+                for name in sorted(sections, key=sections.get, reverse=True)
+            },
+            "branches": {
+                name: {"hits": branches[name], "rate": round(branches[name] / evaluations, 4) if evaluations else 0.0}
+                for name in sorted(branches, key=branches.get, reverse=True)
+            },
+        }
+
+    def summary_lines(self, top: int = 5) -> List[str]:
+        """Résumé lisible : sections les plus coûteuses et branches les plus fréquentes."""
+        snapshot = self.snapshot()
+        if not snapshot["evaluations"]:
+            return ["Profil des règles : aucune évaluation depuis la remise à zéro."]
+        lines = [
+            f"Profil des règles : {snapshot['evaluations']} évaluation(s) en {snapshot['calls']} appel(s), "
+            f"{snapshot['total_ms']:.1f} ms sur {snapshot['window_seconds']:.0f} s."
+        ]
+        sections = list(snapshot["sections"].items())[:top]
+        lines.append("Sections : " + ", ".join(
+            f"{name} {values['share']:.0%} ({values['us_per_evaluation']:.2f} µs/éval.)" for name, values in sections
+        ))
+        branches = list(snapshot["branches"].items())[:top]
+        if branches:
+            lines.append("Branches : " + ", ".join(f"{name} {values['rate']:.1%}" for name, values in branches))
+        return lines
+
+
+PROFILER = RuleProfiler(RULE_PROFILER_ENABLED)
+
+
+def active() -> Optional[RuleProfiler]:
+    """Le profileur s'il est activé, sinon None (test unique en tête de chain_reactions)."""
+    return PROFILER if PROFILER.enabled else None
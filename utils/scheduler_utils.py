@@ -0,0 +1,335 @@
+# --- utils/scheduler_utils.py ---
+import asyncio
+import datetime
+import heapq
+import threading
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Awaitable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from config import SIM_STEP_MINUTES
+from db.models import ServerState, PlayerProfile, loaded_cold_parts
+from utils.calculations import diff_state, project_linear_stats, LINEAR_STATS
+from utils.logger import get_logger
+from utils.sim_profile import SimulationProfile, compile_profile, tick_interval_minutes  # noqa: F401  (tick_interval_minutes : réexport)
+
+logger = get_logger(__name__)
+
+
+def load_active_games(db: Session, guild_ids: Optional[Iterable[str]] = None) -> List[Tuple[ServerState, PlayerProfile]]:
+    """
+    Charge toutes les parties actives et le profil joueur associé en une seule requête.
+    Remplace le couple "liste des serveurs + une requête PlayerProfile par serveur" du tick.
+    Les serveurs sans profil joueur sont ignorés (jointure interne), comme avant.
+    Si `guild_ids` est fourni, seuls ces serveurs sont chargés (clause IN).
+    Les parties froides lues par le tick sont chargées d'avance, pour un nombre de requêtes fixe
+    quelle que soit l'heure de jeu : l'inventaire par jointure (le tableau de bord l'affiche),
+    la carrière et les méta-données par une requête IN chacune (bilan quotidien, rapport de 17h30).
+    """
+    query = (
+        db.query(ServerState, PlayerProfile)
+        .join(PlayerProfile, PlayerProfile.guild_id == ServerState.guild_id)
+        .filter(ServerState.game_started == True)
+        .options(
+            joinedload(PlayerProfile.inventory),
+            selectinload(PlayerProfile.career),
+            selectinload(PlayerProfile.meta),
+        )
+    )
+    if guild_ids is not None:
+        query = query.filter(ServerState.guild_id.in_(list(guild_ids)))
+    return query.all()
+
+
+def stat_evolution_inputs(server_state: ServerState, player: PlayerProfile, now: datetime.datetime,
+                          profile: Optional[SimulationProfile] = None) -> Tuple[Mapping[str, float], float, float]:
+    """
+    Paramètres de l'évolution des stats d'un joueur pour un tick : dégradation par minute de
+    chaque besoin, temps écoulé (minutes) depuis la dernière mise à jour et durée d'un pas
+    (SIM_STEP_MINUTES). Le pas ne dépend pas de l'intervalle de tick du serveur : un tick de
+    15 minutes rejoue 15 pas d'une minute, comme 15 ticks d'une minute.
+    `profile` : profil compilé du serveur (cache du Scheduler) ; à défaut, compilé depuis `server_state`.
+    Les taux retournés sont ceux du profil (lecture seule).
+    """
+    if profile is None:
+        profile = compile_profile(server_state)
+    time_delta_minutes = (now - player.last_update).total_seconds() / 60
+    return profile.degradation_per_minute, max(0.0, time_delta_minutes), SIM_STEP_MINUTES
+
+
+def format_recent_logs(new_logs: list) -> str:
+    """Texte de `PlayerProfile.recent_logs` pour les logs d'un tick."""
+    return "\n".join(f"- {log}" for log in new_logs)
+
+
+def materialize_linear_stats(server_state: ServerState, player: PlayerProfile, until: datetime.datetime,
+                             persist: bool = True, profile: Optional[SimulationProfile] = None) -> bool:
+    """
+    Amène les besoins linéaires (LINEAR_STATS) à `until` en forme close depuis `last_update`,
+    puis avance `last_update`. Le Scheduler n'écrit pas les ticks de simple dérive linéaire :
+    la base garde alors (valeur, last_update) et les taux du serveur, et toute action qui lit
+    ou modifie ces besoins doit d'abord les matérialiser.
+    Avec `persist=False`, la mise à jour reste en mémoire (l'objet n'est pas marqué modifié) :
+    lecture pour l'affichage, la base garde l'état ancré.
+    Retourne False si l'état est déjà à jour.
+    """
+    if player.last_update is None:
+        return False
+    degradation_per_minute, elapsed_minutes, _ = stat_evolution_inputs(server_state, player, until, profile)
+    if elapsed_minutes <= 0:
+        return False
+    values = project_linear_stats({stat: getattr(player, stat) for stat in (*LINEAR_STATS, 'nausea')},
+                                  degradation_per_minute, elapsed_minutes)
+    values['last_update'] = until
+    for key, value in values.items():
+        if persist:
+            setattr(player, key, value)
+        else:
+            set_committed_value(player, key, value)
+    return True
+
+
+def apply_stat_changes(player: PlayerProfile, before: dict, updated_state: dict, new_logs: list,
+                       now: datetime.datetime, tolerance: float) -> int:
+    """
+    Reporte sur le profil joueur les seules stats qui ont changé (au-delà de `tolerance`),
+    pour que l'UPDATE ne porte que sur ces colonnes. Retourne le nombre de colonnes écrites.
+    """
+    changes = diff_state(before, updated_state, tolerance)
+    for key, value in changes.items():
+        setattr(player, key, value)
+    recent_logs = format_recent_logs(new_logs)
+    if player.recent_logs != recent_logs:
+        player.recent_logs = recent_logs
+        changes["recent_logs"] = recent_logs
+    player.last_update = now
+    return len(changes) + 1
+
+
+class DueQueue:
+    """
+    File de priorité (tas binaire) des prochaines échéances de tick, une par serveur.
+    Les échéances remplacées ou retirées restent dans le tas et sont ignorées au dépilage.
+    """
+    def __init__(self):
+        self._heap: List[Tuple[float, str]] = []
+        self._due_at: Dict[str, float] = {}
+
+    def schedule(self, guild_id: str, due_at: float) -> None:
+        """Programme (ou reprogramme) le prochain tick d'un serveur."""
+        self._due_at[guild_id] = due_at
+        heapq.heappush(self._heap, (due_at, guild_id))
+
+    def remove(self, guild_id: str) -> None:
+        self._due_at.pop(guild_id, None)
+
+    def pop_due(self, now: float) -> List[str]:
+        """Retire et retourne les serveurs dont l'échéance est passée."""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, guild_id = heapq.heappop(self._heap)
+            if self._due_at.get(guild_id) == due_at:
+                del self._due_at[guild_id]
+                due.append(guild_id)
+        return due
+
+    def next_due(self) -> Optional[float]:
+        """Prochaine échéance valide, ou None si la file est vide."""
+        while self._heap and self._due_at.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def __contains__(self, guild_id: str) -> bool:
+        return guild_id in self._due_at
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._due_at))
+
+    def __len__(self) -> int:
+        return len(self._due_at)
+
+
+def snapshot_row(row) -> SimpleNamespace:
+    """
+    Copie détachée des colonnes d'un objet ORM.
+    Permet de passer l'état d'un tick du thread DB au thread Discord sans partager la session.
+    Les colonnes des parties froides déjà chargées d'un profil joueur sont copiées avec lui (sans chargement).
+    """
+    values = {attr.key: getattr(row, attr.key) for attr in inspect(row).mapper.column_attrs}
+    if isinstance(row, PlayerProfile):
+        for part in loaded_cold_parts(row):
+            values.update({attr.key: getattr(part, attr.key) for attr in inspect(part).mapper.column_attrs
+                           if not attr.columns[0].primary_key})
+    return SimpleNamespace(**values)
+
+
+@dataclass
+class GuildTickResult:
+    """Résultat de la phase DB d'un tick pour un serveur, consommé par la phase Discord."""
+    guild_id: str
+    server_state: SimpleNamespace
+    player: SimpleNamespace
+    interval_minutes: float
+    outgoing: list = field(default_factory=list)
+    duration: float = 0.0
+
+
+class QueryCounter:
+    """
+    Compte les requêtes SQL exécutées sur un engine pendant un bloc `with`.
+    Utilisé par le Scheduler pour mesurer le coût DB de chaque tick.
+    Seules les requêtes du thread qui a ouvert le bloc sont comptées.
+    """
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self._thread_id = None
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread_id:
+            self.count += 1
+
+    def __enter__(self) -> "QueryCounter":
+        self.count = 0
+        self._thread_id = threading.get_ident()
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+        return False
+
+
+async def run_bounded(coros: Dict[str, Awaitable], limit: int, timeout: float,
+                      durations: Optional[Dict[str, float]] = None) -> Dict[str, Optional[BaseException]]:
+    """
+    Exécute les coroutines (une par serveur) en parallèle, avec au plus `limit` en cours
+    et un délai maximal de `timeout` secondes chacune.
+    Une erreur ou un dépassement de délai n'affecte que son serveur ; il est journalisé et
+    retourné dans le dictionnaire de résultats (None si tout s'est bien passé).
+    Si `durations` est fourni, il reçoit la durée d'exécution (secondes) de chaque coroutine.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def _guarded(guild_id: str, coro: Awaitable) -> Optional[BaseException]:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(coro, timeout)
+                return None
+            except asyncio.TimeoutError as e:
+                logger.warning(f"Mise à jour du serveur {guild_id} abandonnée après {timeout}s.")
+                return e
+            except Exception as e:
+                logger.error(f"Erreur lors de la mise à jour du serveur {guild_id}: {e}", exc_info=True)
+                return e
+            finally:
+                if durations is not None:
+                    durations[guild_id] = time.perf_counter() - started
+
+    results = await asyncio.gather(*(_guarded(guild_id, coro) for guild_id, coro in coros.items()))
+    return dict(zip(coros.keys(), results))
+
+
+class LoopLagMonitor:
+    """
+    Mesure le retard de la boucle asyncio : une tâche dort `interval` secondes et
+    relève de combien son réveil a dépassé l'échéance. Un retard élevé signifie que du
+    code bloquant (ex: requêtes SQLite) a monopolisé la boucle, retardant heartbeats et interactions.
+    """
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.max_lag = 0.0
+        self._total_lag = 0.0
+        self._samples = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.max_lag = max(self.max_lag, lag)
+            self._total_lag += lag
+            self._samples += 1
+
+    def snapshot_and_reset(self) -> Tuple[float, float]:
+        """Retourne (retard max, retard moyen) en secondes depuis le dernier appel, puis remet à zéro."""
+        average = self._total_lag / self._samples if self._samples else 0.0
+        result = (self.max_lag, average)
+        self.max_lag, self._total_lag, self._samples = 0.0, 0.0, 0
+        return result
+
+
+class GuildBackoff:
+    """
+    Suivi des échecs consécutifs par serveur.
+    Un serveur en échec voit son prochain tick repoussé de façon exponentielle
+    (intervalle normal x 2^échecs, plafonné), pour ne plus consommer le temps du tick.
+    """
+    def __init__(self, max_delay_seconds: float):
+        self.max_delay_seconds = max_delay_seconds
+        self.failures: Dict[str, int] = {}
+
+    def record_failure(self, guild_id: str, interval_seconds: float) -> float:
+        """Enregistre un échec et retourne le délai (secondes) avant la prochaine tentative."""
+        count = self.failures.get(guild_id, 0) + 1
+        self.failures[guild_id] = count
+        delay = min(self.max_delay_seconds, interval_seconds * 2 ** count)
+        logger.warning(f"Serveur {guild_id}: {count} échec(s) consécutif(s), prochaine tentative dans {delay:.0f}s.")
+        return delay
+
+    def record_success(self, guild_id: str) -> None:
+        if self.failures.pop(guild_id, None):
+            logger.info(f"Serveur {guild_id}: traitement rétabli.")
+
+    def forget(self, guild_id: str) -> None:
+        """Oublie les échecs d'un serveur dont la partie est terminée : une nouvelle partie repart sans pénalité."""
+        self.failures.pop(guild_id, None)
+
+
+class TickWatchdog:
+    """
+    Surveille la durée des ticks et des serveurs qui les composent.
+    Signale les ticks qui dépassent leur budget et les serveurs anormalement lents.
+    """
+    def __init__(self, budget_seconds: float, slow_guild_seconds: float):
+        self.budget_seconds = budget_seconds
+        self.slow_guild_seconds = slow_guild_seconds
+        self.last_tick_seconds = 0.0
+        self.max_tick_seconds = 0.0
+        self.ticks = 0
+        self.overruns = 0
+        self.guild_seconds: Dict[str, float] = {}
+
+    def record_guild(self, guild_id: str, phase: str, seconds: float) -> None:
+        """Ajoute la durée d'une phase ("db" ou "discord") au temps du serveur pour ce tick."""
+        self.guild_seconds[guild_id] = self.guild_seconds.get(guild_id, 0.0) + seconds
+        if seconds >= self.slow_guild_seconds:
+            logger.warning(f"Serveur {guild_id}: phase {phase} lente ({seconds:.2f}s).")
+
+    def record_tick(self, seconds: float) -> None:
+        """Clôt un tick : met à jour les statistiques et signale un dépassement de budget."""
+        self.ticks += 1
+        self.last_tick_seconds = seconds
+        self.max_tick_seconds = max(self.max_tick_seconds, seconds)
+        if seconds > self.budget_seconds:
+            self.overruns += 1
+            slowest = sorted(self.guild_seconds.items(), key=lambda item: item[1], reverse=True)[:5]
+            logger.warning(
+                f"Tick en dépassement: {seconds:.1f}s pour un budget de {self.budget_seconds:.0f}s "
+                f"({self.overruns} dépassement(s) sur {self.ticks} tick(s)). Serveurs les plus lents: "
+                + ", ".join(f"{guild_id}={duration:.2f}s" for guild_id, duration in slowest)
+            )
+        self.guild_seconds = {}
@@ -0,0 +1,23 @@
+# --- utils/sharding.py ---
+from sqlalchemy import Integer, cast
+from config import SHARD_COUNT, SHARD_IDS
+
+
+def shard_for_guild(guild_id, shard_count: int = SHARD_COUNT) -> int:
+    """Shard Discord d'un serveur (même formule que la gateway : (guild_id >> 22) % shard_count)."""
+    return (int(guild_id) >> 22) % shard_count
+
+
+def owns_guild(guild_id) -> bool:
+    """Vrai si le serveur appartient à un shard géré par ce processus."""
+    return SHARD_COUNT <= 1 or shard_for_guild(guild_id) in SHARD_IDS
+
+
+def owned_guild_filter(guild_id_column):
+    """
+    Clause SQL restreignant une requête aux serveurs des shards de ce processus.
+    Retourne None sans sharding (aucun filtre à ajouter).
+    """
+    if SHARD_COUNT <= 1:
+        return None
+    return (cast(guild_id_column, Integer).op(">>")(22) % SHARD_COUNT).in_(SHARD_IDS)
@@ -0,0 +1,65 @@
+# --- utils/sim_clock.py ---
+# Horloge et générateur aléatoire de la simulation.
+# Par défaut : horloge murale et module `random`. En mode déterministe (graine et horloge injectées),
+# deux exécutions de la simulation produisent exactement le même état, ce qui permet de vérifier
+# un moteur optimisé contre le moteur de référence (cf. scripts/golden_traces.py).
+
+import contextlib
+import datetime
+import os
+import random
+from typing import Callable, Iterator, Optional
+
+_default_seed = os.getenv("SIMULATION_SEED")
+_rng: random.Random = random.Random(int(_default_seed)) if _default_seed else random._inst
+_clock: Optional[Callable[[], datetime.datetime]] = None
+
+
+class ManualClock:
+    """Horloge avancée à la main (temps UTC naïf), pour les simulations hors ligne."""
+    def __init__(self, start: datetime.datetime):
+        self.current = start
+
+    def __call__(self) -> datetime.datetime:
+        return self.current
+
+    def set(self, moment: datetime.datetime) -> None:
+        self.current = moment
+
+    def advance(self, minutes: float) -> datetime.datetime:
+        self.current += datetime.timedelta(minutes=minutes)
+        return self.current
+
+
+def utcnow() -> datetime.datetime:
+    """Heure UTC courante (naïve), ou celle de l'horloge injectée."""
+    return _clock() if _clock is not None else datetime.datetime.utcnow()
+
+
+def now() -> datetime.datetime:
+    """Heure locale courante (naïve), ou celle de l'horloge injectée (sans conversion de fuseau, pour rester reproductible)."""
+    return _clock() if _clock is not None else datetime.datetime.now()
+
+
+def rng() -> random.Random:
+    """Générateur aléatoire de la simulation."""
+    return _rng
+
+
+def configure(seed: Optional[int] = None, clock: Optional[Callable[[], datetime.datetime]] = None) -> None:
+    """Injecte une graine (None = module random) et une horloge (None = horloge murale)."""
+    global _rng, _clock
+    _rng = random.Random(seed) if seed is not None else random._inst
+    _clock = clock
+
+
+@contextlib.contextmanager
+def deterministic(seed: int, clock: Callable[[], datetime.datetime]) -> Iterator[None]:
+    """Active le mode déterministe le temps d'un bloc `with`, puis restaure la configuration précédente."""
+    global _rng, _clock
+    previous = (_rng, _clock)
+    configure(seed, clock)
+    try:
+        yield
+    finally:
+        _rng, _clock = previous
@@ -0,0 +1,153 @@
+# --- utils/sim_profile.py ---
+# Profil de simulation compilé par serveur : taux de dégradation par minute, durée d'une journée,
+# intervalle de tick et indicateurs de planning, calculés une fois à partir de ServerState.
+# Le Scheduler lit ces nombres à chaque tick au lieu de relire et revalider les colonnes.
+# Un profil est immuable et n'est compilé qu'au changement de configuration : chaque écriture
+# de configuration l'invalide après son commit (invalidate_on_commit, Scheduler.reschedule_guild),
+# et la compilation suivante porte un nouveau numéro de version. Une partie n'est modifiée que par
+# le processus qui possède son shard (cf. utils.sharding) : il n'y a pas d'écriture venue d'ailleurs.
+
+import itertools
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Un tick ne doit jamais couvrir plus de 30 minutes de jeu : les fenêtres horaires
+# du Scheduler (17h30-18h, heure de début de journée) seraient sinon sautées.
+MAX_GAME_MINUTES_PER_TICK = 30
+MIN_TICK_INTERVAL_MINUTES = 1
+
+# Besoin à dégradation linéaire → colonne de ServerState portant son taux journalier
+DEGRADATION_RATE_COLUMNS = {
+    'hunger': 'degradation_rate_hunger',
+    'thirst': 'degradation_rate_thirst',
+    'stress': 'degradation_rate_stress',
+    'bladder': 'degradation_rate_bladder',
+    'boredom': 'degradation_rate_boredom',
+    'hygiene': 'degradation_rate_hygiene',
+}
+
+
+def minutes_per_game_day(server_state) -> float:
+    """Minutes réelles par journée de jeu (1440 si la valeur est absente ou invalide)."""
+    minutes = server_state.game_minutes_per_day
+    return minutes if minutes and minutes > 0 else 1440
+
+
+def tick_interval_minutes(server_state) -> float:
+    """
+    Intervalle réel (en minutes) entre deux ticks d'un serveur.
+    `game_tick_interval_minutes` est exprimé en minutes réelles (cf. /dev dev_set_time) ;
+    il est plafonné à MAX_GAME_MINUTES_PER_TICK minutes de jeu selon le mode de durée.
+    """
+    interval = server_state.game_tick_interval_minutes or 30
+    max_interval = MAX_GAME_MINUTES_PER_TICK * minutes_per_game_day(server_state) / 1440
+    return max(MIN_TICK_INTERVAL_MINUTES, min(interval, max_interval))
+
+
+@dataclass(frozen=True)
+class SimulationProfile:
+    """Configuration de simulation d'un serveur, figée à la compilation."""
+    guild_id: str
+    version: int
+    degradation_per_minute: Mapping[str, float]
+    minutes_per_game_day: float
+    game_minutes_per_real_minute: float
+    tick_interval_minutes: float
+    duration_key: Optional[str]
+    is_real_time: bool
+    is_test_mode: bool
+    game_day_start_hour: int
+
+
+def compile_profile(server_state, version: int = 0) -> SimulationProfile:
+    """Compile le profil d'un serveur à partir des colonnes de ServerState."""
+    day_minutes = minutes_per_game_day(server_state)
+    return SimulationProfile(
+        guild_id=str(server_state.guild_id),
+        version=version,
+        degradation_per_minute=MappingProxyType({
+            stat: getattr(server_state, column) / day_minutes for stat, column in DEGRADATION_RATE_COLUMNS.items()
+        }),
+        minutes_per_game_day=day_minutes,
+        game_minutes_per_real_minute=1440 / day_minutes,
+        tick_interval_minutes=tick_interval_minutes(server_state),
+        duration_key=server_state.duration_key,
+        is_real_time=(server_state.duration_key or 'real_time') == 'real_time',
+        is_test_mode=bool(server_state.is_test_mode),
+        game_day_start_hour=server_state.game_day_start_hour,
+    )
+
+
+class SimulationProfileCache:
+    """
+    Profils compilés par guild_id. Lu depuis le thread DB du Scheduler, invalidé depuis la boucle
+    asyncio : les opérations sur le dictionnaire sont protégées par un verrou.
+    Un profil reste en cache jusqu'à son invalidation ; sa recompilation lui donne une version plus grande.
+    """
+    def __init__(self):
+        self.compilations = 0
+        self._profiles = {}
+        self._versions = itertools.count(1)
+        self._lock = threading.Lock()
+        self._installed = False
+        # Clé de Session.info : serveurs à invalider quand la transaction de la session est validée
+        self._session_key = f"sim_profile_invalidations_{id(self)}"
+
+    def get(self, server_state) -> SimulationProfile:
+        guild_id = str(server_state.guild_id)
+        with self._lock:
+            profile = self._profiles.get(guild_id)
+            if profile is None:
+                profile = compile_profile(server_state, next(self._versions))
+                self._profiles[guild_id] = profile
+                self.compilations += 1
+            return profile
+
+    def invalidate(self, guild_id: str) -> None:
+        with self._lock:
+            self._profiles.pop(str(guild_id), None)
+
+    def invalidate_on_commit(self, session, guild_id: str) -> None:
+        """
+        Invalide le profil quand la transaction en cours de `session` est validée.
+        Invalider avant le commit laisserait le tick recompiler l'ancienne configuration.
+        Si la transaction est annulée, rien n'est invalidé (la demande est oubliée avec elle).
+        """
+        if session is None:
+            self.invalidate(guild_id)
+            return
+        self.install()
+        session.info.setdefault(self._session_key, set()).add(str(guild_id))
+
+    def _after_commit(self, session: Session) -> None:
+        for guild_id in session.info.pop(self._session_key, ()):
+            self.invalidate(guild_id)
+
+    def _after_rollback(self, session: Session) -> None:
+        session.info.pop(self._session_key, None)
+
+    def install(self) -> None:
+        """Branche le cache sur les fins de transaction de toutes les sessions (une seule fois)."""
+        with self._lock:
+            if self._installed:
+                return
+            event.listen(Session, "after_commit", self._after_commit)
+            event.listen(Session, "after_rollback", self._after_rollback)
+            self._installed = True
+
+    def retain(self, guild_ids: Iterable[str]) -> None:
+        """Oublie les profils des serveurs absents de `guild_ids` (parties terminées)."""
+        keep = set(guild_ids)
+        with self._lock:
+            for guild_id in [guild_id for guild_id in self._profiles if guild_id not in keep]:
+                del self._profiles[guild_id]
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+
+PROFILES = SimulationProfileCache()
@@ -1,5 +1,6 @@
 import datetime
 import pytz
+from utils import sim_clock
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -9,8 +10,8 @@ if TYPE_CHECKING:
 TARGET_TIMEZONE = pytz.timezone('Europe/Paris')
 
 def get_utc_now() -> datetime.datetime:
-    """Returns the current timezone-aware UTC datetime."""
-    return datetime.datetime.now(datetime.timezone.utc)
+    """Returns the current timezone-aware UTC datetime (from the simulation clock, see utils/sim_clock.py)."""
+    return sim_clock.utcnow().replace(tzinfo=datetime.timezone.utc)
 
 def to_localized(dt: datetime.datetime) -> datetime.datetime:
     """Converts a naive UTC datetime or an aware UTC datetime to the target timezone."""